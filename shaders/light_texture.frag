@@ -14,18 +14,26 @@ uniform vec3 u_Kd; // Diffuse Coeff.
 uniform vec3 u_Ks; // Specular Coeff.
 uniform float u_Ns; // Specular Exponent.
 
-uniform vec3 u_GKa; // Ambient Coeff.
-uniform vec3 u_GKd; // Diffuse Coeff.
-uniform vec3 u_GKs; // Specular Coeff.
-uniform float u_GNs; // Specular Exponent.
-
 uniform float u_d;
 
-uniform vec3 u_AuxRobotPos;
-uniform vec3 u_BulletPos;
-uniform vec3 u_CameraPos;
 uniform bool u_HasTexture;
 
+// Updated once per frame (see RenderContext)
+layout(std140) uniform Camera {
+    mat4 u_View;
+    mat4 u_Projection;
+    vec3 u_CameraPos;
+};
+
+layout(std140) uniform Lighting {
+    vec3 u_GKa; // Ambient Coeff.
+    vec3 u_GKd; // Diffuse Coeff.
+    vec3 u_GKs; // Specular Coeff.
+    float u_GNs; // Specular Exponent.
+    vec3 u_AuxRobotPos;
+    vec3 u_BulletPos;
+};
+
 // Constants
 vec3 auxRobotLight = vec3(1.0, 1.0, 1.0);
 vec3 bulletLight = vec3(1.0, 0.0, 0.0);
@@ -6,8 +6,13 @@ layout(location=2) in vec3 a_Normal;
 
 // MVP
 uniform mat4 u_Model;
-uniform mat4 u_View;
-uniform mat4 u_Projection;
+
+// Updated once per frame (see RenderContext)
+layout(std140) uniform Camera {
+    mat4 u_View;
+    mat4 u_Projection;
+    vec3 u_CameraPos;
+};
 
 out vec3 v_Position;
 out vec2 v_TexCoord;
@@ -0,0 +1,26 @@
+#version 330
+
+layout(location=0) in vec3 a_Position;
+layout(location=1) in vec2 a_TexCoord;
+layout(location=2) in vec3 a_Normal;
+
+// Per instance (instanced variant of light_texture.vert: the model matrix comes from a vertex buffer, see Mesh.draw_instanced)
+layout(location=3) in mat4 a_Model;
+
+// Updated once per frame (see RenderContext)
+layout(std140) uniform Camera {
+    mat4 u_View;
+    mat4 u_Projection;
+    vec3 u_CameraPos;
+};
+
+out vec3 v_Position;
+out vec2 v_TexCoord;
+out vec3 v_Normal;
+
+void main() {
+    gl_Position = vec4(a_Position, 1.0) * a_Model * u_View * u_Projection;
+    v_Position = (vec4(a_Position, 1.0) * a_Model).xyz;
+    v_TexCoord = a_TexCoord;
+    v_Normal = (vec4(a_Normal, 0.0) * a_Model).xyz;
+}
\ No newline at end of file
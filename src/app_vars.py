@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Union
 from utils.geometry import Vec3
 
 from camera import Camera
+from gl_abstractions.layout import VERTEX_DATA_VALIDATION
 from objects.element import Element
 from transform import Transform
 
@@ -17,12 +18,45 @@ def _create_world():
 if TYPE_CHECKING:
     from objects.world import World
     from objects.bullet_ray import BulletRay
+    from objects.ray import HitboxMode
 
 @dataclass
 class DebugOptions:
     ''' Options for debugging '''
     show_bbox: bool = False # Show bounding boxes (hitboxes)
 
+    @property
+    def validate_vertex_data(self) -> bool:
+        ''' Check every vertex attribute of new vertex data, not only its dtype and shape (slow, see VertexDataValidation) '''
+        return VERTEX_DATA_VALIDATION.full_checks
+
+    @validate_vertex_data.setter
+    def validate_vertex_data(self, value: bool):
+        VERTEX_DATA_VALIDATION.full_checks = value
+
+@dataclass
+class RenderingOptions:
+    ''' Options for how elements are converted and drawn '''
+    indexed_geometry: bool = True # Deduplicate vertices and draw with an index buffer (only affects elements created afterwards)
+    instancing: bool = True # Draw shapes with the same mesh and material in a single instanced draw call
+    frustum_culling: bool = True # Skip shapes whose bounding sphere is outside the view frustum
+    gpu_timers: bool = True # Measure the GPU time of each render pass (see RenderQueue)
+    gpu_batch_timers: bool = False # Also measure the GPU time of each batch of draws (more OpenGL calls, needs gpu_timers)
+
+@dataclass
+class RaycastOptions:
+    ''' Options for how the rays (bullets and selection) find what they hit '''
+    aabb_hitboxes: bool = False # Test the bounding boxes of the meshes instead of the hitbox spheres (center and pseudo_hitbox_distance)
+    triangle_picking: bool = False # Test the triangles of the meshes (exact, overrides aabb_hitboxes)
+    swept: bool = False # Test the segment the ray moved in each tick instead of casting once when fired (follows targets that move)
+
+    @property
+    def hitbox_mode(self) -> 'HitboxMode':
+        from objects.ray import HitboxMode
+        if self.triangle_picking:
+            return HitboxMode.TRIANGLES
+        return HitboxMode.AABB if self.aabb_hitboxes else HitboxMode.SPHERE
+
 @dataclass
 class Cursor:
     ''' Keeps track of the cursor position in the screen '''
@@ -80,6 +114,8 @@ class AppVars:
 
     closing: bool = False # Used to sync the closing event between the main thread and the GUI thread.
     debug_options: DebugOptions = field(default_factory=DebugOptions)
+    rendering_options: RenderingOptions = field(default_factory=RenderingOptions)
+    raycast_options: RaycastOptions = field(default_factory=RaycastOptions)
 
     world: 'World' = field(default_factory=_create_world)
     cursor: Cursor = field(default_factory=Cursor)
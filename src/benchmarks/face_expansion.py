@@ -0,0 +1,51 @@
+'''
+Benchmark: RawVertex face expansion vs vectorized face expansion for every model in models/
+Also checks that both paths produce the same vertices.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.face_expansion
+'''
+
+import glob
+import time
+
+import numpy as np
+
+from wavefront.model import Object
+from wavefront.model_reader import ModelReader
+
+REPEATS = 5
+
+def _raw_vertex_expansion(object: Object) -> np.ndarray:
+    ''' The old path: one RawVertex per corner, then one tuple per vertex '''
+    return np.array([
+        vertex.to_tuple(True, True, True) for vertex in object.expand_faces_to_unindexed_vertices()
+    ], dtype=np.float32).reshape(-1, 8)
+
+def _vectorized_expansion(object: Object) -> np.ndarray:
+    ''' The new path: fancy indexing on the face index arrays '''
+    return object.expand_faces_to_vertex_array()
+
+def _best_time(expand, objects: list[Object]) -> tuple[float, list[np.ndarray]]:
+    ''' Returns the best time (in seconds) of REPEATS expansions of all objects and the expanded arrays '''
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        arrays = [ expand(object) for object in objects ]
+        best = min(best, time.perf_counter() - start)
+    return best, arrays
+
+def main():
+    print(f'{"model":<24}{"vertices":>10}{"RawVertex (ms)":>16}{"vectorized (ms)":>17}{"speedup":>10}{"same":>6}')
+
+    for filename in sorted(glob.glob('models/*.obj')):
+        model = ModelReader().load_model_from_file(filename)
+        raw_time, raw_arrays = _best_time(_raw_vertex_expansion, model.objects)
+        vectorized_time, vectorized_arrays = _best_time(_vectorized_expansion, model.objects)
+
+        vertex_count = sum(len(array) for array in vectorized_arrays)
+        same = 'yes' if all(np.array_equal(a, b) for a, b in zip(raw_arrays, vectorized_arrays)) else 'NO'
+        print(f'{filename:<24}{vertex_count:>10}{raw_time*1000:>16.2f}{vectorized_time*1000:>17.2f}{raw_time/vectorized_time:>9.1f}x{same:>6}')
+
+if __name__ == '__main__':
+    main()
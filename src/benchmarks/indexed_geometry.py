@@ -0,0 +1,41 @@
+'''
+Report: vertex memory of unindexed vs indexed (deduplicated) geometry for every model in models/
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.indexed_geometry
+'''
+
+import glob
+
+import numpy as np
+
+from wavefront.model import deduplicate_vertices
+from wavefront.model_reader import ModelReader
+
+def main():
+    print(f'{"model":<24}{"vertices":>10}{"unique":>10}{"unindexed (KB)":>16}{"indexed (KB)":>14}{"saved":>8}')
+
+    total_unindexed = total_indexed = 0
+    for filename in sorted(glob.glob('models/*.obj')):
+        model = ModelReader().load_model_from_file(filename)
+
+        vertex_count = unique_count = unindexed_bytes = indexed_bytes = 0
+        for object in model.objects:
+            vertices = object.expand_faces_to_vertex_array()
+            unique_vertices, indices = deduplicate_vertices(vertices)
+            assert np.array_equal(unique_vertices[indices], vertices), f'Deduplication changed the geometry of {filename}::{object.name}'
+
+            vertex_count += len(vertices)
+            unique_count += len(unique_vertices)
+            unindexed_bytes += vertices.nbytes
+            indexed_bytes += unique_vertices.nbytes + indices.nbytes
+
+        total_unindexed += unindexed_bytes
+        total_indexed += indexed_bytes
+        saved = 1 - indexed_bytes / unindexed_bytes if unindexed_bytes else 0
+        print(f'{filename:<24}{vertex_count:>10}{unique_count:>10}{unindexed_bytes/1024:>16.1f}{indexed_bytes/1024:>14.1f}{saved:>8.1%}')
+
+    print(f'{"total":<24}{"":>10}{"":>10}{total_unindexed/1024:>16.1f}{total_indexed/1024:>14.1f}{1 - total_indexed/total_unindexed:>8.1%}')
+
+if __name__ == '__main__':
+    main()
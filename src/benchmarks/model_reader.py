@@ -0,0 +1,62 @@
+'''
+Benchmark: line by line vs bulk (NumPy) parsing of every model in models/
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.model_reader
+'''
+
+import glob
+import time
+
+import numpy as np
+
+from wavefront.model import Model
+from wavefront.model_reader import ModelReader
+
+REPEATS = 5
+
+def _best_time(load, filename: str) -> tuple[float, Model]:
+    ''' Returns the best time (in seconds) of REPEATS loads and the loaded model '''
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        model = load(filename)
+        best = min(best, time.perf_counter() - start)
+    return best, model
+
+def _same_geometry(model_a: Model, model_b: Model) -> bool:
+    ''' Checks if both models have the same objects, materials and expanded vertices '''
+    if len(model_a.objects) != len(model_b.objects):
+        return False
+
+    for object_a, object_b in zip(model_a.objects, model_b.objects):
+        if object_a.name != object_b.name:
+            return False
+        # Unnamed materials get a random 'default-<random>' name
+        if object_a.material.name != object_b.material.name and not object_a.material.name.startswith('default-'):
+            return False
+        vertices_a = np.array([ v.to_tuple(True, True, True) for v in object_a.expand_faces_to_unindexed_vertices() ], dtype=np.float32)
+        vertices_b = np.array([ v.to_tuple(True, True, True) for v in object_b.expand_faces_to_unindexed_vertices() ], dtype=np.float32)
+        if not np.array_equal(vertices_a, vertices_b):
+            return False
+
+    return True
+
+def main():
+    print(f'{"model":<24}{"size (KB)":>10}{"lines (ms)":>12}{"bulk (ms)":>12}{"speedup":>10}{"same":>6}')
+
+    total_lines = total_bulk = 0
+    for filename in sorted(glob.glob('models/*.obj')):
+        lines_time, lines_model = _best_time(lambda f: ModelReader(bulk=False).load_model_from_file(f), filename)
+        bulk_time, bulk_model = _best_time(lambda f: ModelReader(bulk=True).load_model_from_file(f), filename)
+        total_lines += lines_time
+        total_bulk += bulk_time
+
+        size_kb = len(open(filename, 'rb').read()) / 1024
+        same = 'yes' if _same_geometry(lines_model, bulk_model) else 'NO'
+        print(f'{filename:<24}{size_kb:>10.1f}{lines_time*1000:>12.2f}{bulk_time*1000:>12.2f}{lines_time/bulk_time:>9.1f}x{same:>6}')
+
+    print(f'{"total":<24}{"":>10}{total_lines*1000:>12.2f}{total_bulk*1000:>12.2f}{total_lines/total_bulk:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+'''
+Benchmark: moving 10k wandering bots, each with its own Momentum (Vec3 math per object, like the bots did) vs one
+PhysicsSystem step for all of them. The final positions of both are compared, so the benchmark also checks the system.
+
+Elements without shapes are used, so no OpenGL context is needed.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.physics
+'''
+
+import math
+import random
+import time
+
+import numpy as np
+
+import constants
+from objects.element import PHYSICS_TPS, Element
+from objects.physics.momentum import Momentum
+from objects.physics.physics_system import PhysicsSystem
+from transform import Transform
+from utils.geometry import Vec3
+
+BODY_COUNT = 10_000
+TICKS = 20
+
+HALF_SIZE = constants.WORLD_SIZE / 2
+BOUNDS = (Vec3(-HALF_SIZE, -math.inf, 0), Vec3(HALF_SIZE, math.inf, HALF_SIZE))
+
+def _spawn_elements() -> list[Element]:
+    elements = []
+    for index in range(BODY_COUNT):
+        translation = Vec3(random.uniform(-HALF_SIZE, HALF_SIZE), 0, random.uniform(0, HALF_SIZE))
+        elements.append(Element(f'Bot_{index}', shape_specs=[], transform=Transform(translation=translation)))
+    return elements
+
+def _forces(tick: int) -> np.ndarray:
+    ''' Same wandering force for every bot (like Bot._physics_update, with fixed periods) '''
+    t = tick / PHYSICS_TPS
+    return np.array([math.sin(t), 0, math.cos(t)])
+
+def _run_momentum(elements: list[Element]) -> float:
+    ''' Ticks per second of the old per-object integration '''
+    momenta = [ Momentum() for _ in elements ]
+    delta_time = 1 / PHYSICS_TPS
+
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        force = Vec3(*_forces(tick))
+        for element, momentum in zip(elements, momenta):
+            momentum.apply_force(force, delta_time=delta_time)
+            element.transform.translation += momentum.velocity
+            position = element.transform.translation
+            if (position.x < BOUNDS[0].x and momentum.velocity.x < 0) or (position.x > BOUNDS[1].x and momentum.velocity.x > 0):
+                momentum.velocity.x *= -1
+            if (position.z < BOUNDS[0].z and momentum.velocity.z < 0) or (position.z > BOUNDS[1].z and momentum.velocity.z > 0):
+                momentum.velocity.z *= -1
+    return TICKS / (time.perf_counter() - start)
+
+def _run_system(elements: list[Element], sync: bool) -> tuple[float, PhysicsSystem]:
+    ''' Ticks per second of PhysicsSystem.step (and copying the positions to the transforms, if sync) '''
+    system = PhysicsSystem()
+    for element in elements:
+        system.add_body(element, max_speed=0.1, bounds=BOUNDS)
+    delta_time = 1 / PHYSICS_TPS
+
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        system.acceleration[:system.count] = _forces(tick) * 0.01
+        system.step(delta_time)
+        if sync:
+            system.sync_transforms()
+    return TICKS / (time.perf_counter() - start), system
+
+def main():
+    random.seed(0)
+    initial = [ element.transform.translation.values.copy() for element in _spawn_elements() ]
+
+    def fresh_elements() -> list[Element]:
+        return [ Element(f'Bot_{index}', shape_specs=[], transform=Transform(translation=Vec3(*position))) for index, position in enumerate(initial) ]
+
+    momentum_elements = fresh_elements()
+    momentum_tps = _run_momentum(momentum_elements)
+    system_tps, system = _run_system(fresh_elements(), sync=False)
+    synced_tps, _ = _run_system(fresh_elements(), sync=True)
+
+    expected = np.array([ element.transform.translation.values for element in momentum_elements ])
+    assert np.allclose(expected, system.position[:system.count]), 'The physics system and Momentum disagree'
+
+    print(f'{BODY_COUNT} bodies, {TICKS} ticks (the game runs at {PHYSICS_TPS} ticks/s)')
+    print(f'{"":<24}{"ticks/s":>12}{"speedup":>10}')
+    print(f'{"Momentum per object":<24}{momentum_tps:>12.1f}{1:>9.1f}x')
+    print(f'{"PhysicsSystem.step":<24}{system_tps:>12.1f}{system_tps / momentum_tps:>9.1f}x')
+    print(f'{"step + sync_transforms":<24}{synced_tps:>12.1f}{synced_tps / momentum_tps:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
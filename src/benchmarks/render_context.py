@@ -0,0 +1,79 @@
+'''
+Benchmark: CPU cost per shape of the camera and lighting uniform values in the default scene,
+computed for every shape (old ShapeRenderer.render) vs once per frame (RenderContext).
+Only the computation of the values is measured, not the uniform uploads.
+
+Needs an OpenGL context to set up the scene: a hidden GLFW window is created.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.render_context
+'''
+
+import time
+
+import glfw
+import glm
+import numpy as np
+
+import constants
+from app_vars import APP_VARS
+from benchmarks.vertex_upload import _create_hidden_context
+from render_context import RenderContext
+from utils.geometry import Vec3
+
+FRAMES = 200
+
+def _per_shape_values() -> tuple:
+    ''' The old path: what ShapeRenderer.render computed for every shape, before uploading it '''
+    camera = APP_VARS.camera
+    mat_view = np.array(glm.lookAt(glm.vec3(*camera.transform.translation), glm.vec3(
+        *camera.transform.translation) + camera.cameraFront, camera.cameraUp))
+    mat_projection = np.array(glm.perspective(glm.radians(
+        camera.fov), constants.WINDOW_SIZE[0]/constants.WINDOW_SIZE[1], 0.1, 1000.0))
+
+    config = APP_VARS.lighting_config
+    GKa = Vec3(config.Ka_x, config.Ka_y, config.Ka_z)
+    GKd = Vec3(config.Kd_x, config.Kd_y, config.Kd_z)
+    GKs = Vec3(config.Ks_x, config.Ks_y, config.Ks_z)
+    if APP_VARS.last_bullet:
+        bullet_position = APP_VARS.last_bullet.transform.translation.values.astype(np.float32)
+    else:
+        bullet_position = Vec3(0, -1000, 0).values.astype(np.float32)
+    light_position = config.light_position.values.astype(np.float32)
+    camera_position = camera.transform.translation.values.astype(np.float32)
+    return mat_view, mat_projection, GKa, GKd, GKs, config.Ns, bullet_position, light_position, camera_position
+
+def _per_frame_values(context: RenderContext) -> tuple:
+    ''' The new path: the renderers just read the values from the context '''
+    return context.view, context.projection, context.GKa, context.GKd, context.GKs, context.GNs, context.bullet_position, context.light_position, context.camera_position
+
+def main():
+    _create_hidden_context()
+    APP_VARS.world.setup()
+
+    shape_count = sum(len(element._shape_renderers) for element in APP_VARS.world.elements)
+    context = RenderContext()
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for _ in range(shape_count):
+            _per_shape_values()
+    per_shape_time = (time.perf_counter() - start) / FRAMES
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        context.update(APP_VARS.camera, APP_VARS.lighting_config, APP_VARS.last_bullet)
+        for _ in range(shape_count):
+            _per_frame_values(context)
+    per_frame_time = (time.perf_counter() - start) / FRAMES
+
+    print(f'default scene: {len(APP_VARS.world.elements)} elements, {shape_count} shapes')
+    print(f'{"path":<24}{"ms/frame":>10}{"us/shape":>10}')
+    print(f'{"per shape (old)":<24}{per_shape_time*1000:>10.3f}{per_shape_time/shape_count*1e6:>10.2f}')
+    print(f'{"RenderContext (new)":<24}{per_frame_time*1000:>10.3f}{per_frame_time/shape_count*1e6:>10.2f}')
+    print(f'speedup: {per_shape_time/per_frame_time:.1f}x')
+
+    glfw.terminate()
+
+if __name__ == '__main__':
+    main()
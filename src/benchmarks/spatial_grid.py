@@ -0,0 +1,107 @@
+'''
+Benchmark: spatial queries over 10k spawned elements, scanning World.elements vs querying World.spatial_grid.
+The results of both are compared, so the benchmark also checks the grid.
+
+Elements without shapes are spawned, so no OpenGL context is needed.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.spatial_grid
+'''
+
+import random
+import time
+
+import numpy as np
+
+import constants
+from objects.element import Element
+from objects.world import World
+from transform import Transform
+from utils.geometry import Vec3
+
+ELEMENT_COUNT = 10_000
+QUERIES = 50
+MOVED_PER_FRAME = 1_000
+
+def _random_point() -> Vec3:
+    half = constants.WORLD_SIZE / 2
+    return Vec3(random.uniform(-half, half), random.uniform(0, 3), random.uniform(-half, half))
+
+def _spawn_elements(world: World):
+    for index in range(ELEMENT_COUNT):
+        scale = random.uniform(0.1, 0.5)
+        world.spawn(Element(f'Element_{index}', shape_specs=[], transform=Transform(translation=_random_point(), scale=Vec3(scale, scale, scale))))
+
+def _scan_radius(world: World, center: Vec3, radius: float) -> list[Element]:
+    ''' The list scan the rays did: distance from every element to the point '''
+    return [ element for element in world.elements if (element.center - center).magnitude() <= element.pseudo_hitbox_distance + radius ]
+
+def _scan_aabb(world: World, aabb_min: np.ndarray, aabb_max: np.ndarray) -> list[Element]:
+    hits = []
+    for element in world.elements:
+        center = element.center.values
+        if np.linalg.norm(center - np.clip(center, aabb_min, aabb_max)) <= element.pseudo_hitbox_distance:
+            hits.append(element)
+    return hits
+
+def _scan_segment(world: World, start: np.ndarray, end: np.ndarray) -> list[Element]:
+    direction = end - start
+    hits = []
+    for element in world.elements:
+        center = element.center.values
+        t = np.clip((center - start) @ direction / (direction @ direction), 0, 1)
+        if np.linalg.norm(center - (start + t * direction)) <= element.pseudo_hitbox_distance:
+            hits.append(element)
+    return hits
+
+def _time(name: str, scan, query, arguments: list[tuple]):
+    start = time.perf_counter()
+    scan_results = [ scan(*args) for args in arguments ]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    query_results = [ query(*args) for args in arguments ]
+    query_time = time.perf_counter() - start
+
+    for scanned, queried in zip(scan_results, query_results):
+        assert { id(element) for element in scanned } == { id(element) for element in queried }, f'{name}: the grid and the list scan disagree'
+
+    hits = sum(len(result) for result in query_results) / len(arguments)
+    print(f'{name:<10}{scan_time / len(arguments) * 1000:>12.3f}{query_time / len(arguments) * 1000:>12.3f}{scan_time / query_time:>10.1f}x{hits:>10.1f}')
+
+def main():
+    random.seed(0)
+    world = World()
+    _spawn_elements(world)
+    grid = world.spatial_grid
+    print(f'{len(world.elements)} elements, {len(grid.cells)} cells, {len(grid.oversized)} oversized')
+
+    print(f'{"query":<10}{"scan (ms)":>12}{"grid (ms)":>12}{"speedup":>11}{"hits":>10}')
+    points = [ (_random_point(), 0) for _ in range(QUERIES) ]
+    _time('point', lambda center, radius: _scan_radius(world, center, radius), grid.query_radius, points)
+
+    spheres = [ (_random_point(), 2) for _ in range(QUERIES) ]
+    _time('radius', lambda center, radius: _scan_radius(world, center, radius), grid.query_radius, spheres)
+
+    boxes = []
+    for _ in range(QUERIES):
+        corner = _random_point().values
+        boxes.append((corner, corner + np.array([3, 1, 3])))
+    _time('aabb', lambda aabb_min, aabb_max: _scan_aabb(world, aabb_min, aabb_max), grid.query_aabb, boxes)
+
+    segments = []
+    for _ in range(QUERIES):
+        start = _random_point().values
+        segments.append((start, start + np.random.uniform(-10, 10, 3)))
+    _time('segment', lambda start, end: _scan_segment(world, start, end), grid.query_segment, segments)
+
+    # Reindexing cost when some elements move every frame (World._update_elements calls update for every element)
+    start = time.perf_counter()
+    for element in random.sample(world.elements, MOVED_PER_FRAME):
+        element.transform.translation += Vec3(1, 0, 1)
+    for element in world.elements:
+        grid.update(element)
+    print(f'Reindexing {ELEMENT_COUNT} elements ({MOVED_PER_FRAME} moved): {(time.perf_counter() - start) * 1000:.2f} ms')
+
+if __name__ == '__main__':
+    main()
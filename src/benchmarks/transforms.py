@@ -0,0 +1,73 @@
+'''
+Benchmark: model matrices of 10k transforms, each computed on access with its MatrixCache (Transform.calc_model_matrix)
+vs one TransformStore.update for all of them, when every transform moved, some moved and none moved.
+The matrices of both are compared, so the benchmark also checks the store.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.transforms
+'''
+
+import random
+import time
+
+import numpy as np
+
+from transform import Transform
+from transform_store import TransformStore
+from utils.geometry import Vec3
+
+TRANSFORM_COUNT = 10_000
+FRAMES = 5
+
+def _random_vec3(low: float, high: float) -> Vec3:
+    return Vec3(random.uniform(low, high), random.uniform(low, high), random.uniform(low, high))
+
+def _random_transform() -> Transform:
+    return Transform(translation=_random_vec3(-50, 50), rotation=_random_vec3(-3, 3), scale=_random_vec3(0.1, 2))
+
+def _move(transforms: list[Transform], moved: int):
+    for transform in random.sample(transforms, moved):
+        transform.translation.x += 0.1
+        transform.rotation.y += 0.01
+
+def _time(name: str, moved: int):
+    random.seed(0)
+    cached = [ _random_transform() for _ in range(TRANSFORM_COUNT) ]
+    random.seed(0)
+    stored = [ _random_transform() for _ in range(TRANSFORM_COUNT) ]
+    store = TransformStore()
+    for transform in stored:
+        store.add(transform)
+    for transform in cached:
+        transform.model_matrix # Warm the caches, like a frame where nothing moved
+
+    cache_time = store_time = 0.0
+    for frame in range(FRAMES):
+        random.seed(frame)
+        _move(cached, moved)
+        random.seed(frame)
+        _move(stored, moved)
+
+        start = time.perf_counter()
+        for transform in cached:
+            transform.model_matrix
+        cache_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.update()
+        store_time += time.perf_counter() - start
+
+    assert np.allclose([ transform.model_matrix for transform in cached ], [ transform.model_matrix for transform in stored ]), \
+        f'{name}: the store and the MatrixCache disagree'
+
+    print(f'{name:<10}{cache_time / FRAMES * 1000:>16.2f}{store_time / FRAMES * 1000:>14.2f}{cache_time / store_time:>10.1f}x')
+
+def main():
+    print(f'{TRANSFORM_COUNT} transforms, {FRAMES} frames')
+    print(f'{"moved":<10}{"MatrixCache (ms)":>16}{"store (ms)":>14}{"speedup":>11}')
+    _time('all', TRANSFORM_COUNT)
+    _time('10%', TRANSFORM_COUNT // 10)
+    _time('none', 0)
+
+if __name__ == '__main__':
+    main()
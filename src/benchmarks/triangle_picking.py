@@ -0,0 +1,71 @@
+'''
+Benchmark: triangle-precise ray picking on a model, testing every triangle vs going down the BVHs of its meshes.
+The results of both are compared, so the benchmark also checks the BVH.
+
+The meshes are built from the same (indexed) vertex data the elements upload, without an OpenGL context.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.triangle_picking [model.obj]
+'''
+
+import sys
+import time
+
+import numpy as np
+
+from bvh import BVH, intersect_nearest, ray_triangle_intersections
+from wavefront.model_reader import ModelReader
+
+RAYS = 500
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'models/alvo2.obj'
+    model = ModelReader().load_model_from_file(filename)
+
+    # One BVH per object, like one mesh per shape
+    meshes = []
+    for object in model.objects:
+        vertices, indices = object.get_vertex_data(with_position=True, with_texture_coords=False, with_normals=False, indexed=True)
+        if vertices.ndim == 2 and len(vertices) > 0:
+            meshes.append((vertices, indices))
+
+    start = time.perf_counter()
+    bvhs = [ BVH.from_mesh_data(vertices, indices) for vertices, indices in meshes ]
+    build_time = time.perf_counter() - start
+
+    all_triangles = [ vertices.astype(np.float64)[indices.reshape(-1, 3)] for vertices, indices in meshes ]
+    triangle_count = sum(len(triangles) for triangles in all_triangles)
+    print(f'{filename}: {len(meshes)} meshes, {triangle_count} triangles, BVHs built in {build_time * 1000:.1f} ms')
+
+    # Rays from around the model to random points inside its bounding box
+    rng = np.random.default_rng(0)
+    positions = np.concatenate([ vertices for vertices, _ in meshes ])
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    targets = rng.uniform(low, high, (RAYS, 3))
+    origins = targets + rng.normal(size=(RAYS, 3)) * np.linalg.norm(high - low)
+    directions = targets - origins
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    brute_force_distances = []
+    for origin, direction in zip(origins, directions):
+        brute_force_distances.append(min(ray_triangle_intersections(origin, direction, triangles)[0].min() for triangles in all_triangles))
+    brute_force_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bvh_distances = []
+    for origin, direction in zip(origins, directions):
+        hit = intersect_nearest(bvhs, origin, direction) # Like Element.raycast_triangles
+        bvh_distances.append(hit[1].distance if hit is not None else np.inf)
+    bvh_time = time.perf_counter() - start
+
+    assert np.allclose(brute_force_distances, bvh_distances), 'The BVH and the brute force disagree'
+
+    hits = np.isfinite(bvh_distances).sum()
+    print(f'{"":<14}{"per ray (ms)":>14}')
+    print(f'{"brute force":<14}{brute_force_time / RAYS * 1000:>14.3f}')
+    print(f'{"BVH":<14}{bvh_time / RAYS * 1000:>14.3f}')
+    print(f'{brute_force_time / bvh_time:.1f}x faster, {hits}/{RAYS} rays hit the model')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+'''
+Benchmark: vertex buffer upload throughput (MB/s) of the old ctypes path vs the zero-copy VertexBuffer,
+for every model in models/ plus a large synthetic mesh. Also measures partial updates (VertexBuffer.update).
+
+Needs an OpenGL context: a hidden GLFW window is created.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.vertex_upload
+'''
+
+import glob
+import time
+
+import glfw
+import numpy as np
+from OpenGL import GL as gl
+
+from gl_abstractions.layout import Layout
+from gl_abstractions.vertex_buffer import VertexBuffer
+from wavefront.model_reader import ModelReader
+
+REPEATS = 5
+SYNTHETIC_VERTICES = 1_000_000
+UPDATE_VERTICES = 1024
+
+LAYOUT = Layout([
+    ('a_Position', 3),
+    ('a_TexCoord', 2),
+    ('a_Normal', 3)
+])
+
+def _create_hidden_context():
+    ''' Creates an invisible window, just to have an OpenGL context '''
+    glfw.init()
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    window = glfw.create_window(64, 64, 'vertex_upload benchmark', None, None)
+    if not window:
+        raise RuntimeError('Could not create an OpenGL context')
+    glfw.make_context_current(window)
+
+def _ctypes_upload(data: np.ndarray):
+    ''' The old path: flatten, then one Python argument per float to build a ctypes array '''
+    vbo = gl.glGenBuffers(1)
+    flattened_data = data.flatten()
+    FloatVec = gl.GLfloat * len(flattened_data)
+    data_ptr = FloatVec(*flattened_data)
+
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, vbo)
+    gl.glBufferData(gl.GL_ARRAY_BUFFER, flattened_data.nbytes, data_ptr, gl.GL_STATIC_DRAW)
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+    gl.glDeleteBuffers(1, [vbo])
+
+def _zero_copy_upload(data: np.ndarray):
+    ''' The new path: the array is handed directly to glBufferData '''
+    VertexBuffer(LAYOUT, data).delete()
+
+def _best_time(upload, data: np.ndarray) -> float:
+    ''' Returns the best time (in seconds) of REPEATS uploads, waiting for the driver to finish each one '''
+    best = float('inf')
+    for _ in range(REPEATS):
+        gl.glFinish()
+        start = time.perf_counter()
+        upload(data)
+        gl.glFinish()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _throughput(data: np.ndarray, seconds: float) -> float:
+    ''' MB/s '''
+    return data.nbytes / seconds / 1e6
+
+def main():
+    _create_hidden_context()
+
+    meshes: list[tuple[str, np.ndarray]] = []
+    for filename in sorted(glob.glob('models/*.obj')):
+        model = ModelReader().load_model_from_file(filename)
+        vertices = [ object.expand_faces_to_vertex_array() for object in model.objects ]
+        meshes.append((filename, np.concatenate(vertices) if vertices else np.zeros((0, 8), dtype=np.float32)))
+    meshes.append(('synthetic', np.random.default_rng(0).random((SYNTHETIC_VERTICES, 8), dtype=np.float32)))
+
+    print(f'{"mesh":<24}{"vertices":>10}{"MB":>8}{"ctypes (MB/s)":>15}{"zero-copy (MB/s)":>18}{"speedup":>10}')
+    for name, data in meshes:
+        if len(data) == 0:
+            continue
+        ctypes_time = _best_time(_ctypes_upload, data)
+        zero_copy_time = _best_time(_zero_copy_upload, data)
+        print(f'{name:<24}{len(data):>10}{data.nbytes/1e6:>8.2f}{_throughput(data, ctypes_time):>15.1f}{_throughput(data, zero_copy_time):>18.1f}{ctypes_time/zero_copy_time:>9.1f}x')
+
+    # Partial updates of a dynamic buffer
+    _, data = meshes[-1]
+    vertex_buffer = VertexBuffer(LAYOUT, data, usage=gl.GL_DYNAMIC_DRAW)
+    update = data[:UPDATE_VERTICES]
+    def _update(update: np.ndarray):
+        for offset in range(0, len(data) - len(update), len(data) // 100):
+            vertex_buffer.update(offset, update)
+    update_time = _best_time(_update, update) / 100
+    print(f'update({UPDATE_VERTICES} vertices): {update_time*1e6:.1f} us, {_throughput(update, update_time):.1f} MB/s')
+    vertex_buffer.delete()
+
+    glfw.terminate()
+
+if __name__ == '__main__':
+    main()
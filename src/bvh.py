@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+
+# Maximum number of triangles in a leaf of the hierarchy
+LEAF_SIZE = 8
+
+# Rays parallel to a triangle (or almost) don't hit it
+PARALLEL_EPSILON = 1e-12
+
+@dataclass
+class TriangleHit:
+    ''' Where a ray hits a triangle mesh '''
+    triangle: int # Index of the triangle in the mesh (vertices indices[3*triangle : 3*triangle + 3])
+    distance: float # Along the ray, in units of its direction
+    barycentrics: np.ndarray # Weights of the 3 vertices of the triangle at the hit point (sum 1)
+
+def ray_triangle_intersections(origin: np.ndarray, direction: np.ndarray, triangles: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Möller-Trumbore test of a ray against triangles (N x 3 x 3), all at once.
+    Returns the distance along the ray to each triangle (inf if missed) and the barycentric coordinates u, v of the hits
+    (weights of the second and third vertices).
+    '''
+    edges1 = triangles[:, 1] - triangles[:, 0]
+    edges2 = triangles[:, 2] - triangles[:, 0]
+    p = np.cross(direction, edges2)
+    determinants = np.einsum('ij,ij->i', edges1, p)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse_determinants = 1 / determinants
+        offsets = origin - triangles[:, 0]
+        u = np.einsum('ij,ij->i', offsets, p) * inverse_determinants
+        q = np.cross(offsets, edges1)
+        v = q @ direction * inverse_determinants
+        distances = np.einsum('ij,ij->i', edges2, q) * inverse_determinants
+        hit = (np.abs(determinants) > PARALLEL_EPSILON) & (u >= 0) & (v >= 0) & (u + v <= 1) & (distances >= 0)
+
+    return np.where(hit, distances, np.inf), u, v
+
+def _ray_boxes_ranges(origin: np.ndarray, inverse_direction: np.ndarray, boxes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    ''' Slab test of a ray against axis-aligned boxes (N x 2 x 3: minimum and maximum corners): where it enters and leaves each box (missed if enter > leave) '''
+    t = (boxes - origin) * inverse_direction
+    return t.min(axis=1).max(axis=1), t.max(axis=1).min(axis=1)
+
+def ray_boxes_distances(origin: np.ndarray, inverse_direction: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    ''' Distance along the ray to where it enters each box (N x 2 x 3), 0 if the origin is inside, inf if missed '''
+    t_near, t_far = _ray_boxes_ranges(origin, inverse_direction, boxes)
+    return np.where((t_near <= t_far) & (t_far >= 0), np.maximum(t_near, 0), np.inf)
+
+def _inverse_direction(direction: np.ndarray) -> np.ndarray:
+    ''' Axes the ray is parallel to get a huge inverse instead of inf, so the slab test needs no special case '''
+    return 1 / np.where(direction == 0, PARALLEL_EPSILON, direction)
+
+@dataclass
+class BVH:
+    '''
+    Bounding volume hierarchy of the triangles of a mesh (in model space), to find which triangle a ray hits
+    without testing all of them. Built once per mesh (see Mesh.bvh).
+
+    Binary tree of axis-aligned boxes, stored in flat arrays: the children of the internal node i are
+    node_left[i] and node_left[i] + 1, and leaves (node_left == -1) hold the triangles node_start..node_start + node_count.
+    Rays go down the tree one level at a time, testing all the boxes of a level at once.
+    '''
+    triangles: np.ndarray # T x 3 x 3, sorted so each leaf has a contiguous range
+    triangle_ids: np.ndarray # Index in the mesh of each triangle in 'triangles'
+    node_bounds: np.ndarray # N x 2 x 3: minimum and maximum corners of the box of each node
+    node_left: np.ndarray
+    node_start: np.ndarray
+    node_count: np.ndarray
+
+    @staticmethod
+    def from_mesh_data(positions: np.ndarray, indices: Union[np.ndarray, None] = None) -> 'BVH':
+        ''' Builds the hierarchy of a triangle list: vertex positions (V x 3) and, for indexed geometry, 3 indices per triangle '''
+        if indices is None:
+            indices = np.arange(len(positions) - len(positions) % 3)
+        triangles = np.asarray(positions, dtype=np.float64)[np.asarray(indices[:len(indices) - len(indices) % 3]).reshape(-1, 3)]
+        return BVH.build(triangles)
+
+    @staticmethod
+    def build(triangles: np.ndarray) -> 'BVH':
+        ''' Builds the hierarchy of the triangles (T x 3 x 3), splitting each node at the median of the longest axis of the centroids '''
+        centroids = triangles.mean(axis=1)
+        order = np.arange(len(triangles))
+        node_bounds, node_left, node_start, node_count = [], [], [], []
+
+        def add_node(start: int, count: int) -> int:
+            node_triangles = triangles[order[start:start + count]].reshape(-1, 3)
+            node_bounds.append((node_triangles.min(axis=0), node_triangles.max(axis=0)) if count else np.zeros((2, 3)))
+            node_left.append(-1)
+            node_start.append(start)
+            node_count.append(count)
+            return len(node_left) - 1
+
+        stack = [ add_node(0, len(triangles)) ]
+        while stack:
+            node = stack.pop()
+            start, count = node_start[node], node_count[node]
+            if count <= LEAF_SIZE:
+                continue
+
+            node_centroids = centroids[order[start:start + count]]
+            axis = int(np.argmax(node_centroids.max(axis=0) - node_centroids.min(axis=0)))
+            half = count // 2
+            order[start:start + count] = order[start:start + count][np.argpartition(node_centroids[:, axis], half)]
+
+            node_left[node] = add_node(start, half)
+            add_node(start + half, count - half)
+            stack.extend((node_left[node], node_left[node] + 1))
+
+        return BVH(
+            triangles=triangles[order],
+            triangle_ids=order,
+            node_bounds=np.array(node_bounds).reshape(-1, 2, 3),
+            node_left=np.array(node_left),
+            node_start=np.array(node_start),
+            node_count=np.array(node_count),
+        )
+
+    def intersect(self, origin: np.ndarray, direction: np.ndarray, max_distance: float = np.inf) -> Union[TriangleHit, None]:
+        '''
+        Returns the nearest triangle hit by the ray, up to max_distance, or None.
+        The direction doesn't need to be normalized: distances are in units of its length.
+        '''
+        if len(self.triangles) == 0:
+            return None
+
+        inverse_direction = _inverse_direction(direction)
+
+        leaves = []
+        nodes = np.zeros(1, dtype=np.int64)
+        while nodes.size:
+            t_near, t_far = _ray_boxes_ranges(origin, inverse_direction, self.node_bounds[nodes])
+            nodes = nodes[(t_near <= t_far) & (t_far >= 0) & (t_near <= max_distance)]
+            is_leaf = self.node_left[nodes] < 0
+            leaves.append(nodes[is_leaf])
+            children = self.node_left[nodes[~is_leaf]]
+            nodes = np.concatenate((children, children + 1))
+
+        leaves = np.concatenate(leaves)
+        if leaves.size == 0:
+            return None
+
+        # Triangles of all the leaves the ray goes through, tested at once
+        counts = self.node_count[leaves]
+        candidates = np.repeat(self.node_start[leaves] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        distances, u, v = ray_triangle_intersections(origin, direction, self.triangles[candidates])
+
+        nearest = int(np.argmin(distances))
+        if np.isinf(distances[nearest]) or distances[nearest] > max_distance:
+            return None
+
+        return TriangleHit(
+            triangle=int(self.triangle_ids[candidates[nearest]]),
+            distance=float(distances[nearest]),
+            barycentrics=np.array([1 - u[nearest] - v[nearest], u[nearest], v[nearest]]),
+        )
+
+def intersect_nearest(bvhs: list[BVH], origin: np.ndarray, direction: np.ndarray, max_distance: float = np.inf) -> Union[tuple[int, TriangleHit], None]:
+    '''
+    Returns the nearest hit among several hierarchies in the same space (e.g. the meshes of an element, which share its transform)
+    and the index of the one that was hit, or None.
+    Their root boxes are tested at once, and they are searched nearest box first, until the boxes left are farther than the best hit.
+    '''
+    non_empty = [ index for index, bvh in enumerate(bvhs) if len(bvh.triangles) > 0 ]
+    if not non_empty:
+        return None
+
+    box_distances = ray_boxes_distances(origin, _inverse_direction(direction), np.array([ bvhs[index].node_bounds[0] for index in non_empty ]))
+
+    best = None
+    for order in np.argsort(box_distances):
+        if np.isinf(box_distances[order]) or box_distances[order] > max_distance:
+            break
+
+        hit = bvhs[non_empty[order]].intersect(origin, direction, max_distance)
+        if hit is not None:
+            best = non_empty[order], hit
+            max_distance = hit.distance
+
+    return best
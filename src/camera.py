@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 import math
 import glm
-from utils.geometry import Vec2, Vec3
+from utils.geometry import Vec3
 import constants
 import glfw
 from line import Line
@@ -16,7 +16,7 @@ from objects.world import World
 from objects.selection_ray import SelectionRay
 
 from input.input_system import INPUT_SYSTEM as IS
-from wavefront.model_reader import ModelReader
+from wavefront.model_cache import MODEL_CACHE
 
 
 @dataclass
@@ -51,10 +51,14 @@ class Camera(Element):
         self.raycast_line_dbg = Line('test_line', ray_selectable=False, ray_destroyable=False)
         self.raycast_line_dbg.shape_specs[0].material.Ka.z = 10
         self.raycast_line_dbg.transform.scale.z = 10
+        self.raycast_line_dbg.transform.translation.y = -0.05 # Just below the eyes
+        self.raycast_line_dbg.transform.parent = self.transform
         # world.spawn(self.raycast_line_dbg)
 
-        self.gun = ModelElement('PlayerGun', model=ModelReader().load_model_from_file('models/gun.obj'), ray_selectable=False, ray_destroyable=False)
+        # The gun follows the camera (its transform is relative to the camera's, see _physics_update)
+        self.gun = ModelElement('PlayerGun', model=MODEL_CACHE.load_model('models/gun.obj'), ray_selectable=False, ray_destroyable=False)
         self.gun.transform.scale *= 0.1
+        self.gun.transform.parent = self.transform
         world.spawn(self.gun)
         return super().on_spawned(world)
 
@@ -111,8 +115,7 @@ class Camera(Element):
                 direction=Vec3(*self.cameraFront).normalized()
             )
 
-            self.gun.transform.translation -= Vec3(*self.cameraFront) * 0.1
-            self.gun.transform.translation -= Vec3(*self.cameraUp) * 0.05
+            self.gun.transform.translation -= Vec3(0, 0.05, 0.1) # Recoil: back and down, relative to the camera
             self.pitch += 3
             self._update_from_pitch_yaw()
 
@@ -185,16 +188,6 @@ class Camera(Element):
         self._update_from_pitch_yaw
 
     def _physics_update(self, delta_time: float):
-        self.raycast_line_dbg.transform.translation.xz = self.transform.translation.xz
-        self.raycast_line_dbg.transform.translation.y = self._ground_y - 0.05
-        self.raycast_line_dbg.transform.rotation.xyz = self.transform.rotation.xyz
-
-        # TODO: make all gun logic in one place plz
-        self.gun.transform.rotation.y = self.transform.rotation.y - math.pi/2
-        self.gun.transform.rotation.xz = self.transform.rotation.xz
-        
-      
-
         if IS.just_pressed('ctrl') and Vec3(*self._keyboardMovementInput).magnitude() > 0:
             self._sprinting = True
             self._momentum.max_speed = 0.2
@@ -242,12 +235,15 @@ class Camera(Element):
         if self.transform.translation.y < self._ground_y:
             self.transform.translation.y = self._ground_y
         
-        # TODO: make all gun logic in one place plz
-        self.gun.transform.translation.xz = self.transform.translation.xz + Vec2(1,-1) * (math.sin(self.transform.translation.x) + math.cos(self.transform.translation.z))/150 + Vec2(-1,1) * (math.cos(self.transform.translation.x) + math.sin(self.transform.translation.z))/150
-        self.gun.transform.translation.y = self.transform.translation.y - 0.25 + (math.sin(self.transform.translation.x) + math.sin(self.transform.translation.z))/40
-        self.gun.transform.translation.xyz += (Vec3(*self.cameraFront)) / 3
-        
-        if IS.is_pressed('f'):
-            self.gun.transform.rotation.y = self.transform.rotation.y
+        # Gun, relative to the camera (front is +z): a bit below and in front of it, swaying as the camera walks
+        x, z = self.transform.translation.x, self.transform.translation.z
+        self.gun.transform.translation.xyz = Vec3(
+            (math.sin(x) + math.cos(z) - math.cos(x) - math.sin(z)) / 150,
+            -0.25 + (math.sin(x) + math.sin(z)) / 40,
+            1/3,
+        )
+
+        # Model (.obj) is rotated 90 degrees around the y axis, unless 'f' is pressed
+        self.gun.transform.rotation.y = 0 if IS.is_pressed('f') else -math.pi/2
 
         return super()._physics_update(delta_time)
@@ -8,6 +8,8 @@ WINDOW_SIZE = (
     int(MOCK_RESOLUTION.x-GUI_WIDTH), 
     int(MOCK_RESOLUTION.y)
 )
+# Generally, the skybox will hide the background color
+BACKGROUND_COLOR = (32/255, 31/255, 65/255)
 GL_DIM = 4 # OpenGL works in 4D space
 SCREEN_RECT = Rect2(-1, -1, 1, 1)
 FLOAT_SIZE = ctypes.sizeof(ctypes.c_float)
@@ -0,0 +1,48 @@
+'''
+View-frustum culling with bounding spheres, vectorized with NumPy, and helpers to move bounding volumes to world space.
+'''
+
+import numpy as np
+
+def frustum_planes(view_projection: np.ndarray) -> np.ndarray:
+    '''
+    Extracts the 6 frustum planes (left, right, bottom, top, near, far) from a view-projection matrix
+    that maps world positions to clip space (clip = view_projection @ position).
+    Each row is (a, b, c, d), normalized, with the inside of the frustum where a*x + b*y + c*z + d >= 0.
+    '''
+    rows = np.asarray(view_projection, dtype=np.float64)
+    planes = np.array([
+        rows[3] + rows[0],
+        rows[3] - rows[0],
+        rows[3] + rows[1],
+        rows[3] - rows[1],
+        rows[3] + rows[2],
+        rows[3] - rows[2],
+    ])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+def spheres_in_frustum(planes: np.ndarray, centers: np.ndarray, radii: np.ndarray) -> np.ndarray:
+    '''
+    Returns a boolean mask of the spheres (centers: N x 3, radii: N) that are at least partially inside the frustum.
+    '''
+    distances = centers @ planes[:, :3].T + planes[:, 3] # N x 6, signed distance of each center to each plane
+    return np.all(distances >= -radii[:, None], axis=1)
+
+def transform_sphere(center: np.ndarray, radius: float, model_matrix: np.ndarray) -> tuple[np.ndarray, float]:
+    '''
+    Returns a sphere containing the given (local) sphere after the model matrix is applied.
+    The radius is scaled by the biggest scale of the matrix, so it stays conservative with non-uniform scales.
+    '''
+    linear = model_matrix[:3, :3]
+    world_center = linear @ center + model_matrix[:3, 3]
+    world_radius = radius * np.linalg.norm(linear, axis=0).max()
+    return world_center, world_radius
+
+def transform_aabb(aabb_min: np.ndarray, aabb_max: np.ndarray, model_matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    ''' Returns the axis-aligned box containing the given (local) box after the model matrix is applied '''
+    linear = model_matrix[:3, :3]
+    center = (aabb_min + aabb_max) / 2
+    extents = (aabb_max - aabb_min) / 2
+    world_center = linear @ center + model_matrix[:3, 3]
+    world_extents = np.abs(linear) @ extents
+    return world_center - world_extents, world_center + world_extents
@@ -0,0 +1,13 @@
+import os
+
+import glfw
+from OpenGL import platform
+
+def has_current_context() -> bool:
+    '''
+    Whether an OpenGL context is current: a GLFW window's (see window.create_window)
+    or, when PyOpenGL runs on EGL (PYOPENGL_PLATFORM=egl), an EGL context without a window (see window.create_egl_context)
+    '''
+    if os.environ.get('PYOPENGL_PLATFORM') == 'egl':
+        return bool(platform.PLATFORM.GetCurrentContext())
+    return bool(glfw.get_current_context())
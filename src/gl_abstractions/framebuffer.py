@@ -0,0 +1,58 @@
+from OpenGL import GL as gl
+
+import numpy as np
+
+from gl_abstractions.stats import GL_STATS
+
+class Framebuffer:
+    '''
+    Offscreen render target: an RGBA color renderbuffer and a depth renderbuffer (framebuffer object).
+    Usage (see headless.py):
+        framebuffer = Framebuffer(width, height)
+        framebuffer.bind() # Draws go to it instead of the window, until unbind
+        ...
+        pixels = framebuffer.read_pixels() # height x width x 4 uint8, top row first (like an image file)
+    '''
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+        self.fbo = gl.glGenFramebuffers(1)
+        self.color_rbo, self.depth_rbo = gl.glGenRenderbuffers(2)
+
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.color_rbo)
+        gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_RGBA8, width, height)
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.depth_rbo)
+        gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_DEPTH_COMPONENT24, width, height)
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, 0)
+
+        self.bind()
+        gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0, gl.GL_RENDERBUFFER, self.color_rbo)
+        gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, gl.GL_DEPTH_ATTACHMENT, gl.GL_RENDERBUFFER, self.depth_rbo)
+        status = gl.glCheckFramebufferStatus(gl.GL_FRAMEBUFFER)
+        self.unbind()
+        assert status == gl.GL_FRAMEBUFFER_COMPLETE, f'Framebuffer {width}x{height} is incomplete (status {status:#x})'
+
+    def bind(self):
+        ''' Makes the next draws render into this framebuffer (and sets the viewport to its size) '''
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
+        gl.glViewport(0, 0, self.width, self.height)
+        GL_STATS.current.calls_issued += 2
+
+    def unbind(self):
+        ''' Makes the next draws render into the window again '''
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
+        GL_STATS.current.calls_issued += 1
+
+    def read_pixels(self) -> np.ndarray:
+        ''' Copies the color buffer to the CPU (waits for the GPU to finish drawing it) '''
+        self.bind()
+        gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
+        data = gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE)
+        GL_STATS.current.calls_issued += 2
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 4)
+        return pixels[::-1] # OpenGL's first row is the bottom one
+
+    def delete(self):
+        gl.glDeleteFramebuffers(1, [self.fbo])
+        gl.glDeleteRenderbuffers(2, [self.color_rbo, self.depth_rbo])
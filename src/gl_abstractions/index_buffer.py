@@ -0,0 +1,33 @@
+from OpenGL import GL as gl
+
+import numpy as np
+from utils.logger import LOGGER
+
+class IndexBuffer:
+    ''' Element array buffer: the indices of the vertices (in a VertexBuffer) to draw, as unsigned ints. '''
+    def __init__(self, data: np.ndarray, usage: int = gl.GL_STATIC_DRAW):
+        self.ibo = gl.glGenBuffers(1)
+
+        assert isinstance(data, np.ndarray), f'Only numpy arrays are supported, got {type(data)}'
+        assert data.ndim == 1, f'Indices must be 1D, got {data.ndim}D'
+        self.data = np.ascontiguousarray(data, dtype=np.uint32)
+        self.count = len(self.data)
+
+        self.bind()
+        gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, self.data.nbytes, self.data, usage)
+        self.unbind()
+
+    def bind(self):
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+
+    def unbind(self):
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        gl.glDeleteBuffers(1, [self.ibo])
+        self.ibo = 0
+
+    def __del__(self):
+        # gl.glDeleteBuffers(1, [self.ibo])
+        # LOGGER.log_warning(f'IndexBuffer(id={id(self)}) not deleted') # TODO: cleanup
+        pass
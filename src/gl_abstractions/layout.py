@@ -1,18 +1,48 @@
 import ctypes
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Union
+from weakref import WeakValueDictionary
 
 import numpy as np
 from utils.logger import LOGGER
 
 from constants import FLOAT_SIZE
+
+@dataclass
+class VertexDataValidation:
+    '''
+    How much Layout.assert_data_ok checks (set by app_vars' DebugOptions.validate_vertex_data).
+    With full_checks, every attribute of every vertex is checked, not only the dtype and shape (slow).
+    Changing it makes the layouts forget the arrays they accepted, so they are checked again.
+    '''
+    _full_checks: bool = False
+    generation: int = 0 # Bumped whenever full_checks changes
+
+    @property
+    def full_checks(self) -> bool:
+        return self._full_checks
+
+    @full_checks.setter
+    def full_checks(self, value: bool):
+        if value != self._full_checks:
+            self._full_checks = value
+            self.generation += 1
+
+VERTEX_DATA_VALIDATION = VertexDataValidation()
     
 @dataclass
 class Layout:
     '''
     Class responsible for describing the layout of the vertex array (each geometry object is a vertex array).
     Currently only supports floats.
+    Attributes with more than 4 floats (e.g. a mat4) take one attribute location per 4 floats.
     '''
     attributes: list[tuple[str, int]] # Example: [('position', 3), ('tex_coord', '2')]
+    per_instance: bool = False # If set, the attributes advance once per instance instead of once per vertex (instanced rendering)
+
+    # Arrays that already passed assert_data_ok, by id (entries vanish with the arrays, so ids are never mistaken)
+    _validated: WeakValueDictionary = field(default_factory=WeakValueDictionary, init=False, repr=False, compare=False)
+    _validated_generation: int = field(default=0, init=False, repr=False, compare=False) # VERTEX_DATA_VALIDATION.generation they were checked with
 
     def __post_init__(self):
         '''
@@ -26,31 +56,33 @@ class Layout:
 
     def assert_data_ok(self, data: np.ndarray) -> bool:
         '''
-        Checks if the data is compatible with the layout.
+        Checks if the data is compatible with the layout (dtype, number of dimensions and stride).
+        If VERTEX_DATA_VALIDATION.full_checks is set, every attribute of every vertex is checked too.
+        Arrays are only checked once: shared model data is not checked again for every new element.
         '''
         # LOGGER.log_trace(f'Checking data compatibility with layout: {self}')
-
         SUPPORTED_DTYPES = [np.float32, np.float64]
 
         assert isinstance(data, np.ndarray), f'Only numpy arrays are supported, got {type(data)}'
+        if self._validated_generation != VERTEX_DATA_VALIDATION.generation:
+            self._validated.clear()
+            self._validated_generation = VERTEX_DATA_VALIDATION.generation
+        if self._validated.get(id(data)) is data:
+            return True
+
         assert data.dtype in SUPPORTED_DTYPES, f'Only {SUPPORTED_DTYPES=} data types are supported, got {data.dtype}'
         assert len(data.shape) == 2, f'Data must be 2D (series of attributes), got {len(data.shape)}D'
         assert data.shape[1] * FLOAT_SIZE == self.calc_stride(), f'Data must have a stride of {self.calc_stride()}, got {data.shape[1]}'
 
-        # In case it has been sent with other types such as float64
-        data = data.astype(np.float32) 
-
-        for vertex in range(data.shape[0]):
+        if VERTEX_DATA_VALIDATION.full_checks:
             offset = 0
             for name, count in self.attributes:
-                vertex_attrib_values = data[vertex, offset:offset+count]
-
-                # print(f'{name}: {vertex_attrib_values}')
-                assert len(vertex_attrib_values.shape) == 1, f'Attribute values must be 1D, got {len(vertex_attrib_values.shape)}D'
-                assert vertex_attrib_values.shape[0] == count, f'Attribute values must have a length of {count}, got {vertex_attrib_values.shape[0]}'
-
+                attrib_values = data[:, offset:offset+count]
+                assert attrib_values.shape[1] == count, f'Attribute {name} values must have a length of {count}, got {attrib_values.shape[1]}'
+                assert np.isfinite(attrib_values).all(), f'Attribute {name} has non-finite values (NaN or infinity)'
                 offset += count
 
+        self._validated[id(data)] = data
         return True
 
     def calc_stride(self) -> int:
@@ -75,5 +107,23 @@ class Layout:
 
         return ctypes.cast(offset, ctypes.c_void_p)
 
+    def get_columns(self, name: str) -> Union[slice, None]:
+        '''
+        Returns the columns of the attribute with the given name in the vertex data (None if the layout doesn't have it).
+        '''
+        offset = 0
+        for name_, count in self.attributes:
+            if name == name_:
+                return slice(offset, offset + count)
+            offset += count
+
+        return None
+
+    def count_locations(self) -> int:
+        '''
+        Returns how many attribute locations the layout takes.
+        '''
+        return sum((count + 3) // 4 for name, count in self.attributes)
+
     def __repr__(self) -> str:
-        return f'Layout(attributes={self.attributes})'
\ No newline at end of file
+        return f'Layout(attributes={self.attributes}, per_instance={self.per_instance})'
\ No newline at end of file
@@ -0,0 +1,202 @@
+from typing import TYPE_CHECKING
+
+from OpenGL import GL as gl
+
+import numpy as np
+from utils.logger import LOGGER
+
+from gl_abstractions.index_buffer import IndexBuffer
+from gl_abstractions.layout import Layout
+from gl_abstractions.stats import GL_STATS
+from gl_abstractions.vertex_array import VertexArray
+from gl_abstractions.vertex_buffer import VertexBuffer
+
+if TYPE_CHECKING:
+    from bvh import BVH
+
+# Per-instance data of instanced draws: the model matrix of each instance (read as a_Model by the instanced shaders)
+INSTANCE_LAYOUT = Layout([('a_Model', 16)], per_instance=True)
+MIN_INSTANCE_CAPACITY = 16
+
+class Mesh:
+    '''
+    Geometry on the GPU: a VertexArray with its VertexBuffer and, for indexed geometry, its IndexBuffer.
+    For instanced draws, a per-instance VertexBuffer (INSTANCE_LAYOUT) is added to the VertexArray when first needed.
+    Its local bounding volumes (AABB and sphere) are computed once, when it is created (used for frustum culling).
+    The BVH of its triangles (used for ray picking) is built the first time it is needed.
+    '''
+    def __init__(self, layout: Layout, vertices: np.ndarray, indices: np.ndarray = None, usage: int = gl.GL_STATIC_DRAW):
+        # Keep references to the source arrays: the registry uses their ids as keys, so they must outlive the mesh
+        self.vertices = vertices
+        self.indices = indices
+        self.layout = layout
+        self.ref_count = 0
+
+        self.vao = VertexArray()
+        self.vao.bind()
+        self.vbo = VertexBuffer(layout=layout, data=vertices, usage=usage)
+        self.vao.upload_vertex_buffer(self.vbo)
+
+        self.ibo = None
+        if indices is not None:
+            self.ibo = IndexBuffer(indices, usage=usage)
+            self.vao.upload_index_buffer(self.ibo)
+
+        self.instance_buffer: VertexBuffer = None
+        self.instance_capacity = 0
+
+        self._calc_bounds()
+        self._bvh: 'BVH' = None
+
+    def _calc_bounds(self):
+        '''
+        Computes the local (model space) bounding volumes of the mesh: an AABB and a sphere around its center.
+        Meshes without positions get an infinite sphere (never culled).
+        '''
+        position_columns = self.layout.get_columns('a_Position')
+        if position_columns is None or self.vertex_count == 0:
+            self.aabb_min = np.full(3, -np.inf, dtype=np.float32)
+            self.aabb_max = np.full(3, np.inf, dtype=np.float32)
+            self.sphere_center = np.zeros(3, dtype=np.float32)
+            self.sphere_radius = np.inf
+            return
+
+        positions = np.asarray(self.vertices[:, position_columns], dtype=np.float32)
+        self.aabb_min = positions.min(axis=0)
+        self.aabb_max = positions.max(axis=0)
+        self.sphere_center = (self.aabb_min + self.aabb_max) / 2
+        self.sphere_radius = float(np.linalg.norm(positions - self.sphere_center, axis=1).max())
+
+    @property
+    def bvh(self) -> 'BVH':
+        ''' Bounding volume hierarchy of the mesh, assuming its vertices (or indices) are a triangle list '''
+        if self._bvh is None:
+            from bvh import BVH
+            self._bvh = BVH.from_mesh_data(self.vertices[:, self.layout.get_columns('a_Position')], self.indices)
+        return self._bvh
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def gpu_bytes(self) -> int:
+        ''' Size of the vertex and index buffers on the GPU '''
+        return self.vertex_count * self.layout.calc_stride() + (self.ibo.data.nbytes if self.ibo is not None else 0)
+
+    def bind(self):
+        self.vao.bind()
+
+    def draw(self, render_mode: int):
+        ''' Draws the whole mesh (the VAO must be bound) '''
+        if self.ibo is not None:
+            gl.glDrawElements(render_mode, self.ibo.count, gl.GL_UNSIGNED_INT, None)
+        else:
+            gl.glDrawArrays(render_mode, 0, self.vertex_count)
+        GL_STATS.current.calls_issued += 1
+        GL_STATS.current.draw_calls += 1
+
+    def draw_instanced(self, render_mode: int, model_matrices: np.ndarray):
+        '''
+        Draws the mesh once per model matrix, with a single draw call (the VAO must be bound).
+        model_matrices has one row of 16 floats per instance, laid out like u_Model.
+        '''
+        instance_count = len(model_matrices)
+        self._reserve_instances(instance_count)
+        self.instance_buffer.update(0, model_matrices)
+
+        if self.ibo is not None:
+            gl.glDrawElementsInstanced(render_mode, self.ibo.count, gl.GL_UNSIGNED_INT, None, instance_count)
+        else:
+            gl.glDrawArraysInstanced(render_mode, 0, self.vertex_count, instance_count)
+        GL_STATS.current.calls_issued += 2
+        GL_STATS.current.draw_calls += 1
+
+    def _reserve_instances(self, instance_count: int):
+        ''' Makes sure the per-instance buffer can hold instance_count instances, (re)creating it if needed '''
+        if instance_count <= self.instance_capacity:
+            return
+
+        if self.instance_buffer is not None:
+            self.instance_buffer.delete()
+
+        # Grow geometrically, so spawning instances one by one doesn't recreate the buffer every frame
+        self.instance_capacity = max(instance_count, 2 * self.instance_capacity, MIN_INSTANCE_CAPACITY)
+        self.instance_buffer = VertexBuffer(
+            layout=INSTANCE_LAYOUT,
+            data=np.zeros((self.instance_capacity, 16), dtype=np.float32),
+            usage=gl.GL_STREAM_DRAW
+        )
+        # Always right after the vertex attributes (a_Model is at location 3 for the 3 light_texture attributes)
+        self.vao.upload_vertex_buffer(self.instance_buffer, first_location=self.layout.count_locations())
+        self.vao.bind()
+
+    def delete(self):
+        ''' Frees the GPU buffers (the mesh can't be drawn anymore) '''
+        self.vao.delete()
+        self.vbo.delete()
+        if self.ibo is not None:
+            self.ibo.delete()
+        if self.instance_buffer is not None:
+            self.instance_buffer.delete()
+
+
+class MeshRegistry:
+    '''
+    Reference-counted registry of meshes, so that elements with the same geometry share a single VAO/VBO/IBO.
+    Usage:
+        mesh = MeshRegistry.get_instance().acquire(layout, vertices, indices)
+        ...
+        MeshRegistry.get_instance().release(mesh)
+
+    Meshes are keyed by the identity of the vertex (and index) arrays and by the layout.
+    Model objects memoize their vertex arrays (see Object.get_vertex_data), so every element of a model reuses them.
+    '''
+    _instance: 'MeshRegistry' = None
+    def __init__(self):
+        self.meshes: dict[tuple, Mesh] = {}
+
+        # Counters (read by the GUI thread, so they are kept up to date instead of computed from self.meshes)
+        self.gpu_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(layout: Layout, vertices: np.ndarray, indices: np.ndarray = None) -> tuple:
+        return (id(vertices), id(indices) if indices is not None else None, tuple(map(tuple, layout.attributes)))
+
+    def acquire(self, layout: Layout, vertices: np.ndarray, indices: np.ndarray = None) -> Mesh:
+        ''' Returns the mesh of the given arrays, uploading them to the GPU if no live mesh has them yet '''
+        key = self._key(layout, vertices, indices)
+        mesh = self.meshes.get(key)
+        if mesh is None:
+            self.misses += 1
+            mesh = self.meshes[key] = Mesh(layout, vertices, indices)
+            self.gpu_bytes += mesh.gpu_bytes
+            LOGGER.log_trace(f'Uploaded new mesh ({mesh.vertex_count} vertices, {mesh.gpu_bytes} bytes)', 'MeshRegistry')
+        else:
+            self.hits += 1
+
+        mesh.ref_count += 1
+        return mesh
+
+    def release(self, mesh: Mesh):
+        ''' Releases a mesh returned by acquire(), deleting it from the GPU when it is not used anymore '''
+        assert mesh.ref_count > 0, f'Trying to release a mesh that is not in use'
+        mesh.ref_count -= 1
+        if mesh.ref_count > 0:
+            return
+
+        del self.meshes[self._key(mesh.layout, mesh.vertices, mesh.indices)]
+        self.gpu_bytes -= mesh.gpu_bytes
+        mesh.delete()
+
+    @property
+    def live_meshes(self) -> int:
+        return len(self.meshes)
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
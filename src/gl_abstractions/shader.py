@@ -1,24 +1,38 @@
+from typing import Union
+
 from OpenGL import GL as gl
 import numpy as np
 from utils.geometry import Vec3
 from utils.logger import LOGGER
 
+from gl_abstractions.context import has_current_context
 from gl_abstractions.layout import Layout
-
-import glfw
+from gl_abstractions.stats import GL_STATS
+from gl_abstractions.uniform_buffer import UNIFORM_BLOCK_BINDINGS
 
 class Shader:
+    '''
+    A linked shader program.
+    Uniform locations are resolved once, at link time, and the last value uploaded to each uniform is kept,
+    so uploading the same value again doesn't make any OpenGL call.
+    Its uniform blocks are bound to the binding points of UNIFORM_BLOCK_BINDINGS, to read from the UniformBuffers.
+    '''
+    _current_program: int = None # Program in use (glUseProgram), shared by all shaders
+
     def __init__(self, vert_path: str, frag_path: str, layout: Layout):
-        assert glfw.get_current_context(), f'Trying to create a shader with no OpenGL Context'
+        assert has_current_context(), f'Trying to create a shader with no OpenGL Context'
 
 
         self.frag_path = frag_path
         self.vert_path = vert_path
         self.layout = layout
+        self.instanced_variant: Union['Shader', None] = None # Same shader, reading the model matrix from a per-instance attribute (a_Model)
 
         self.vert_shader = None
         self.frag_shader = None
         self.program = gl.glCreateProgram()
+        self.uniform_locations: dict[str, int] = {}
+        self._uniform_values: dict[int, object] = {} # Last value uploaded to each uniform, by location
         self._compile()
         self._link()
 
@@ -79,6 +93,30 @@ class Shader:
             self._cleanup()
             raise RuntimeError(f'Error linking {self.vert_path} and {self.frag_path}: {log}')
 
+        self._cache_uniform_locations()
+        self._bind_uniform_blocks()
+
+    def _bind_uniform_blocks(self):
+        ''' Makes the uniform blocks of the program read from their binding points (see UniformBuffer) '''
+        for block_name, binding in UNIFORM_BLOCK_BINDINGS.items():
+            block_index = gl.glGetUniformBlockIndex(self.program, block_name)
+            if block_index != gl.GL_INVALID_INDEX:
+                gl.glUniformBlockBinding(self.program, block_index, binding)
+
+    def _cache_uniform_locations(self):
+        ''' Finds the location of all active uniforms of the linked program '''
+        self.uniform_locations.clear()
+        self._uniform_values.clear()
+        for index in range(gl.glGetProgramiv(self.program, gl.GL_ACTIVE_UNIFORMS)):
+            name, size, type = gl.glGetActiveUniform(self.program, index)
+            if isinstance(name, np.ndarray): # Some PyOpenGL/NumPy versions return the raw GLchar buffer
+                name = name.tobytes().split(b'\0', 1)[0]
+            name = name.decode() if isinstance(name, bytes) else name
+            name = name.removesuffix('[0]') # Arrays are reported by their first element
+            self.uniform_locations[name] = gl.glGetUniformLocation(self.program, name)
+
+        LOGGER.log_trace(f'{self.vert_path}: active uniforms {list(self.uniform_locations)}', 'Shader')
+
     def _cleanup(self):
         if self.program is None:
             return
@@ -94,35 +132,61 @@ class Shader:
             self.frag_shader = None
 
         gl.glDeleteProgram(self.program)
+        if Shader._current_program == self.program:
+            Shader._current_program = None
         self.program = None
     
     def __del__(self):
         self._cleanup()
 
     def use(self):
+        if Shader._current_program == self.program:
+            GL_STATS.current.calls_elided += 1
+            return
         gl.glUseProgram(self.program)
+        Shader._current_program = self.program
+        GL_STATS.current.calls_issued += 1
+
+    def _location_to_upload(self, name: str, value) -> int:
+        '''
+        Returns the location of the uniform, or -1 if the upload can be skipped:
+        the uniform is not active (e.g. optimized out) or it already has the value.
+        '''
+        location = self.uniform_locations.get(name, -1)
+        if location == -1 or self._uniform_values.get(location) == value:
+            GL_STATS.current.calls_elided += 1
+            return -1
+
+        self._uniform_values[location] = value
+        GL_STATS.current.calls_issued += 1
+        return location
 
     def upload_uniform_matrix4f(self, name: str, value: np.ndarray):
-        uniform_loc = gl.glGetUniformLocation(self.program, name)
-        gl.glUniformMatrix4fv(uniform_loc, 1, gl.GL_FALSE, value)
+        value = np.ascontiguousarray(value, dtype=np.float32)
+        uniform_loc = self._location_to_upload(name, value.tobytes())
+        if uniform_loc != -1:
+            gl.glUniformMatrix4fv(uniform_loc, 1, gl.GL_FALSE, value)
 
     def upload_uniform_int(self, name: str, value: int):
-        uniform_loc = gl.glGetUniformLocation(self.program, name)
-        gl.glUniform1i(uniform_loc, value)
+        uniform_loc = self._location_to_upload(name, int(value))
+        if uniform_loc != -1:
+            gl.glUniform1i(uniform_loc, value)
 
     def upload_uniform_float(self, name: str, value: float):
-        uniform_loc = gl.glGetUniformLocation(self.program, name)
-        gl.glUniform1f(uniform_loc, value)
+        uniform_loc = self._location_to_upload(name, float(value))
+        if uniform_loc != -1:
+            gl.glUniform1f(uniform_loc, value)
 
     def upload_uniform_vec3(self, name: str, value: np.ndarray):
-        uniform_loc = gl.glGetUniformLocation(self.program, name)
-        gl.glUniform3f(uniform_loc, *value)
+        value = tuple(float(v) for v in value)
+        uniform_loc = self._location_to_upload(name, value)
+        if uniform_loc != -1:
+            gl.glUniform3f(uniform_loc, *value)
 
     def upload_bool(self, name: str, value: bool):
-        uniform_loc = gl.glGetUniformLocation(self.program, name)
-        gl.glUniform1i(uniform_loc, value)
-
-        pass
+        uniform_loc = self._location_to_upload(name, int(value))
+        if uniform_loc != -1:
+            gl.glUniform1i(uniform_loc, value)
 
     def __repr__(self) -> str:
         return f'<Shader v={self.vert_path} f={self.frag_path}>'
@@ -142,6 +206,12 @@ class ShaderDB:
             ])
         )
 
+        self.shaders['light_texture_instanced'] = Shader(
+            'shaders/light_texture_instanced.vert','shaders/light_texture.frag',
+            layout=self.shaders['light_texture'].layout
+        )
+        self.shaders['light_texture'].instanced_variant = self.shaders['light_texture_instanced']
+
     def get_shader(self, name: str):
         return self.shaders[name]
 
@@ -0,0 +1,37 @@
+from dataclasses import dataclass, field
+
+@dataclass
+class GLFrameStats:
+    ''' Counters of the OpenGL calls made in a frame '''
+    calls_issued: int = 0 # State changes and draws actually sent to OpenGL
+    calls_elided: int = 0 # Calls skipped because they wouldn't change anything (e.g. uploading the same uniform value again)
+    draw_calls: int = 0
+    state_changes: int = 0 # Program, mesh (VAO) and texture binds made by the render queue
+    state_changes_avoided: int = 0 # Binds the render queue skipped because the state was already bound
+    visible_shapes: int = 0 # Shapes inside the view frustum (drawn)
+    culled_shapes: int = 0 # Shapes outside the view frustum (skipped before any OpenGL call)
+    visible_elements: int = 0 # Same, counting elements (shapes with the same transform) instead
+    culled_elements: int = 0
+    gpu_pass_ms: dict[str, float] = field(default_factory=dict) # Last GPU time of each render pass (measured a frame or two earlier, see GLTimerQuery)
+    gpu_batch_ms: dict[str, float] = field(default_factory=dict) # Same, by '<pass>/<element>' (with gpu_batch_timers, see GLTimestamps)
+
+@dataclass
+class GLStats:
+    '''
+    Per-frame instrumentation of the OpenGL calls.
+    Usage:
+        GL_STATS.current.calls_issued += 1 # Where the call is made
+        GL_STATS.new_frame() # Once per frame, by the main loop
+
+    last_frame holds the counters of the last complete frame (e.g. to show them in the GUI).
+    '''
+    current: GLFrameStats = field(default_factory=GLFrameStats)
+    last_frame: GLFrameStats = field(default_factory=GLFrameStats)
+
+    def new_frame(self):
+        ''' Finishes the current frame and starts counting a new one '''
+        self.last_frame = self.current
+        self.current = GLFrameStats()
+
+
+GL_STATS = GLStats()
@@ -2,10 +2,11 @@ from abc import ABCMeta
 from dataclasses import dataclass, field
 import imageio
 from utils.sig import metsig
-import glfw
 from OpenGL import GL as gl
 import numpy as np
 
+from gl_abstractions.context import has_current_context
+
 @dataclass
 class TextureParameters:
     ''' OpenGL Parameters for a texture '''
@@ -27,7 +28,7 @@ class Texture:
     texture_parameters: TextureParameters = field(default_factory=TextureParameters)
     
     def __post_init__(self):
-        assert glfw.get_current_context() is not None, 'Must call `glfw.init()` before creating a texture'
+        assert has_current_context(), 'Must create an OpenGL context (e.g. a window) before creating a texture'
         assert isinstance(self.texture_type, int), f"Texture type expected to be int, but found '{type(self.texture_type)}'"
         assert isinstance(self.texture_parameters, TextureParameters), f"Texture type expected to be TextureParameters, but found '{type(self.texture_parameters)}'"
 
@@ -0,0 +1,186 @@
+from OpenGL import GL as gl
+
+from utils.logger import LOGGER
+
+from gl_abstractions.stats import GL_STATS
+
+# Queries per timer: while the GPU works on a frame, the result of the previous one is read
+QUERIES_IN_FLIGHT = 2
+
+class GLTimerQuery:
+    '''
+    GPU time of a section of the frame (GL_TIME_ELAPSED), read back without stalling the CPU.
+    Usage (see RenderQueue.flush):
+        timer = GLTimerQuery('opaque')
+        timer.poll()  # Once per frame, first: the result of a previous frame, if the GPU finished it (else None)
+        timer.begin() # Before the draw calls
+        timer.end()   # After them
+
+    The timer keeps a small pool of queries used in turns: a frame only reads the results that are already available
+    (GL_QUERY_RESULT_AVAILABLE), so last_ms lags a frame or two behind.
+    If every query is still waiting for the GPU, the section is not timed in that frame (skipped) instead of waiting.
+    Only one GL_TIME_ELAPSED query can be active at a time, so timed sections can't overlap (see GLTimestamps to time sections inside them).
+    '''
+    def __init__(self, name: str, queries_in_flight: int = QUERIES_IN_FLIGHT):
+        self.name = name
+        self.queries = [ int(query) for query in gl.glGenQueries(queries_in_flight) ]
+        self._pending = [ False ] * queries_in_flight # Ended, result not read yet
+        self._next = 0 # Query for the next begin
+        self._active = None # Query between begin and end
+        self.last_ms: float = None # Last result read
+        self.skipped = 0 # Sections not timed because no query was free
+
+        # Output parameters of glGetQueryObject* (ctypes: PyOpenGL's NumPy handler doesn't support 64-bit integers here)
+        self._available = (gl.GLint * 1)()
+        self._nanoseconds = (gl.GLuint64 * 1)()
+
+    def begin(self):
+        ''' Starts timing, if a query is free (poll first to free the ones the GPU finished) '''
+        if self._pending[self._next]:
+            self.skipped += 1
+            return
+
+        self._active = self._next
+        self._next = (self._next + 1) % len(self.queries)
+        gl.glBeginQuery(gl.GL_TIME_ELAPSED, self.queries[self._active])
+        GL_STATS.current.calls_issued += 1
+
+    def end(self):
+        ''' Stops timing (does nothing if begin didn't start it) '''
+        if self._active is None:
+            return
+
+        gl.glEndQuery(gl.GL_TIME_ELAPSED)
+        GL_STATS.current.calls_issued += 1
+        self._pending[self._active] = True
+        self._active = None
+
+    def poll(self) -> float:
+        ''' Reads the results that are ready, oldest first, and returns the newest of them in milliseconds (None if there is none) '''
+        newest = None
+        for offset in range(len(self.queries)):
+            index = (self._next + offset) % len(self.queries)
+            if not self._pending[index] or index == self._active:
+                continue
+            gl.glGetQueryObjectiv(self.queries[index], gl.GL_QUERY_RESULT_AVAILABLE, self._available)
+            if not self._available[0]:
+                break # The later ones can't be ready either
+
+            gl.glGetQueryObjectui64v(self.queries[index], gl.GL_QUERY_RESULT, self._nanoseconds)
+            self._pending[index] = False
+            newest = self.last_ms = int(self._nanoseconds[0]) / 1e6
+
+        return newest
+
+    def delete(self):
+        gl.glDeleteQueries(len(self.queries), self.queries)
+        self.queries = []
+
+# Queries allocated at once when a frame needs more timestamps
+TIMESTAMP_QUERY_BATCH = 64
+
+class _TimestampFrame:
+    ''' Timestamp queries of a frame of GLTimestamps '''
+    def __init__(self):
+        self.queries: list[int] = []
+        self.labels: list[str] = [] # Label of the section that ends at each query (after the first)
+        self.count = 0 # Queries used in the frame
+        self.pending = False # Recorded, results not read yet
+
+class GLTimestamps:
+    '''
+    GPU times of consecutive sections of a frame, from GPU timestamps (glQueryCounter with GL_TIMESTAMP),
+    read back without stalling the CPU.
+    Usage (see RenderQueue.flush):
+        timestamps = GLTimestamps()
+        timestamps.poll()        # Once per frame, first: {label: ms} of a previous frame, if the GPU finished it (else None)
+        timestamps.begin_frame() # Before the first section
+        timestamps.mark('label') # After each section: its time is the one since the previous timestamp
+        timestamps.end_frame()
+
+    Unlike GL_TIME_ELAPSED queries, timestamps can be recorded while a GLTimerQuery is active, so they time the
+    draw groups inside the timed passes. Sections with the same label in a frame are added up.
+    Like GLTimerQuery, a few frames are kept in flight, and a frame is not timed (skipped) if none of them is free.
+    '''
+    def __init__(self, frames_in_flight: int = QUERIES_IN_FLIGHT):
+        self.frames = [ _TimestampFrame() for _ in range(frames_in_flight) ]
+        self._next = 0 # Frame for the next begin_frame
+        self._recording: _TimestampFrame = None # Frame between begin_frame and end_frame
+        self.last_ms: dict[str, float] = {} # Last result read
+        self.skipped = 0 # Frames not timed because no frame was free
+
+        # Output parameters of glGetQueryObject* (see GLTimerQuery)
+        self._available = (gl.GLint * 1)()
+        self._nanoseconds = (gl.GLuint64 * 1)()
+
+    def _timestamp(self, frame: _TimestampFrame):
+        if frame.count == len(frame.queries):
+            frame.queries += [ int(query) for query in gl.glGenQueries(TIMESTAMP_QUERY_BATCH) ]
+        gl.glQueryCounter(frame.queries[frame.count], gl.GL_TIMESTAMP)
+        GL_STATS.current.calls_issued += 1
+        frame.count += 1
+
+    def begin_frame(self):
+        ''' Records the first timestamp, if a frame is free (poll first to free the ones the GPU finished) '''
+        frame = self.frames[self._next]
+        if frame.pending:
+            self.skipped += 1
+            return
+
+        frame.labels.clear()
+        frame.count = 0
+        self._recording = frame
+        self._next = (self._next + 1) % len(self.frames)
+        self._timestamp(frame)
+
+    def mark(self, label: str):
+        ''' Ends a section (does nothing if begin_frame didn't start the frame) '''
+        if self._recording is None:
+            return
+        self._timestamp(self._recording)
+        self._recording.labels.append(label)
+
+    def end_frame(self):
+        if self._recording is None:
+            return
+        self._recording.pending = self._recording.count > 1
+        self._recording = None
+
+    def _read(self, query: int) -> int:
+        gl.glGetQueryObjectui64v(query, gl.GL_QUERY_RESULT, self._nanoseconds)
+        return int(self._nanoseconds[0])
+
+    def poll(self) -> dict[str, float]:
+        ''' Reads the frames that are ready, oldest first, and returns the newest of them (milliseconds by label; None if there is none) '''
+        newest = None
+        for offset in range(len(self.frames)):
+            frame = self.frames[(self._next + offset) % len(self.frames)]
+            if not frame.pending or frame is self._recording:
+                continue
+            # Timestamps are written in order: when the last one is available, all of them are
+            gl.glGetQueryObjectiv(frame.queries[frame.count - 1], gl.GL_QUERY_RESULT_AVAILABLE, self._available)
+            if not self._available[0]:
+                break
+
+            times = [ self._read(query) for query in frame.queries[:frame.count] ]
+            sections: dict[str, float] = {}
+            for label, start, end in zip(frame.labels, times, times[1:]):
+                sections[label] = sections.get(label, 0.0) + (end - start) / 1e6
+            frame.pending = False
+            newest = self.last_ms = sections
+
+        return newest
+
+    def delete(self):
+        for frame in self.frames:
+            if frame.queries:
+                gl.glDeleteQueries(len(frame.queries), frame.queries)
+            frame.queries = []
+
+def create_timer_queries(names: list[str]) -> dict[str, GLTimerQuery]:
+    ''' One timer per name, or none if the context doesn't support timer queries (they're core since OpenGL 3.3) '''
+    try:
+        return { name: GLTimerQuery(name) for name in names }
+    except Exception as error:
+        LOGGER.log_warning(f'GPU timer queries are not available, GPU times will not be measured ({error})', 'create_timer_queries')
+        return {}
@@ -0,0 +1,59 @@
+from OpenGL import GL as gl
+
+import numpy as np
+from utils.logger import LOGGER
+
+from gl_abstractions.stats import GL_STATS
+
+# Binding point of each uniform block used by the shaders (Shader binds its blocks to these when it is linked)
+UNIFORM_BLOCK_BINDINGS = {
+    'Camera': 0,
+    'Lighting': 1,
+}
+
+class UniformBuffer:
+    '''
+    Uniform buffer object: the data of a uniform block (declared with layout(std140) in the shaders),
+    shared by every program that has the block.
+    Usage:
+        camera_buffer = UniformBuffer('Camera', size=144)
+        camera_buffer.update(data) # Once per frame, data packed according to std140
+
+    The buffer is bound to the binding point of its block (see UNIFORM_BLOCK_BINDINGS) when created.
+    '''
+    def __init__(self, block_name: str, size: int, usage: int = gl.GL_DYNAMIC_DRAW):
+        assert block_name in UNIFORM_BLOCK_BINDINGS, f'Uniform block {block_name} has no binding point, add it to UNIFORM_BLOCK_BINDINGS'
+        self.block_name = block_name
+        self.binding = UNIFORM_BLOCK_BINDINGS[block_name]
+        self.size = size
+
+        self.ubo = gl.glGenBuffers(1)
+        self.bind()
+        gl.glBufferData(gl.GL_UNIFORM_BUFFER, size, None, usage)
+        self.unbind()
+        self.bind_base()
+
+    def update(self, data: np.ndarray, offset: int = 0):
+        ''' Overwrites the buffer (or part of it, starting at the byte 'offset') with the raw bytes of data '''
+        data = np.ascontiguousarray(data)
+        assert offset + data.nbytes <= self.size, f'Uniform block {self.block_name} has {self.size} bytes, trying to write {offset}..{offset + data.nbytes}'
+
+        self.bind()
+        gl.glBufferSubData(gl.GL_UNIFORM_BUFFER, offset, data.nbytes, data)
+        self.unbind()
+        GL_STATS.current.calls_issued += 1
+
+    def bind_base(self):
+        ''' Makes the block read from this buffer, in every program '''
+        gl.glBindBufferBase(gl.GL_UNIFORM_BUFFER, self.binding, self.ubo)
+        GL_STATS.current.calls_issued += 1
+
+    def bind(self):
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, self.ubo)
+
+    def unbind(self):
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, 0)
+
+    def delete(self):
+        gl.glDeleteBuffers(1, [self.ubo])
+        self.ubo = 0
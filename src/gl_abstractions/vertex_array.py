@@ -1,15 +1,19 @@
+import ctypes
 from typing import TYPE_CHECKING
 from OpenGL import GL as gl
 from utils.logger import LOGGER
 
+from constants import FLOAT_SIZE
 from gl_abstractions.layout import Layout
 
 if TYPE_CHECKING:
+    from gl_abstractions.index_buffer import IndexBuffer
     from gl_abstractions.vertex_buffer import VertexBuffer
 
 class VertexArray:
     def __init__(self):
         self.vao = gl.glGenVertexArrays(1)
+        self.next_location = 0 # First attribute location not used by the uploaded vertex buffers
 
     def bind(self):
         gl.glBindVertexArray(self.vao)
@@ -17,24 +21,49 @@ class VertexArray:
     def unbind(self):
         gl.glBindVertexArray(0)
 
-    def _apply_layout(self, layout: Layout):
+    def _apply_layout(self, layout: Layout, first_location: int):
         stride = layout.calc_stride()
         
-        i = 0
+        i = first_location
         for name, count in layout.attributes:
             # LOGGER.log_trace(f'{name=}, {count=}')
-            offset = layout.get_offset(name)
-            gl.glEnableVertexAttribArray(i)
-            gl.glVertexAttribPointer(i, count, gl.GL_FLOAT, gl.GL_FALSE, stride, offset)
-            i += 1
+            offset = layout.get_offset(name).value or 0
+            # Attributes bigger than a vec4 (e.g. mat4) take one location per (up to) 4 floats
+            for column_offset in range(0, count, 4):
+                column_count = min(4, count - column_offset)
+                gl.glEnableVertexAttribArray(i)
+                gl.glVertexAttribPointer(i, column_count, gl.GL_FLOAT, gl.GL_FALSE, stride, ctypes.c_void_p(offset + column_offset * FLOAT_SIZE))
+                if layout.per_instance:
+                    gl.glVertexAttribDivisor(i, 1)
+                i += 1
+
+    def upload_vertex_buffer(self, vertex_buffer: 'VertexBuffer', first_location: int = None):
+        '''
+        Makes the VAO read the attributes of the buffer's layout, starting at first_location.
+        By default, the attributes of each buffer come after the ones of the previously uploaded buffers.
+        '''
+        if first_location is None:
+            first_location = self.next_location
 
-    def upload_vertex_buffer(self, vertex_buffer: 'VertexBuffer'):
         self.bind()
         vertex_buffer.bind()
-        self._apply_layout(vertex_buffer.layout)
+        self._apply_layout(vertex_buffer.layout, first_location)
         vertex_buffer.unbind()
         self.unbind()
 
+        self.next_location = max(self.next_location, first_location + vertex_buffer.layout.count_locations())
+
+    def upload_index_buffer(self, index_buffer: 'IndexBuffer'):
+        # The element array buffer binding is part of the VAO state, 
+        # so it must not be unbound while the VAO is bound
+        self.bind()
+        index_buffer.bind()
+        self.unbind()
+
+    def delete(self):
+        gl.glDeleteVertexArrays(1, [self.vao])
+        self.vao = 0
+
     def __del__(self):
         # LOGGER.log_warning(f'VertexArray(id={id(self)}) not deleted') #TODO: cleanup
     #     gl.glDeleteVertexArrays(1, self.vao)
@@ -6,26 +6,43 @@ from utils.logger import LOGGER
 from gl_abstractions.layout import Layout
 
 class VertexBuffer:
+    '''
+    Array buffer holding the vertices of a VertexArray.
+    The NumPy array is handed to OpenGL as is (a pointer to its buffer), so uploading doesn't copy it in Python.
+    '''
     def __init__(self, layout: Layout, data: np.ndarray, usage: int = gl.GL_STATIC_DRAW):
         self.vbo = gl.glGenBuffers(1)
-        self.data = data
         self.layout = layout
+        self.usage = usage
 
         layout.assert_data_ok(data)
         # Data is a 2D array of floats.
         # The first dimension is the attribute, the second dimension is the attribute's values.
+        data = self._as_buffer_data(data)
+        self.vertex_count = len(data)
+        self.nbytes = data.nbytes
 
-        
-        # TODO: SUPPORTED_DTYPES = [np.float32, np.float64] (layout.py): make them share behaviour
-        assert data.dtype == np.float32, f'Only float32 data is supported, got {data.dtype}'
-        flattened_data = data.flatten()
+        self.bind()
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, data.nbytes, data, usage)
+        self.unbind()
 
-        FloatVec = gl.GLfloat * len(flattened_data)
-        data_ptr = FloatVec(*flattened_data)
-        data_ptr_size = len(flattened_data) * 4
+    @staticmethod
+    def _as_buffer_data(data: np.ndarray) -> np.ndarray:
+        ''' Returns the data as a C-contiguous float32 array (without copying it, if it already is one) '''
+        # float64 data (also accepted by the layout) is converted, since the attributes are declared as GL_FLOAT
+        return np.ascontiguousarray(data, dtype=np.float32)
+
+    def update(self, offset: int, data: np.ndarray):
+        '''
+        Overwrites part of the buffer, starting at the vertex 'offset', with the vertices in data (glBufferSubData).
+        The buffer keeps its size, so the vertices must fit in it. Meant for buffers created with GL_DYNAMIC_DRAW or GL_STREAM_DRAW.
+        '''
+        self.layout.assert_data_ok(data)
+        data = self._as_buffer_data(data)
+        assert 0 <= offset and offset + len(data) <= self.vertex_count, f'Vertices {offset}..{offset + len(data)} are out of the buffer (it has {self.vertex_count} vertices)'
 
         self.bind()
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, flattened_data.nbytes, data_ptr, usage)
+        gl.glBufferSubData(gl.GL_ARRAY_BUFFER, offset * self.layout.calc_stride(), data.nbytes, data)
         self.unbind()
 
     def bind(self):
@@ -34,7 +51,11 @@ class VertexBuffer:
     def unbind(self):
         gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
 
+    def delete(self):
+        gl.glDeleteBuffers(1, [self.vbo])
+        self.vbo = 0
+
     def __del__(self):
         # gl.glDeleteBuffers(1, [self.vbo])
         # LOGGER.log_warning(f'VertexBuffer(id={id(self)}) not deleted') # TODO: cleanup
-        pass
\ No newline at end of file
+        pass
@@ -1,16 +1,37 @@
 from dpgext import gui
 from dpgext.elements import elements as el
 import dearpygui.dearpygui as dpg
+import numpy as np
 from utils.sig import metsig
 from utils.logger import LOGGER
 
 from app_vars import APP_VARS
 from constants import GUI_WIDTH
+from gl_abstractions.mesh import MeshRegistry
+from gl_abstractions.stats import GL_STATS
 from objects.cube import Cube
 from objects.element import Element as GameElement
+from profiler import PROFILER
 
 COORDS = ['x', 'y', 'z']
 
+# Phases plotted in the profiler section (see main.py and World.update)
+PLOTTED_PHASES = [
+    'frame',
+    'frame/poll_events',
+    'frame/world_update',
+    'frame/world_update/physics',
+    'frame/world_update/render_submission',
+    'frame/swap_buffers',
+    'gui_tick',
+    'gpu/opaque', # Measured on the GPU (see RenderQueue)
+]
+
+CHROME_TRACE_FILENAME = 'profile_trace.json'
+
+# Slowest batches shown with the GPU times (with gpu_batch_timers)
+GPU_BATCHES_SHOWN = 5
+
 
 class MainWindow(gui.Window):
     '''
@@ -34,6 +55,12 @@ class MainWindow(gui.Window):
         self.scale_clients = []
 
         self.game_fps_label = el.Text()
+        self.timestep_stats_label = el.Text()
+        self.profiler_stats_label = el.Text()
+        self.profiler_y_axis = None
+        self.profiler_series = {}
+        self.mesh_stats_label = el.Text()
+        self.gl_stats_label = el.Text()
         self._last_selected_element = None
         self.mock_obj = Cube('mock_cube')
 
@@ -171,6 +198,85 @@ class MainWindow(gui.Window):
             el.SliderFloat(APP_VARS.lighting_config.light_position, 'z').add(
                 el.SliderFloatParams(min_value=-10, max_value=10, width=100))
 
+    def _describe_rendering_controls(self):
+        el.Text().add(el.TextParams('Rendering Options:'))
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('Indexed geometry (new elements)'))
+            el.CheckBox(APP_VARS.rendering_options, 'indexed_geometry').add(
+                el.CheckboxParams())
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('Instancing'))
+            el.CheckBox(APP_VARS.rendering_options, 'instancing').add(
+                el.CheckboxParams())
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('Frustum culling'))
+            el.CheckBox(APP_VARS.rendering_options, 'frustum_culling').add(
+                el.CheckboxParams())
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('GPU timers'))
+            el.CheckBox(APP_VARS.rendering_options, 'gpu_timers').add(
+                el.CheckboxParams())
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('GPU timers per batch'))
+            el.CheckBox(APP_VARS.rendering_options, 'gpu_batch_timers').add(
+                el.CheckboxParams())
+
+        self.mesh_stats_label.add(el.TextParams('Meshes: ?'))
+        self.gl_stats_label.add(el.TextParams('GL calls: ?'))
+
+    def _describe_raycast_controls(self):
+        el.Text().add(el.TextParams('Raycast Options:'))
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('Mesh bounding boxes as hitboxes'))
+            el.CheckBox(APP_VARS.raycast_options, 'aabb_hitboxes').add(
+                el.CheckboxParams())
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('Triangle-precise picking'))
+            el.CheckBox(APP_VARS.raycast_options, 'triangle_picking').add(
+                el.CheckboxParams())
+
+        with dpg.group(horizontal=True):
+            el.Text().add(el.TextParams('Swept rays (test every tick)'))
+            el.CheckBox(APP_VARS.raycast_options, 'swept').add(
+                el.CheckboxParams())
+
+    def _describe_profiler_controls(self):
+        el.Text().add(el.TextParams('Profiler (ms, last / p50 / p95 / p99):'))
+        self.profiler_stats_label.add(el.TextParams('?'))
+
+        with dpg.plot(height=200, width=-1):
+            dpg.add_plot_legend()
+            dpg.add_plot_axis(dpg.mvXAxis, label='frame')
+            self.profiler_y_axis = dpg.add_plot_axis(dpg.mvYAxis, label='ms')
+            for phase in PLOTTED_PHASES:
+                self.profiler_series[phase] = dpg.add_line_series([], [], label=phase.rsplit('/', 1)[-1], parent=self.profiler_y_axis)
+
+        def export_chrome_trace():
+            PROFILER.export_chrome_trace(CHROME_TRACE_FILENAME)
+            LOGGER.log_info(f'Chrome trace saved to {CHROME_TRACE_FILENAME}', 'MainWindow')
+
+        el.Button().add(el.ButtonParams(label='Export Chrome trace', callback=export_chrome_trace))
+
+    def _update_profiler(self):
+        ''' Show the percentiles of every phase and plot the history of the main ones '''
+        phases = PROFILER.stats()
+        dpg.set_value(self.profiler_stats_label.tag, '\n'.join(
+            f'{"  " * phase.depth}{phase.name.rsplit("/", 1)[-1]}: {phase.last:.2f} / {phase.p50:.2f} / {phase.p95:.2f} / {phase.p99:.2f}'
+            for phase in phases
+        ))
+
+        for phase, series in self.profiler_series.items():
+            history = PROFILER.phase_history(phase)
+            dpg.set_value(series, [list(range(len(history))), history.tolist()])
+        dpg.fit_axis_data(self.profiler_y_axis)
+
     def describe(self):
         ''' Describe the GUI Layout '''
         self.translation_obj = self.mock_obj.transform.translation
@@ -190,14 +296,30 @@ class MainWindow(gui.Window):
 
             dpg.add_separator() # --------------------------------------------------
 
-            # 3. Show game FPS
+            # 3. Show game FPS and physics step rate
             self.game_fps_label.add(el.TextParams('Game FPS: ?'))
+            self.timestep_stats_label.add(el.TextParams('Physics: ?'))
+
+            dpg.add_separator() # --------------------------------------------------
+
+            # 4. Show the Rendering Options
+            self._describe_rendering_controls()
+
+            dpg.add_separator() # --------------------------------------------------
+
+            # 5. Show the Raycast Options
+            self._describe_raycast_controls()
 
             dpg.add_separator() # --------------------------------------------------
             dpg.add_spacer(height=10)
 
-            # 4. Show the Lighting Controls
+            # 6. Show the Lighting Controls
             self._describe_light_controls()
+
+            dpg.add_separator() # --------------------------------------------------
+
+            # 7. Show the frame profiler
+            self._describe_profiler_controls()
             
 
     def _update_available_elements(self):
@@ -274,17 +396,45 @@ class MainWindow(gui.Window):
 
     def update(self):
         ''' Update the GUI '''
+        with PROFILER.scope('gui_tick'):
+            self._update()
+
+        return super().update()
 
+    def _update(self):
         self._update_available_elements()
 
-        dpg.set_value(self.game_fps_label.tag, APP_VARS.game_fps.fps)
+        frame_times = PROFILER.phase_history('frame')
+        if len(frame_times):
+            # Median over the history instead of the instantaneous 1/delta of the last frame
+            median_frame_time = float(np.median(frame_times))
+            dpg.set_value(self.game_fps_label.tag, f'Game FPS: {1000 / median_frame_time:.0f} (frame p50 {median_frame_time:.2f} ms)')
+        else:
+            dpg.set_value(self.game_fps_label.tag, APP_VARS.game_fps.fps)
+
+        timestep = APP_VARS.world.timestep
+        dpg.set_value(self.timestep_stats_label.tag,
+                      f'Physics: {timestep.step_rate:.1f} steps/s, {timestep.render_rate:.1f} frames/s, {timestep.dropped_steps} steps dropped')
+
+        meshes = MeshRegistry.get_instance()
+        dpg.set_value(self.mesh_stats_label.tag,
+                      f'Meshes: {meshes.live_meshes} live, {meshes.gpu_bytes / 1024:.0f} KiB, {meshes.hits} hits, {meshes.misses} misses')
+
+        frame = GL_STATS.last_frame
+        dpg.set_value(self.gl_stats_label.tag,
+                      f'GL calls/frame: {frame.calls_issued} issued, {frame.calls_elided} elided, {frame.draw_calls} draws\n'
+                      f'State changes/frame: {frame.state_changes} made, {frame.state_changes_avoided} avoided\n'
+                      f'Elements: {frame.visible_elements} visible, {frame.culled_elements} culled '
+                      f'({frame.visible_shapes} / {frame.culled_shapes} shapes)\n'
+                      f'GPU ms: ' + (', '.join(f'{name} {ms:.2f}' for name, ms in frame.gpu_pass_ms.items()) or '?') +
+                      ''.join(f'\n  {name} {ms:.3f}' for name, ms in sorted(frame.gpu_batch_ms.items(), key=lambda group: -group[1])[:GPU_BATCHES_SHOWN]))
+
+        self._update_profiler()
 
         # Watch for changes and react accordingly
         self._sync_selected_element()
         self._sync_locked_light_coefficients()
 
-        return super().update()
-
 class AppGui(gui.Gui):
     def _init_windows(self):
         self.windows['main'] = MainWindow()
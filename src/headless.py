@@ -0,0 +1,177 @@
+'''
+Headless render benchmark: renders the world offscreen (invisible GLFW window or EGL context + framebuffer object, no GUI)
+for a fixed number of frames, with a fixed random seed, a fixed frame time and a fixed camera path,
+so two runs of the same code draw the same frames. Prints the frame time percentiles of every phase
+(see Profiler, GPU times of the render passes included) and can save some frames as PNG files.
+
+Usage (from the repository root):
+    python src/headless.py --frames 600 --capture-every 100
+    python src/headless.py --json results.json --trace trace.json
+    python src/headless.py --no-gpu-timers # If the context has no timer queries
+    python src/headless.py --egl # Without a display (CI): surfaceless EGL context instead of a GLFW window, e.g. Mesa llvmpipe
+'''
+
+import argparse
+from dataclasses import asdict
+import json
+import math
+import os
+import random
+import sys
+import time
+
+if '--egl' in sys.argv: # PyOpenGL chooses its platform when first imported, before the arguments are parsed
+    os.environ['PYOPENGL_PLATFORM'] = 'egl'
+    os.environ.setdefault('EGL_PLATFORM', 'surfaceless') # Mesa: no X or Wayland display needed
+
+import glfw
+import imageio
+import numpy as np
+import OpenGL.GL as gl
+
+from utils.geometry import Vec3
+from utils.logger import LOGGER
+from app_vars import APP_VARS
+
+from constants import BACKGROUND_COLOR, WINDOW_SIZE
+from gl_abstractions.framebuffer import Framebuffer
+from gl_abstractions.stats import GL_STATS
+from profiler import PROFILER, PhaseStats
+from objects.world import World
+from wavefront.model_cache import MODEL_CACHE
+from window import create_egl_context, create_window, destroy_egl_context, setup_gl_state
+
+DEFAULT_FRAMES = 600
+DEFAULT_WARMUP_FRAMES = 30 # Not measured (shaders, buffers and caches are created in the first frames)
+DEFAULT_SEED = 0
+FRAME_TIME = 1 / 60 # Simulated time of every frame (the real one is measured)
+
+# Camera path: one lap around the center of the world, looking at it
+ORBIT_RADIUS = 12
+ORBIT_PITCH = -10 # Degrees
+
+def camera_path(frame: int, frames: int) -> tuple[Vec3, float, float]:
+    ''' Position, yaw and pitch (degrees) of the camera in a frame '''
+    angle = 2 * math.pi * frame / frames
+    position = Vec3(ORBIT_RADIUS * math.cos(angle), APP_VARS.camera._ground_y, ORBIT_RADIUS * math.sin(angle))
+    yaw = math.degrees(math.atan2(-position.z, -position.x))
+    return position, yaw, ORBIT_PITCH
+
+def _place_camera(frame: int, frames: int):
+    camera = APP_VARS.camera
+    position, camera.yaw, camera.pitch = camera_path(frame, frames)
+    camera.transform.translation.xyz = position
+    camera._update_from_pitch_yaw()
+
+def _render_frame(world: World):
+    ''' Same as a frame of main.py, but waiting for the GPU instead of swapping buffers '''
+    with PROFILER.scope('frame'):
+        gl.glClearColor(*BACKGROUND_COLOR, 1.0)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+
+        with PROFILER.scope('world_update'):
+            world.update(frame_time=FRAME_TIME)
+
+        with PROFILER.scope('finish'):
+            gl.glFinish() # So the frame time includes the GPU work, like swap_buffers with VSync off
+
+        GL_STATS.new_frame()
+
+def run(frames: int = DEFAULT_FRAMES, warmup_frames: int = DEFAULT_WARMUP_FRAMES, seed: int = DEFAULT_SEED,
+        capture_every: int = 0, capture_folder: str = 'captures', egl: bool = False) -> tuple[list[PhaseStats], float]:
+    '''
+    Renders the frames and returns the stats of the measured ones and the real time they took (seconds).
+    Every capture_every frames (0: never), the frame is saved to capture_folder/frame_<number>.png.
+    With egl, the OpenGL context is an EGL one without a window (PYOPENGL_PLATFORM must be 'egl', see create_egl_context).
+    '''
+    if egl:
+        display, context = create_egl_context()
+    else:
+        window = create_window(visible=False)
+    setup_gl_state()
+    framebuffer = Framebuffer(*WINDOW_SIZE)
+    framebuffer.bind()
+
+    # The models must be loaded before seeding: parsing them may draw random numbers (default material names)
+    for filename in World.PRELOADED_MODELS:
+        MODEL_CACHE.load_model(filename)
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    world = APP_VARS.world
+    world.setup()
+
+    if capture_every:
+        os.makedirs(capture_folder, exist_ok=True)
+
+    total_frames = warmup_frames + frames
+    start = None
+    for frame in range(total_frames):
+        if frame == warmup_frames:
+            PROFILER.reset()
+            start = time.perf_counter()
+
+        _place_camera(frame, total_frames)
+        _render_frame(world)
+
+        if capture_every and frame >= warmup_frames and (frame - warmup_frames) % capture_every == 0:
+            imageio.imwrite(os.path.join(capture_folder, f'frame_{frame - warmup_frames:05d}.png'), framebuffer.read_pixels())
+
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    stats = PROFILER.stats()
+
+    framebuffer.delete()
+    if egl:
+        destroy_egl_context(display, context)
+    else:
+        glfw.destroy_window(window)
+        glfw.terminate()
+    return stats, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Renders the world offscreen and prints frame time statistics')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='measured frames')
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP_FRAMES, help='frames rendered before measuring')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--capture-every', type=int, default=0, help='save every Nth measured frame as a PNG (0: none)')
+    parser.add_argument('--capture-folder', default='captures')
+    parser.add_argument('--json', help='also write the statistics to this file')
+    parser.add_argument('--trace', help='also write a Chrome trace of the measured frames to this file')
+    parser.add_argument('--no-gpu-timers', action='store_true', help="don't measure the GPU time of the render passes")
+    parser.add_argument('--gpu-batch-timers', action='store_true', help='also measure the GPU time of every batch of draws')
+    parser.add_argument('--egl', action='store_true', help='render in a surfaceless EGL context instead of an invisible GLFW window (no display needed)')
+    args = parser.parse_args()
+
+    APP_VARS.rendering_options.gpu_timers = not args.no_gpu_timers
+    APP_VARS.rendering_options.gpu_batch_timers = args.gpu_batch_timers
+
+    LOGGER.log_info(f'Rendering {args.warmup} + {args.frames} frames offscreen (seed {args.seed})', 'headless')
+    stats, elapsed = run(args.frames, args.warmup, args.seed, args.capture_every, args.capture_folder, args.egl)
+
+    print(f'{args.frames} frames in {elapsed:.2f} s ({args.frames / elapsed:.1f} frames/s), {WINDOW_SIZE[0]}x{WINDOW_SIZE[1]}')
+    print(f'{"Phase (ms)":<40}{"p50":>9}{"p95":>9}{"p99":>9}')
+    names = { phase.name for phase in stats }
+    for phase in stats:
+        parent, _, name = phase.name.rpartition('/')
+        label = '  ' * phase.depth + name if parent in names else phase.name # e.g. 'gpu/opaque' has no 'gpu' phase
+        print(f'{label:<40}{phase.p50:>9.3f}{phase.p95:>9.3f}{phase.p99:>9.3f}')
+
+    frame = GL_STATS.last_frame
+    print(f'Last frame: {frame.draw_calls} draws, {frame.calls_issued} GL calls, '
+          f'{frame.visible_shapes} visible / {frame.culled_shapes} culled shapes')
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({
+                'frames': args.frames,
+                'seed': args.seed,
+                'seconds': elapsed,
+                'phases': [ asdict(phase) for phase in stats ],
+            }, file, indent=4)
+
+    if args.trace:
+        PROFILER.export_chrome_trace(args.trace)
+
+if __name__ == '__main__':
+    main()
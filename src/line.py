@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
 from gl_abstractions.shader import Shader, ShaderDB
 from objects.element import Element, ShapeSpec
+from render_queue import RenderPass
 
 from OpenGL import GL as gl
 import numpy as np
@@ -10,6 +11,7 @@ class Line(Element):
     ''' A line element. '''
     shape_specs: list[ShapeSpec] = None
     shader: Shader = field(default_factory=lambda: ShaderDB.get_instance().get_shader('light_texture'))
+    render_pass: RenderPass = RenderPass.DEBUG
 
     def __post_init__(self):
         self.shape_specs = [
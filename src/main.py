@@ -19,45 +19,15 @@ from threading import Thread
 from utils.logger import LOGGER
 from app_vars import APP_VARS
 
-from constants import GUI_WIDTH, WINDOW_SIZE
+from constants import BACKGROUND_COLOR
 from input.input_system import setup_input_system, INPUT_SYSTEM as IS
 
+from gl_abstractions.stats import GL_STATS
 from gui import AppGui
-
-def create_window():
-    '''
-    Creates a GLFW window and returns it.
-    this function also sets things like the window size, the window title, opengl context, etc.
-    '''
-    LOGGER.log_trace("Initializing GLFW", 'create_window')
-    glfw.init() # Initialize GLFW (just in case we call from another thread or something)
-
-    LOGGER.log_trace("Setting window hints", 'create_window')
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-    glfw.window_hint(glfw.RESIZABLE, gl.GL_FALSE)
-
-
-    LOGGER.log_trace("Creating window", 'create_window')
-    window = glfw.create_window(*WINDOW_SIZE, "CG Trab 1", monitor=None, share=None)
-    glfw.set_window_pos(window, GUI_WIDTH, 0)
-    glfw.make_context_current(window)
-    glfw.show_window(window)
-
-    LOGGER.log_trace("Disabling mouse", 'create_window')
-    glfw.set_input_mode(window, glfw.CURSOR, glfw.CURSOR_DISABLED);
-
-    LOGGER.log_trace("Enabling VSync", 'create_window')
-    glfw.swap_interval(1)
-
-    LOGGER.log_info("Window created", 'create_window')
-
-    # gl.glEnable(gl.GL_CULL_FACE);  
-    # gl.glCullFace(gl.GL_FRONT);  
-    # gl.glFrontFace(gl.GL_CW);  
-
-    return window
+from profiler import PROFILER
+from objects.world import World
+from wavefront.model_cache import MODEL_CACHE
+from window import create_window, setup_gl_state
 
 def glfw_thread():
     '''
@@ -67,14 +37,7 @@ def glfw_thread():
     '''
     LOGGER.log_trace("Creating window", 'glfw_thread')
     window = create_window()
-    
-    # Enable blending
-    gl.glEnable(gl.GL_BLEND)
-    gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
-
-    LOGGER.log_trace("Enabling Depth Test", 'glfw_thread')
-    gl.glEnable(gl.GL_DEPTH_TEST)
-    gl.glDepthFunc(gl.GL_LESS)
+    setup_gl_state()
 
     LOGGER.log_trace("Setting up input system", 'glfw_thread')
     def key_callback(window, key: int, scancode, action: int, mods: int):
@@ -110,29 +73,31 @@ def glfw_thread():
     LOGGER.log_trace("Running main loop", 'glfw_thread')
     camera = APP_VARS.camera
 
-    # Background color: generally, the skybox will hide the background color
-    R: float = 32/255 
-    G: float = 31/255 
-    B: float = 65/255 
+    R, G, B = BACKGROUND_COLOR
 
     while not glfw.window_should_close(window) and not APP_VARS.closing:
-        glfw.poll_events() # Update input events (keyboard, mouse, etc)
-        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
-        gl.glClearColor(R, G, B, 1.0)
+        with PROFILER.scope('frame'):
+            with PROFILER.scope('poll_events'):
+                glfw.poll_events() # Update input events (keyboard, mouse, etc)
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+            gl.glClearColor(R, G, B, 1.0)
 
-        def update():
-            '''
-            Update world state and render its scene into the current framebuffer (usually the screen)
-            '''
-            world.update()
+            def update():
+                '''
+                Update world state and render its scene into the current framebuffer (usually the screen)
+                '''
+                world.update()
 
-        update() # Currently, the screen is bound as the framebuffer
+            with PROFILER.scope('world_update'):
+                update() # Currently, the screen is bound as the framebuffer
 
-        # Update game FPS every frame
-        APP_VARS.game_fps.update_calc_fps(time.time())
+            # Update game FPS and GL call counters every frame
+            APP_VARS.game_fps.update_calc_fps(time.time())
+            GL_STATS.new_frame()
 
-        # Swap the buffers (drawing buffer -> screen)
-        glfw.swap_buffers(glfw.get_current_context()) 
+            # Swap the buffers (drawing buffer -> screen)
+            with PROFILER.scope('swap_buffers'):
+                glfw.swap_buffers(glfw.get_current_context()) 
 
     LOGGER.log_info("GLFW thread is closing", 'glfw_thread')
     # Make the GUI close too
@@ -163,6 +128,11 @@ def main():
     
     LOGGER.log_info("Starting app", 'main')
 
+    # Start parsing the models in parallel (before any other thread is created), 
+    # the GLFW thread waits for each one when it is first used
+    LOGGER.log_trace("Preload models", 'main')
+    MODEL_CACHE.preload(World.PRELOADED_MODELS)
+
     LOGGER.log_trace("Init Glfw", 'main')
     glfw.init()
     
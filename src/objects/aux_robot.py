@@ -1,14 +1,21 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import math
-import time
+from typing import TYPE_CHECKING
 from utils.geometry import Vec3
+from objects.element import PHYSICS_TPS
 from objects.model_element import ModelElement
 from objects.physics.rotation import front_to_rotation
 from wavefront.model import Model
 
-from wavefront.model_reader import ModelReader
+from wavefront.model_cache import MODEL_CACHE
 
-AUX_ROBOT_MODEL = ModelReader().load_model_from_file('models/aux_robot.obj')
+if TYPE_CHECKING:
+    from objects.world import World
+
+# Movement, in units per tick (see PhysicsSystem)
+AUX_ROBOT_ACCEL = 0.5 / PHYSICS_TPS
+AUX_ROBOT_MAX_SPEED = 3.5 / PHYSICS_TPS
+AUX_ROBOT_FRICTION = 0.9
 
 @dataclass
 class AuxRobot(ModelElement):
@@ -17,14 +24,15 @@ class AuxRobot(ModelElement):
     When it gets close, it stops and just looks at the player, going up and down smoothly.
     When a bullet is fired, it looks at the bullet. 
     '''
-    model: Model = AUX_ROBOT_MODEL
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/aux_robot.obj'))
     ray_selectable: bool = False    # To avoid undesired selection of the aux robot, we disable its selection
     ray_destroyable: bool = False   # It is not destroyable by the player (because it's the player's best friend) 
 
-    def __post_init__(self):
-        from objects.physics.momentum import Momentum
-        self._momentum = Momentum(accel=0.5, max_speed=3.5)
-        super().__post_init__()
+    def on_spawned(self, world: 'World'):
+        ''' Override of Element method. '''
+        # Moved by the world's physics system
+        self.physics_body = world.physics.add_body(self, max_speed=AUX_ROBOT_MAX_SPEED, friction=AUX_ROBOT_FRICTION)
+        return super().on_spawned(world)
 
     def update(self, delta_time: float):
         ''' Override the method of the Element class. '''
@@ -50,7 +58,7 @@ class AuxRobot(ModelElement):
         dist = follow_target.transform.translation - self.transform.translation
 
         if dist.magnitude() > constants.WORLD_SIZE:
-            self.transform.translation.xyz = follow_target.transform.translation.xyz
+            self.physics_body.teleport(follow_target.transform.translation.values)
 
         force: Vec3 = dist.normalized()
         # force += Vec3((random.random() * 2 - 1)/2, (random.random() * 2 - 1)/2, (random.random() * 2 - 1)/2)
@@ -58,13 +66,8 @@ class AuxRobot(ModelElement):
             force.x = force.z = 0
         force.y = 0 # Don't move up/down
         
-        # Apply the force to the aux robot
-        self._momentum.apply_force(force, delta_time=delta_time)
-        # Also apply friction to the aux robot
-        self._momentum.apply_friction(0.9, delta_time=delta_time)
-
-        # Apply velocity to the aux robot transform
-        self.transform.translation += self._momentum.velocity * delta_time
+        # Apply the force to the aux robot (the physics system integrates it, with friction)
+        self.physics_body.acceleration[:] = (force * AUX_ROBOT_ACCEL).values
 
         # 3. Look #
 
@@ -83,7 +86,7 @@ class AuxRobot(ModelElement):
         self.transform.rotation += delta_rot * delta_time * 2
 
         # 4. Animate up/down #
-        self.transform.translation.y = (math.sin(time.time() / 2) / 2 + 1) * (2 - 1.8) + 1.8
+        self.physics_body.position[1] = (math.sin(APP_VARS.world.time / 2) / 2 + 1) * (2 - 1.8) + 1.8
 
         return super()._physics_update(delta_time)
 
@@ -1,36 +1,51 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import math
 import random
-import time
+from typing import TYPE_CHECKING
 
 from utils.geometry import Vec3
 from objects.model_element import ModelElement
 from objects.physics.rotation import front_to_rotation
 from wavefront.model import Model
-from wavefront.model_reader import ModelReader
+from wavefront.model_cache import MODEL_CACHE
 
+if TYPE_CHECKING:
+    from objects.world import World
 
-BOT_MODEL = ModelReader().load_model_from_file('models/bot.obj')
+# Wandering force multiplier and speed limit, in units per tick (see PhysicsSystem)
+BOT_ACCEL = 0.01
+BOT_MAX_SPEED = 0.1
 
 @dataclass
 class Bot(ModelElement):
     ''' Enemy bot that wanders around the world '''
-    model: Model = BOT_MODEL
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/bot.obj'))
     ray_destroyable: bool = True # The player can shoot the bot
     ray_selectable: bool = True # For debugging purposes
 
     def __post_init__(self):
-        from objects.physics.momentum import Momentum
         self._dying = False # Used to animate the bot dying
-        self.momentum = Momentum() # Physics momentum (velocity and force)
 
         # Define the amplitude of the movement in the x and z axis
         self.amp_x = random.uniform(0.3, 1.7)
         self.amp_z = random.uniform(0.3, 1.7)
         self.per_x = random.uniform(0.3, 1.7)
         self.per_z = random.uniform(0.3, 1.7)
+        self.phase_x = self.phase_z = 0.0 # Flipped (+pi) when the bot bounces off the bounds, so it wanders back
         return super().__post_init__()
 
+    def on_spawned(self, world: 'World'):
+        ''' Override of Element method. '''
+        from constants import WORLD_SIZE
+
+        # Moved by the world's physics system, bouncing off the bounds of the spawn area
+        self.physics_body = world.physics.add_body(
+            self,
+            max_speed=BOT_MAX_SPEED,
+            bounds=(Vec3(-WORLD_SIZE/2, -math.inf, 0), Vec3(WORLD_SIZE/2, math.inf, WORLD_SIZE/2)),
+        )
+        return super().on_spawned(world)
+
     @property
     def center(self) -> Vec3:
         ''' Override of Element property. '''
@@ -55,23 +70,33 @@ class Bot(ModelElement):
 
     def _physics_update(self, delta_time: float):
         ''' Override the method of the Element class. '''
-        from constants import WORLD_SIZE
+        body = self.physics_body
 
-        # Move the bot according to its momentum
-        # But only if it's not dying
-        if not self._dying:
-            self.momentum.apply_force(Vec3(math.sin(time.time() * self.per_x) * self.amp_x, 0, math.cos(time.time() * self.per_z) * self.amp_z), delta_time=delta_time)
-            self.transform.translation += self.momentum.velocity 
-            
-            if self.transform.translation.x < -WORLD_SIZE/2 or self.transform.translation.x > WORLD_SIZE/2:
-                self.momentum.velocity.x *= -1
-                self.per_x += math.pi
-            if self.transform.translation.z < 0 or self.transform.translation.z > WORLD_SIZE/2:
-                self.momentum.velocity.z *= -1
-                self.per_z += math.pi
-            self.transform.rotation.xyz = front_to_rotation(self.momentum.velocity)
+        # Wander around, but only if it's not dying
+        if self._dying:
+            body.acceleration[:] = 0
+            body.velocity[:] = 0
+            return super()._physics_update(delta_time)
+
+        bounced = body.consume_bounces()
+        if bounced[0]:
+            self.phase_x += math.pi
+        if bounced[2]:
+            self.phase_z += math.pi
+
+        from app_vars import APP_VARS
+        t = APP_VARS.world.time
+        body.acceleration[:] = (
+            math.sin(t * self.per_x + self.phase_x) * self.amp_x * BOT_ACCEL,
+            0,
+            math.cos(t * self.per_z + self.phase_z) * self.amp_z * BOT_ACCEL,
+        )
+
+        velocity = Vec3(*body.velocity)
+        if velocity.magnitude() > 0:
+            self.transform.rotation.xyz = front_to_rotation(velocity)
             self.transform.rotation.y -= math.pi/2
-        
+
         return super()._physics_update(delta_time)
 
     def destroy(self):
@@ -30,41 +30,13 @@ class BulletRay(Ray):
         ''' Override of Element method. '''
         from app_vars import APP_VARS
         
-        # Get a reference of world elements to be used in the raycast later
+        # Keep track of the last bullet (its position is sent to the light shader)
         APP_VARS.last_bullet = self
-        self.destroyable_elements = world.elements
         return super().on_spawned(world)
 
-    def _has_hit(self) -> bool:
+    def _is_target(self, element: Element) -> bool:
         ''' Override of Ray method. '''
-
-        # Filter out elements that are not destroyable
-        self.destroyable_elements = [ element for element in self.destroyable_elements if element.ray_destroyable ]
-
-        def calc_distance(element: Element) -> float:
-            ''' Calculate the distance between the ray and the element. '''
-            difference = element.center.xyz - self.center.xyz
-            distance = difference.magnitude()
-            return distance
-
-        # Calculate the distance between the ray and each element
-        distances = [ calc_distance(element) for element in self.destroyable_elements ]
-
-        # Sort the pairs by distance
-        sorted_pairs = sorted(zip(distances, self.destroyable_elements), key=lambda a: a[0])
-        if sorted_pairs:
-            # Get the element with the shortest distance
-            element = sorted_pairs[0][1]
-            distance = sorted_pairs[0][0]
-
-            if distance < element.pseudo_hitbox_distance:
-                # If the distance is less than the element's hitbox distance, then the ray has hit the element
-                self.hit_element = element
-                return True
-
-        # If there are no pairs, then the ray has not hit anything
-        self.hit_element = None
-        return False
+        return element.ray_destroyable
 
     def _on_raycast_stopped(self, hit: bool):
         LOGGER.log_debug('BulletRay Stopped!')
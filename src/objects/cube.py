@@ -1,17 +1,15 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from utils.geometry import Vec3
 
 from objects.model_element import ModelElement
 from wavefront.model import Model
-from wavefront.model_reader import ModelReader
-
-CUBE_MODEL = ModelReader().load_model_from_file('models/cube.obj')
+from wavefront.model_cache import MODEL_CACHE
 
 @dataclass
 class Cube(ModelElement):
     ''' An element that represents a cube. '''
-    model: Model = CUBE_MODEL # Pre-loaded model
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/cube.obj'))
 
     @property
     def center(self) -> Vec3:
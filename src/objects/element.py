@@ -1,27 +1,27 @@
 from copy import deepcopy
 import random
-import constants
 from dataclasses import dataclass, field
-import time
 from typing import TYPE_CHECKING, Union
-import glm
 import numpy as np
 
 from OpenGL import GL as gl
 from utils.geometry import Rect2, Vec3
 from utils.logger import LOGGER
 
+from gl_abstractions.mesh import MeshRegistry
 from gl_abstractions.texture import Texture
-from gl_abstractions.vertex_array import VertexArray
-from gl_abstractions.vertex_buffer import VertexBuffer
 
 from gl_abstractions.shader import Shader, ShaderDB
 from wavefront.material import Material
 
+from culling import transform_aabb, transform_sphere
+from render_queue import RenderPass
 from transform import Transform
 from wavefront.model import Model
 
 if TYPE_CHECKING:
+    from bvh import TriangleHit
+    from objects.physics.physics_system import PhysicsBody
     from objects.world import World
 
 # TODO: move classes out of this file (too many lines)
@@ -31,6 +31,7 @@ class ShapeSpec:
     '''
     Basic class that store the vertices data of the object.
     It contains the vertices coordinates and its color
+    If indices is set, the shape is drawn with an index buffer (indexed geometry).
     '''
     vertices: np.ndarray
     indices: np.ndarray = None
@@ -60,96 +61,76 @@ class ShapeRenderer:
         self.texture = self.shape_spec.texture
         self.shape_name = self.shape_spec.name
 
-        self.vao = VertexArray()
-        self.vao.bind()
-        self.vbo = VertexBuffer(
+        # Shapes with the same vertex arrays and layout share the mesh (VAO/VBO/IBO)
+        self.mesh = MeshRegistry.get_instance().acquire(
             layout=self.shader.layout,
-            data=self.shape_spec.vertices,
-            usage=gl.GL_DYNAMIC_DRAW
+            vertices=self.shape_spec.vertices,
+            indices=self.shape_spec.indices
         )
-        # self.ibo = VertexBuffer(self.shape_spec.indices)
-        self.vao.upload_vertex_buffer(self.vbo)
 
-    def render(self):
-        # TODO: refactor and comment this (maybe Shader.upload_uniforms()? no idea)
-        from app_vars import APP_VARS
-        # Bind the shader and VAO (VBO is bound in the VAO)
-        self.vao.bind()
-
-        if self.texture is not None:
-            self.texture.bind()
-
-        self.shader.use()
-
-        # gl.glBindTextureUnit(0, self.texture)
-
-        # Calculate MVP
-
-        # Model
-        mat_model = self.transform.model_matrix
+        # World-space bounding volumes, recomputed only when the model matrix changes (see _update_world_bounds)
+        self._bounds_model_matrix: np.ndarray = None
+        self._world_sphere: tuple[np.ndarray, float] = None
+        self._world_aabb: tuple[np.ndarray, np.ndarray] = None
+
+    def _update_world_bounds(self):
+        model_matrix = self.transform.model_matrix
+        # Transform's matrix cache returns the same array while the transform is unchanged
+        if model_matrix is not self._bounds_model_matrix:
+            self._world_sphere = transform_sphere(self.mesh.sphere_center, self.mesh.sphere_radius, model_matrix)
+            self._world_aabb = transform_aabb(self.mesh.aabb_min, self.mesh.aabb_max, model_matrix)
+            self._bounds_model_matrix = model_matrix
+
+    def world_bounding_sphere(self) -> tuple[np.ndarray, float]:
+        ''' Center and radius of a sphere that contains the shape in world space (used for frustum culling) '''
+        self._update_world_bounds()
+        return self._world_sphere
+
+    def world_aabb(self) -> tuple[np.ndarray, np.ndarray]:
+        ''' Minimum and maximum corners of an axis-aligned box that contains the shape in world space '''
+        self._update_world_bounds()
+        return self._world_aabb
+
+    def release(self):
+        ''' Releases the mesh of the shape (the renderer can't be used anymore) '''
+        if self.mesh is not None:
+            MeshRegistry.get_instance().release(self.mesh)
+            self.mesh = None
+
+    def draw(self, material: Material):
+        '''
+        Uploads the uniforms of the shape and draws it.
+        The shader, mesh and texture must already be bound (see RenderQueue.flush).
+        '''
+        # Upload Model Matrix (view and projection are in the Camera uniform block, see RenderContext)
+        self.shader.upload_uniform_matrix4f('u_Model', self.transform.model_matrix)
+
+        self._upload_material(self.shader, material)
 
-        # View
-        camera = APP_VARS.camera
-        # TODO: stop using glm for that (assignment requisite)
-        mat_view = glm.lookAt(glm.vec3(*camera.transform.translation), glm.vec3(
-            *camera.transform.translation) + camera.cameraFront, camera.cameraUp)
-        mat_view = np.array(mat_view)
-
-        # Projection
-        # TODO: stop using glm for that (assignment requisite)
-        mat_projection = glm.perspective(glm.radians(
-            camera.fov), constants.WINDOW_SIZE[0]/constants.WINDOW_SIZE[1], 0.1, 1000.0)
-        mat_projection = np.array(mat_projection)
-
-        # Upload MVP Matrices
-        # TODO: only upload if changed (to increase performance)
-        self.shader.upload_uniform_matrix4f('u_Model', mat_model)
-        self.shader.upload_uniform_matrix4f('u_View', mat_view)
-        self.shader.upload_uniform_matrix4f('u_Projection', mat_projection)
-
-        # Upload Material Properties
-        material = self.shape_spec.material
-
-        self.shader.upload_uniform_vec3(
+        # Draw the vertices according to the primitive
+        self.mesh.draw(self.shape_spec.render_mode)
+
+    def draw_instanced(self, material: Material, model_matrices: np.ndarray):
+        '''
+        Draws the shape once per model matrix (rows of 16 floats), with the instanced variant of the shader.
+        The instanced shader, mesh and texture must already be bound (see RenderQueue.flush).
+        '''
+        self._upload_material(self.shader.instanced_variant, material)
+        self.mesh.draw_instanced(self.shape_spec.render_mode, model_matrices)
+
+    def _upload_material(self, shader: Shader, material: Material):
+        ''' Uploads the material and texture uniforms (global lighting, light sources and camera position are in uniform blocks) '''
+        shader.upload_uniform_vec3(
             'u_Ka', material.Ka.values.astype(np.float32))
-        self.shader.upload_uniform_vec3(
+        shader.upload_uniform_vec3(
             'u_Kd', material.Kd.values.astype(np.float32))
-        self.shader.upload_uniform_vec3(
+        shader.upload_uniform_vec3(
             'u_Ks', material.Ks.values.astype(np.float32))
-        self.shader.upload_uniform_float('u_Ns', material.Ns)
-        self.shader.upload_uniform_float('u_d', material.d)
-
-        # Upload Global Lighting Properties
-        # TODO: only upload if changed (to increase performance)
-        self.shader.upload_uniform_vec3('u_GKa', Vec3(
-            APP_VARS.lighting_config.Ka_x, APP_VARS.lighting_config.Ka_y, APP_VARS.lighting_config.Ka_z))
-        self.shader.upload_uniform_vec3('u_GKd', Vec3(
-            APP_VARS.lighting_config.Kd_x, APP_VARS.lighting_config.Kd_y, APP_VARS.lighting_config.Kd_z))
-        self.shader.upload_uniform_vec3('u_GKs', Vec3(
-            APP_VARS.lighting_config.Ks_x, APP_VARS.lighting_config.Ks_y, APP_VARS.lighting_config.Ks_z))
-        self.shader.upload_uniform_float('u_GNs', APP_VARS.lighting_config.Ns)
-
-        # Upload light sources positions
-        if APP_VARS.last_bullet:
-            self.shader.upload_uniform_vec3(
-                'u_BulletPos', APP_VARS.last_bullet.transform.translation.values.astype(np.float32))
-        else:
-            self.shader.upload_uniform_vec3('u_BulletPos',  Vec3(
-                0, -1000, 0).values.astype(np.float32))
-
-        self.shader.upload_uniform_vec3(
-            'u_AuxRobotPos', APP_VARS.lighting_config.light_position.values.astype(np.float32))
-
-        # Upload Camera Position
-        self.shader.upload_uniform_vec3(
-            'u_CameraPos', APP_VARS.camera.transform.translation.values.astype(np.float32))
+        shader.upload_uniform_float('u_Ns', material.Ns)
+        shader.upload_uniform_float('u_d', material.d)
 
         # Upload bool to know if the shape should try to read a texture
-        self.shader.upload_bool('u_HasTexture', int(self.texture is not None))
-
-        # Draw the vertices according to the primitive
-        gl.glDrawArrays(self.shape_spec.render_mode, 0,
-                        len(self.shape_spec.vertices))
+        shader.upload_bool('u_HasTexture', int(self.texture is not None))
 
 
 @dataclass
@@ -171,15 +152,15 @@ class ElementSpecification:
     @staticmethod
     def from_model(model: Model, shader: Shader = None, texture=None) -> 'ElementSpecification':
         ''' Create an ElementSpecification from a model. '''
+        from app_vars import APP_VARS
         elspec = ElementSpecification()
+        indexed = APP_VARS.rendering_options.indexed_geometry
 
         if shader is None:
             shader = ShaderDB.get_instance().get_shader(
                 'light_texture')  # TODO: make shader part of the material?
 
         for object in model.objects:
-            # TODO: instead of unindexed, use indices (make a GUI option)
-            vertices_list = object.expand_faces_to_unindexed_vertices()
             material = object.material
 
             # assert material.name in ['Tree', 'Leaves'], f'{material.name}'
@@ -191,16 +172,14 @@ class ElementSpecification:
             has_normal = 'a_Normal' in [attr[0]
                                         for attr in shader.layout.attributes]
 
-            # # TODO: rename this variable to something less confusing
-            vertices_array = np.array([
-                # Example Vertex: (posX, posY, posZ, texU, texV, normX, normY, normZ)
-                vertex.to_tuple(has_position, has_texcoord, has_normal) for vertex in vertices_list
-            ], dtype=np.float32)
+            # Example Vertex: (posX, posY, posZ, texU, texV, normX, normY, normZ)
+            # Memoized by the object, so all elements of this model share the arrays (and thus the mesh on the GPU)
+            vertices_array, indices_array = object.get_vertex_data(has_position, has_texcoord, has_normal, indexed)
 
-            if len(vertices_array.shape) == 2:
+            if len(vertices_array.shape) == 2 and vertices_array.shape[0] > 0:
                 object_shape = ShapeSpec(
                     vertices=vertices_array,
-                    # indices= # TODO: use indices (if GUI option is enabled),
+                    indices=indices_array,
                     shader=shader,
                     render_mode=gl.GL_TRIANGLES,
                     name=f'{object.name}',
@@ -251,7 +230,6 @@ class BoundingBox2DCache:
 @dataclass
 class PhysicsState:
     ''' Class that defines the physics state of an object. '''
-    last_tick_time: float = field(default_factory=lambda: time.time())
     # TODO: add momentum and velocity here
     # TODO: collision system
     # TODO: physics material? probably not here
@@ -276,6 +254,9 @@ class Element:
     transform: Transform = field(default_factory=Transform)
     ray_selectable: bool = True
     ray_destroyable: bool = True
+    lighting_override: Union[dict[str, np.ndarray], None] = None # Lighting values to replace when drawing this element (see RenderContext.bind_lighting)
+    static: bool = False # Never moves: the world merges its shapes with other static ones (see StaticBatcher)
+    render_pass: RenderPass = RenderPass.OPAQUE # When its shapes are drawn (transparent ones go to the TRANSPARENT pass)
 
     def __post_init__(self):
         ''' Initialize the element. '''
@@ -285,6 +266,8 @@ class Element:
             self.transform, Transform), f"Expected 'transform' to be a 'Transform', but got {type(self.transform)} instead"
 
         self._state = ElementState()
+        self._static_batcher = None # Set while the element is drawn by a StaticBatcher
+        self.physics_body: Union['PhysicsBody', None] = None # Set by elements moved by the world's PhysicsSystem
         self._shape_renderers = [
             ShapeRenderer(
                 element_name=self.name,
@@ -306,13 +289,43 @@ class Element:
     @property
     def center(self) -> Vec3:
         ''' Returns the center of the element (some models have its vertices centered around 0,0,0, but this is not the case for all models). '''
-        return self.transform.translation.xyz
+        return self.transform.world_translation.xyz
 
     @property
     def pseudo_hitbox_distance(self) -> float:
         ''' Instead of using the bounding box, use the distance between the center of the elements to check if the element is hit. '''
         return self.transform.scale.magnitude()
 
+    @property
+    def world_aabb(self) -> tuple[np.ndarray, np.ndarray]:
+        ''' Axis-aligned box (minimum and maximum corners) that contains all the shapes of the element, in world space. '''
+        if not self._shape_renderers:
+            # Nothing to bound, use the hitbox
+            center = self.center.values
+            return center - self.pseudo_hitbox_distance, center + self.pseudo_hitbox_distance
+
+        boxes = [ renderer.world_aabb() for renderer in self._shape_renderers ]
+        return np.min([ box[0] for box in boxes ], axis=0), np.max([ box[1] for box in boxes ], axis=0)
+
+    def raycast_triangles(self, origin: np.ndarray, direction: np.ndarray, max_distance: float = np.inf) -> Union[tuple['ShapeRenderer', 'TriangleHit'], None]:
+        '''
+        Returns the nearest triangle of the element hit by the ray (in world space) and its shape, or None.
+        The ray is moved to model space once (the shapes share the element's transform) and tested against the BVH of each mesh.
+        '''
+        from bvh import intersect_nearest
+        renderers = [ renderer for renderer in self._shape_renderers if renderer.shape_spec.render_mode == gl.GL_TRIANGLES ]
+        if not renderers:
+            return None
+
+        inverse_model_matrix = np.linalg.inv(self.transform.model_matrix)
+        local_origin = inverse_model_matrix[:3, :3] @ origin + inverse_model_matrix[:3, 3]
+        local_direction = inverse_model_matrix[:3, :3] @ direction # Not normalized: the distance along it is the world distance
+
+        hit = intersect_nearest([ renderer.mesh.bvh for renderer in renderers ], local_origin, local_direction, max_distance)
+        if hit is None:
+            return None
+        return renderers[hit[0]], hit[1]
+
     def destroy(self):
         if self.destroyed:
             LOGGER.log_warning(
@@ -322,9 +335,13 @@ class Element:
         # The world will remove the element from the list of elements
         self._state.destroyed = True
 
+    def release(self):
+        ''' Releases the GPU resources of the element. Called by the world after removing a destroyed element. '''
+        for renderer in self._shape_renderers:
+            renderer.release()
+
     def update(self, delta_time: float):
         ''' Virtual method that is called every frame. '''
-        self._try_update_physics()
         self._render(delta_time=delta_time)
         pass
 
@@ -335,6 +352,10 @@ class Element:
 
         self._state.selected = True
 
+        # It may be edited from now on: draw it by itself
+        if self._static_batcher is not None:
+            self._static_batcher.remove(self)
+
         # Change element material to a new one (red in all light types)
         self._old_materials = []
         for shape in self.shape_specs:
@@ -355,20 +376,22 @@ class Element:
         for shape, material in zip(self.shape_specs, self._old_materials):
             shape.material = material
 
-    def _try_update_physics(self):
-        ''' Every frame, check if it's time to update the physics, and if so, update it. '''
-        if (delta_time := time.time() - self._state.physics_state.last_tick_time) > 1/PHYSICS_TPS:
-            self._state.physics_state.last_tick_time = time.time()
-            self._physics_update(delta_time)
+    def fixed_update(self, delta_time: float):
+        ''' Called by the world on every physics step (PHYSICS_TPS times per second, always with delta_time = 1/PHYSICS_TPS). '''
+        self._physics_update(delta_time)
 
     def _physics_update(self, delta_time: float):
-        ''' Virtual method that is called every physics frame (around 50TPS) to update the physics. '''
+        ''' Virtual method that is called every physics step (PHYSICS_TPS times per second, see fixed_update) to update the physics. '''
         pass
 
     def _render(self, delta_time: float):
-        ''' Virtual method that is called every frame to render the element. '''
+        ''' Virtual method that is called every frame to render the element (its shapes are drawn by the world's render queue). '''
+        if self._static_batcher is not None:
+            return # Drawn by the static batches
+
+        from app_vars import APP_VARS
         for renderer in self._shape_renderers:
-            renderer.render()
+            APP_VARS.world.render_queue.submit(renderer, lighting_override=self.lighting_override, render_pass=self.render_pass)
 
     def __repr__(self) -> str:
         ''' Return a string representation of the element '''
@@ -1,22 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import math
-import time
 
 from utils.geometry import Vec3
 from objects.model_element import ModelElement
 from wavefront.model import Model
-from wavefront.model_reader import ModelReader
+from wavefront.model_cache import MODEL_CACHE
 
 
-FREN_MODEL = ModelReader().load_model_from_file('models/fren.obj')
-
 @dataclass
 class Fren(ModelElement):
     ''' 
     A decorative element that represents a fren (Friend). 
     Note: you shouldn't do mean things to your frens, they are your frens.
     '''
-    model: Model = FREN_MODEL
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/fren.obj'))
 
     def __post_init__(self):
         self._dying = False # Die animation
@@ -27,8 +24,9 @@ class Fren(ModelElement):
         if self._dying: # If you killed the fren, then you shall enter an existencial crisis
 
             # Wibbly Wobbly Timey Wimey Stuff going on here:
-            self.transform.scale.xyz = Vec3(math.sin(time.time()) * self.transform.scale.y,  self.transform.scale.y * ( 1- 0.01 * delta_time * 10) ,math.cos(time.time()) * self.transform.scale.y)
-            self.transform.rotation.y = abs(math.sin(time.time() * self.transform.scale.y) * math.pi * 2)
+            t = APP_VARS.world.time
+            self.transform.scale.xyz = Vec3(math.sin(t) * self.transform.scale.y,  self.transform.scale.y * ( 1- 0.01 * delta_time * 10) ,math.cos(t) * self.transform.scale.y)
+            self.transform.rotation.y = abs(math.sin(t * self.transform.scale.y) * math.pi * 2)
             APP_VARS.camera.fov = self.transform.scale.y * 75
             if self.transform.scale.y < 0.01:
                 # After a while of shrinking, actually destroy the fren and overcome the crisis
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+
+from objects.element import PHYSICS_TPS
+
+# Most physics steps run in a single frame. When a frame takes longer than this many steps (e.g. a hitch while loading),
+# the rest of the time is dropped instead of being caught up, so slow steps don't make the next frame even slower
+MAX_STEPS_PER_FRAME = 5
+
+# How often the rates are measured, in seconds
+RATE_WINDOW = 1.0
+
+@dataclass
+class FixedTimestep:
+    '''
+    Decides how many fixed-length physics steps each frame runs (see World.update).
+    The time of every frame is added to an accumulator, and a step runs for each step_duration it holds:
+        for _ in range(timestep.advance(frame_time, now)):
+            step(timestep.step_duration)
+        render(interpolated with timestep.alpha)
+    So the simulation advances PHYSICS_TPS steps per second no matter the frame rate, always with the same delta time.
+    '''
+    step_duration: float = 1 / PHYSICS_TPS
+    max_steps_per_frame: int = MAX_STEPS_PER_FRAME
+    accumulator: float = 0.0 # Time not simulated yet (less than a step after advance)
+
+    # Counters since the start
+    total_steps: int = 0
+    total_frames: int = 0
+    dropped_steps: int = 0 # Steps skipped because of the cap
+
+    # Measured every RATE_WINDOW seconds
+    step_rate: float = 0.0 # Physics steps per second
+    render_rate: float = 0.0 # Frames per second
+
+    def __post_init__(self):
+        self._window_start = None
+        self._window_steps = 0
+        self._window_frames = 0
+
+    @property
+    def alpha(self) -> float:
+        ''' How far the current time is between the last step and the next one (0 to 1), to interpolate what is rendered '''
+        return min(self.accumulator / self.step_duration, 1.0)
+
+    def advance(self, frame_time: float, now: float) -> int:
+        ''' Adds the time of a frame and returns how many steps to run in it '''
+        self.accumulator += max(frame_time, 0.0)
+        steps = int(self.accumulator // self.step_duration)
+
+        if steps > self.max_steps_per_frame:
+            # Drop the whole steps that don't fit, but keep the fraction of a step (alpha)
+            self.dropped_steps += steps - self.max_steps_per_frame
+            steps = self.max_steps_per_frame
+            self.accumulator %= self.step_duration
+        else:
+            self.accumulator = max(self.accumulator - steps * self.step_duration, 0.0)
+        self.total_steps += steps
+        self.total_frames += 1
+        self._update_rates(steps, now)
+        return steps
+
+    def _update_rates(self, steps: int, now: float):
+        if self._window_start is None:
+            self._window_start = now
+
+        self._window_steps += steps
+        self._window_frames += 1
+
+        if (elapsed := now - self._window_start) >= RATE_WINDOW:
+            self.step_rate = self._window_steps / elapsed
+            self.render_rate = self._window_frames / elapsed
+            self._window_start = now
+            self._window_steps = self._window_frames = 0
@@ -0,0 +1,213 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Union
+
+import numpy as np
+from utils.geometry import Vec3
+
+from objects.element import PHYSICS_TPS
+
+if TYPE_CHECKING:
+    from objects.element import Element
+
+INITIAL_CAPACITY = 64
+
+def _rows(columns: int = 3, fill: float = 0, dtype=np.float64) -> np.ndarray:
+    shape = (INITIAL_CAPACITY, columns) if columns else (INITIAL_CAPACITY,)
+    return np.full(shape, fill, dtype=dtype)
+
+@dataclass
+class PhysicsBody:
+    '''
+    Thin view of an element's row in the PhysicsSystem.
+    position, velocity and acceleration are NumPy views of the row (read them again after bodies are added or removed):
+        body.acceleration[:] = force * accel # The system integrates it every tick
+        body.position[1] = 2 # Teleport (the transform is updated after the next step)
+    Velocities are in world units per tick (at PHYSICS_TPS), accelerations in units per tick per tick.
+    '''
+    system: 'PhysicsSystem'
+    row: int
+    element: 'Element'
+
+    @property
+    def position(self) -> np.ndarray:
+        return self.system.position[self.row]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self.system.velocity[self.row]
+
+    @property
+    def acceleration(self) -> np.ndarray:
+        return self.system.acceleration[self.row]
+
+    @property
+    def max_speed(self) -> float:
+        return float(self.system.max_speed[self.row])
+
+    @max_speed.setter
+    def max_speed(self, value: float):
+        self.system.max_speed[self.row] = value
+
+    @property
+    def friction(self) -> float:
+        return float(self.system.friction[self.row])
+
+    @friction.setter
+    def friction(self, value: float):
+        self.system.friction[self.row] = value
+
+    def teleport(self, position: np.ndarray):
+        ''' Moves the body without interpolating from where it was (see PhysicsSystem.sync_transforms) '''
+        self.system.position[self.row] = position
+        self.system.previous_position[self.row] = position
+
+    def consume_bounces(self) -> np.ndarray:
+        ''' Returns on which axes the body bounced off its bounds since the last call (3 bools) '''
+        bounced = self.system.bounced[self.row].copy()
+        self.system.bounced[self.row] = False
+        return bounced
+
+@dataclass
+class PhysicsSystem:
+    '''
+    Moves every physical element of the world in one vectorized step per tick (see World).
+    The state of the bodies is kept in contiguous arrays (structure of arrays), one row per body;
+    elements keep a PhysicsBody, a view of their row.
+    Usage:
+        body = physics.add_body(element, max_speed=0.1, friction=0.9) # When spawned
+        body.acceleration[:] = force * accel # Every tick, by the element
+        physics.step(delta_time) # Every tick, by the world
+        physics.sync_transforms(alpha) # Every frame, copies the positions to the elements' transforms
+        physics.remove_body(body) # When removed from the world
+
+    Each step, for every body:
+        velocity += acceleration, clamped to max_speed
+        velocity.xz *= friction (fraction of the horizontal velocity kept per tick)
+        position += velocity
+        the velocity is reflected on the axes the body left its bounds, moving away from them
+    (scaled by delta_time * PHYSICS_TPS, so the motion doesn't depend on the actual tick rate)
+
+    The body's position is the source of truth: move physical elements through it, not through their transforms.
+    The transforms are interpolated between the last two steps, so motion is smooth at any frame rate
+    (they lag up to a step behind the bodies). Only the transforms whose interpolated position changed are written,
+    straight into the NumPy array of their translation when it has one (see _writes_in_place).
+    '''
+    count: int = 0
+    position: np.ndarray = field(default_factory=_rows)
+    previous_position: np.ndarray = field(default_factory=_rows) # Before the last step
+    synced_position: np.ndarray = field(default_factory=lambda: _rows(3, np.nan)) # Last written to the transform
+    velocity: np.ndarray = field(default_factory=_rows)
+    acceleration: np.ndarray = field(default_factory=_rows)
+    max_speed: np.ndarray = field(default_factory=lambda: _rows(0, np.inf))
+    friction: np.ndarray = field(default_factory=lambda: _rows(0, 1))
+    bounds_min: np.ndarray = field(default_factory=lambda: _rows(3, -np.inf))
+    bounds_max: np.ndarray = field(default_factory=lambda: _rows(3, np.inf))
+    bounced: np.ndarray = field(default_factory=lambda: _rows(3, False, bool))
+    bodies: list[PhysicsBody] = field(default_factory=list)
+    steps: int = 0 # Number of steps so far
+
+    _ARRAYS = ('position', 'previous_position', 'synced_position', 'velocity', 'acceleration', 'max_speed', 'friction', 'bounds_min', 'bounds_max', 'bounced')
+
+    def __post_init__(self):
+        self._in_place = True # Every body's translation can be written through translation.values
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def _writes_in_place(element: 'Element') -> bool:
+        ''' Whether the translation of the element keeps its coordinates in a writable NumPy array (its values) '''
+        translation = element.transform.translation
+        values = translation.values
+        return isinstance(values, np.ndarray) and values is translation.values and values.flags.writeable and values.shape == (3,)
+
+    def _grow(self):
+        ''' Doubles the capacity of every array (the rows are moved, so views taken before are stale) '''
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            grown = np.empty((len(array) * 2, *array.shape[1:]), dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add_body(self, element: 'Element', max_speed: float = np.inf, friction: float = 1,
+                 bounds: Union[tuple[Vec3, Vec3], None] = None) -> PhysicsBody:
+        ''' Adds a body at the element's current position, at rest. Bounds (minimum and maximum corners) are optional. '''
+        if self.count == len(self.position):
+            self._grow()
+
+        row = self.count
+        self.position[row] = element.transform.translation.values
+        self.previous_position[row] = self.position[row]
+        self.synced_position[row] = np.nan # Written on the next sync
+        self.velocity[row] = 0
+        self.acceleration[row] = 0
+        self.max_speed[row] = max_speed
+        self.friction[row] = friction
+        self.bounds_min[row] = bounds[0].values if bounds else -np.inf
+        self.bounds_max[row] = bounds[1].values if bounds else np.inf
+        self.bounced[row] = False
+
+        self._in_place = self._in_place and self._writes_in_place(element)
+        body = PhysicsBody(self, row, element)
+        self.bodies.append(body)
+        self.count += 1
+        return body
+
+    def remove_body(self, body: PhysicsBody):
+        ''' Removes a body, moving the last one to its row '''
+        last = self.count - 1
+        if body.row != last:
+            for name in self._ARRAYS:
+                array = getattr(self, name)
+                array[body.row] = array[last]
+            moved = self.bodies[last]
+            moved.row = body.row
+            self.bodies[body.row] = moved
+
+        self.bodies.pop()
+        self.count -= 1
+        body.row = -1
+
+    def step(self, delta_time: float):
+        ''' Integrates all bodies at once '''
+        n = self.count
+        ticks = delta_time * PHYSICS_TPS # 1 at exactly PHYSICS_TPS
+        position, velocity = self.position[:n], self.velocity[:n]
+        self.previous_position[:n] = position
+
+        velocity += self.acceleration[:n] * ticks
+
+        speed = np.linalg.norm(velocity, axis=1)
+        too_fast = speed > self.max_speed[:n]
+        velocity[too_fast] *= (self.max_speed[:n][too_fast] / speed[too_fast])[:, None]
+
+        velocity[:, [0, 2]] *= (1 - (1 - self.friction[:n]) * ticks)[:, None]
+
+        position += velocity * ticks
+
+        # Bounce off the bounds (only when moving away, so bodies that are outside can come back)
+        below = (position < self.bounds_min[:n]) & (velocity < 0)
+        above = (position > self.bounds_max[:n]) & (velocity > 0)
+        bounced = below | above
+        velocity[bounced] *= -1
+        self.bounced[:n] |= bounced
+
+        self.steps += 1
+
+    def sync_transforms(self, alpha: float = 1.0):
+        ''' Copies the positions of the bodies to the translation of their elements, interpolated from the previous step by alpha (0 to 1) '''
+        n = self.count
+        previous = self.previous_position[:n]
+        positions = previous + (self.position[:n] - previous) * alpha
+        changed = np.flatnonzero((positions != self.synced_position[:n]).any(axis=1))
+        if changed.size == 0:
+            return
+        self.synced_position[changed] = positions[changed]
+
+        bodies = self.bodies
+        if self._in_place:
+            for row, position in zip(changed.tolist(), positions[changed]):
+                bodies[row].element.transform.translation.values[:] = position
+        else:
+            for row, position in zip(changed.tolist(), positions[changed].tolist()):
+                bodies[row].element.transform.translation.xyz = Vec3(*position)
@@ -1,24 +1,151 @@
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Union
+from enum import Enum, auto
+from typing import TYPE_CHECKING, Callable, Iterable, Union
 
+import numpy as np
 from utils.geometry import Vec3
 from utils.logger import LOGGER
-from objects.element import PHYSICS_TPS, Element, ShapeSpec
+from objects.element import PHYSICS_TPS, Element, ShapeRenderer, ShapeSpec
+from render_queue import RenderPass
 
 if TYPE_CHECKING:
     from objects.world import World
 
+RAY_RANGE = 60 # Rays stop when they get this far from the center of the world
+
+def ray_sphere_distances(origin: np.ndarray, direction: np.ndarray, centers: np.ndarray, radii: np.ndarray) -> np.ndarray:
+    '''
+    Distance along the ray (direction normalized) to where it enters each sphere (centers: N x 3, radii: N).
+    0 if the origin is inside the sphere, inf if the ray misses it.
+    '''
+    offsets = centers - origin
+    projections = offsets @ direction # Distance along the ray to the point closest to each center
+    half_chords_squared = radii ** 2 - (np.einsum('ij,ij->i', offsets, offsets) - projections ** 2)
+    half_chords = np.sqrt(np.maximum(half_chords_squared, 0))
+
+    distances = np.maximum(projections - half_chords, 0)
+    missed = (half_chords_squared < 0) | (projections + half_chords < 0) # Passes by it, or it is behind the origin
+    distances[missed] = np.inf
+    return distances
+
+def ray_aabb_distances(origin: np.ndarray, direction: np.ndarray, aabb_mins: np.ndarray, aabb_maxs: np.ndarray) -> np.ndarray:
+    '''
+    Distance along the ray to where it enters each axis-aligned box (corners: N x 3), with the slab test.
+    0 if the origin is inside the box, inf if the ray misses it.
+    '''
+    # Slabs the ray is parallel to: it either is always between their planes or never
+    parallel = direction == 0
+    outside_parallel_slab = (parallel & ((origin < aabb_mins) | (origin > aabb_maxs))).any(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse_direction = 1 / direction
+        t1 = np.where(parallel, -np.inf, (aabb_mins - origin) * inverse_direction)
+        t2 = np.where(parallel, np.inf, (aabb_maxs - origin) * inverse_direction)
+
+    t_near = np.minimum(t1, t2).max(axis=1)
+    t_far = np.maximum(t1, t2).min(axis=1)
+
+    hit = (t_near <= t_far) & (t_far >= 0) & ~outside_parallel_slab
+    return np.where(hit, np.maximum(t_near, 0), np.inf)
+
+class HitboxMode(Enum):
+    ''' What the rays test to find what they hit '''
+    SPHERE = auto() # Center and pseudo_hitbox_distance of the elements
+    AABB = auto() # World bounding boxes of the meshes of the elements
+    TRIANGLES = auto() # Triangles of the meshes (exact, through the BVH of each mesh)
+
+@dataclass
+class RayHit:
+    ''' The nearest element hit by a ray '''
+    element: Element
+    distance: float # Along the ray, from its origin
+    point: np.ndarray # Where the ray enters the hitbox of the element
+
+    # Only for HitboxMode.TRIANGLES: the shape, its triangle (see TriangleHit.triangle) and the weights of its vertices at the hit point
+    shape_renderer: Union[ShapeRenderer, None] = None
+    triangle: Union[int, None] = None
+    barycentrics: Union[np.ndarray, None] = None
+
+def _raycast_triangles(origin: np.ndarray, direction: np.ndarray, max_distance: float,
+                       candidates: list[Element], box_distances: np.ndarray) -> Union[RayHit, None]:
+    ''' Tests the triangles of the candidates, nearest bounding box first, until the boxes left are farther than the best hit '''
+    best: Union[RayHit, None] = None
+    for index in np.argsort(box_distances):
+        if np.isinf(box_distances[index]) or box_distances[index] > max_distance:
+            break
+
+        element = candidates[index]
+        element_hit = element.raycast_triangles(origin, direction, max_distance)
+        if element_hit is None:
+            continue
+
+        shape_renderer, triangle_hit = element_hit
+        max_distance = triangle_hit.distance
+        best = RayHit(
+            element, triangle_hit.distance, origin + direction * triangle_hit.distance,
+            shape_renderer=shape_renderer, triangle=triangle_hit.triangle, barycentrics=triangle_hit.barycentrics,
+        )
+
+    return best
+
+def raycast(world: 'World', origin: Iterable[float], direction: Iterable[float], max_distance: float,
+            is_target: Callable[[Element], bool], hitbox: HitboxMode = HitboxMode.SPHERE) -> Union[RayHit, None]:
+    '''
+    Returns the nearest element (among the ones is_target accepts) hit by the ray, up to max_distance, or None.
+    The spheres and bounding boxes of all candidates are tested at once.
+    '''
+    origin = np.fromiter(origin, dtype=np.float64, count=3)
+    direction = np.fromiter(direction, dtype=np.float64, count=3)
+    length = np.linalg.norm(direction)
+    if length == 0:
+        return None
+    direction /= length
+
+    if hitbox == HitboxMode.SPHERE:
+        candidates = [ element for element in world.spatial_grid.query_segment(origin, origin + direction * max_distance) if is_target(element) ]
+    else:
+        # The meshes may be bigger than the spheres the spatial grid indexes, so every element is a candidate
+        candidates = [ element for element in world.elements if is_target(element) ]
+
+    if not candidates:
+        return None
+
+    if hitbox == HitboxMode.SPHERE:
+        centers = np.array([ element.center.values for element in candidates ], dtype=np.float64)
+        radii = np.array([ element.pseudo_hitbox_distance for element in candidates ], dtype=np.float64)
+        distances = ray_sphere_distances(origin, direction, centers, radii)
+    else:
+        boxes = [ element.world_aabb for element in candidates ]
+        distances = ray_aabb_distances(origin, direction, np.array([ box[0] for box in boxes ]), np.array([ box[1] for box in boxes ]))
+
+    if hitbox == HitboxMode.TRIANGLES:
+        return _raycast_triangles(origin, direction, max_distance, candidates, distances)
+
+    nearest = int(np.argmin(distances))
+    distance = float(distances[nearest])
+    if np.isinf(distance) or distance > max_distance:
+        return None
+
+    return RayHit(candidates[nearest], distance, origin + direction * distance)
+
 @dataclass
 class Ray(Element, metaclass=ABCMeta):
+    '''
+    An element that travels from an origin in a direction until it hits a target (see _is_target) or gets out of range.
+    By default, what it hits is found with a single raycast when it is spawned, and the hit happens when the ray reaches it.
+    With APP_VARS.raycast_options.swept, the segment it moved is tested every tick instead (follows targets that move).
+    '''
     direction: Vec3 = field(default_factory=lambda: Vec3(0,0,0))
     shape_specs: list[ShapeSpec] = None
     ray_selectable: bool = False
     ray_destroyable: bool = False
+    render_pass: RenderPass = RenderPass.DEBUG # Its shapes are debug cubes
 
     def __post_init__(self):
         self.direction: Union[Vec3, None] = None
         self.shape_specs = self.shape_specs or []
+        self.hit_element: Union[Element, None] = None
         return super().__post_init__()
 
     def cast(self, world: 'World', origin: Vec3, direction: Vec3):
@@ -27,7 +154,7 @@ class Ray(Element, metaclass=ABCMeta):
         self.transform.translation = origin.xyz
         self.direction = direction.xyz
         from app_vars import APP_VARS
-        self.transform.rotation.xyz = APP_VARS.camera.transform.rotation.xyz 
+        self.transform.rotation.xyz = APP_VARS.camera.transform.rotation.xyz
         world.spawn(self)
 
     def on_spawned(self, world: 'World'):
@@ -38,14 +165,52 @@ class Ray(Element, metaclass=ABCMeta):
             # Example: Ray(name='MyAwesomeRay').cast(...)
             LOGGER.log_warning(f'Trying to spawn a Ray directly! please use the cast() method')
             self.destroy()
+            return super().on_spawned(world)
+
+        from app_vars import APP_VARS
+        self._world = world
+        self._swept = APP_VARS.raycast_options.swept
+        self._hitbox = APP_VARS.raycast_options.hitbox_mode
+        self._travelled = 0.0
+
+        # Distance until the ray gets out of range
+        origin = self.transform.translation.values.astype(np.float64)
+        direction = self.direction.normalized().values
+        along = origin @ direction
+        self._max_distance = max(0.0, -along + np.sqrt(max(along ** 2 - (origin @ origin - RAY_RANGE ** 2), 0)))
+
+        self._pending_hit = None if self._swept else self._raycast(origin, self._max_distance)
 
         return super().on_spawned(world)
 
+    def _raycast(self, origin: np.ndarray, max_distance: float) -> Union[RayHit, None]:
+        return raycast(self._world, origin, self.direction, max_distance, self._is_target, hitbox=self._hitbox)
+
     @abstractmethod
-    def _has_hit(self) -> bool:
-        ''' Virtual method to determine if the ray has hit something '''
+    def _is_target(self, element: Element) -> bool:
+        ''' Virtual method to determine if the ray can hit an element '''
         pass
-        
+
+    def _find_hit(self, last_position: np.ndarray) -> Union[RayHit, None]:
+        ''' Returns what the ray hit while moving from last_position to its current position, if anything '''
+        step_length = np.linalg.norm(self.transform.translation.values - last_position)
+        self._travelled += step_length
+
+        if self._swept:
+            return self._raycast(last_position, step_length)
+
+        if self._pending_hit is not None and self._pending_hit.element.destroyed:
+            # Something else destroyed the target before the ray got there: look for what is behind it
+            travelled_before = self._travelled - step_length
+            self._pending_hit = self._raycast(last_position, self._max_distance - travelled_before)
+            if self._pending_hit is not None:
+                self._pending_hit.distance += travelled_before
+
+        if self._pending_hit is None or self._travelled < self._pending_hit.distance:
+            return None
+
+        return self._pending_hit
+
     @abstractmethod
     def _on_raycast_stopped(self, hit: bool):
         ''' Virtual method to handle the raycast stopping (either because it hit something or some other reason, such as the ray being out of range) '''
@@ -60,16 +225,16 @@ class Ray(Element, metaclass=ABCMeta):
     def _physics_update(self, delta_time: float):
         ''' Overrides Element method '''
         # Move the ray based on the direction
+        last_position = self.transform.translation.values.astype(np.float64)
         self.transform.translation.xyz += self.direction * delta_time * PHYSICS_TPS * 0.5
 
         # Check if the ray has hit something
-        if self._has_hit():
+        if (hit := self._find_hit(last_position)) is not None:
+            self.hit_element = hit.element
             self.__stop_raycast(hit=True)
 
         # Check if the ray has gone out of range
-        if self.transform.translation.magnitude() > 60:
+        elif self.transform.translation.magnitude() > RAY_RANGE:
             self.__stop_raycast(hit=False)
 
         return super()._physics_update(delta_time)
-
-    # TODO: move collision checking of SelectionRay and BulletRay to here (and then to PhysicsSystem, someday)
\ No newline at end of file
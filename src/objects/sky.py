@@ -1,24 +1,31 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import glm
+import numpy as np
 
 from utils.geometry import Vec3
 from gl_abstractions.texture import Texture, Texture2D
 from objects.cube import Cube
+from render_queue import RenderPass
 
-from wavefront.model_reader import ModelReader
+from wavefront.model import Model
+from wavefront.model_cache import MODEL_CACHE
 
 @dataclass
 class Sky(Cube):
     ''' Skybox of the world '''
-    model = ModelReader().load_model_from_file('models/cube.obj')
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/cube.obj'))
     texture: Texture = None
     ray_selectable: bool = False
     ray_destroyable: bool = False
+    render_pass: RenderPass = RenderPass.SKY
 
     def __post_init__(self):
         if self.texture is None:
             # Load it after instantiation because Texture2D needs an OpenGL context to be created
             self.texture = Texture2D.from_image_path('textures/sky_wave.png')
+
+        # Disable all diffuse lighting, so the sky is not affected by any other lighting (it would look unnatural)
+        self.lighting_override = { 'GKd': np.zeros(3, dtype=np.float32) }
         
         super().__post_init__()
 
@@ -26,17 +33,8 @@ class Sky(Cube):
         ''' Overrides Element method '''
 
         self._balance_sky_ambient_light()
-        
-        # Temporarily disable all diffuse lighting, so the sky is not affected by any other lighting (it would look unnatural)
-        from app_vars import APP_VARS
-        GKd_bkp = APP_VARS.lighting_config.Kd_x, APP_VARS.lighting_config.Kd_y, APP_VARS.lighting_config.Kd_z
-        APP_VARS.lighting_config.Kd_x, APP_VARS.lighting_config.Kd_y, APP_VARS.lighting_config.Kd_z = 0, 0, 0
-
         super().update(delta_time)
 
-        # Restore diffuse lighting
-        APP_VARS.lighting_config.Kd_x, APP_VARS.lighting_config.Kd_y, APP_VARS.lighting_config.Kd_z = GKd_bkp
-
     def _balance_sky_ambient_light(self):
         '''
         Balance the ambient light of the sky.
@@ -1,11 +1,10 @@
 from dataclasses import dataclass, field
 import random
-import time
 from typing import Callable
 from utils.geometry import Vec3
 from objects.element import Element, ElementSpecification, ShapeSpec
-from objects.cube import CUBE_MODEL
 from wavefront.material import Material
+from wavefront.model_cache import MODEL_CACHE
 
 
 @dataclass
@@ -50,7 +49,7 @@ class Spawner(Element):
         # TODO: GUI debug_options to show all spawner regions.
         if self.show_debug_cube:
             self.shape_specs = ElementSpecification.from_model(
-                CUBE_MODEL).shape_specs  # TODO: self.elspec instead of shapespecs
+                MODEL_CACHE.load_model('models/cube.obj')).shape_specs  # TODO: self.elspec instead of shapespecs
             color = Vec3(0, 0, 0.3)  # Blue
             self.shape_specs[0].material = Material(
                 'Transparent Spawner Overlay', Ka=color.xyz, Kd=color.xyz, d=0.1)
@@ -74,7 +73,8 @@ class Spawner(Element):
         # Keeps track of the last time the spawner tried to spawn an element.
         # This is used to calculate the wait time.
         # Initialize with the current time (so that the spawner will not spawn immediately).
-        self._last_tried_spawn_time = time.time()
+        from app_vars import APP_VARS
+        self._last_tried_spawn_time = APP_VARS.world.time
 
         # Keeps track of the maximum number of concurrently spawned elements (used for insta_replace_destroyed).
         self._max_seen_elements = 0
@@ -126,11 +126,12 @@ class Spawner(Element):
         self._remove_destroyed_elements()
 
         # Calculate the time since the last time the spawner tried to spawn an element.
-        elapsed_time = time.time() - self._last_tried_spawn_time
+        from app_vars import APP_VARS
+        elapsed_time = APP_VARS.world.time - self._last_tried_spawn_time
 
         # If the elapsed time is greater than the wait time, then try to spawn an element.
         if elapsed_time > self._wait_time:
-            self._last_tried_spawn_time = time.time()
+            self._last_tried_spawn_time = APP_VARS.world.time
 
             # If the maximum number of spawned elements is not reached, then spawn an element.
             element_count = len(self.spawned_elements)
@@ -1,14 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from objects.model_element import ModelElement
 from wavefront.model import Model
-from wavefront.model_reader import ModelReader
-
-TARGET_SMALL_MODEL = ModelReader().load_model_from_file('models/target_small.obj')
+from wavefront.model_cache import MODEL_CACHE
 
 @dataclass 
 class TargetSmall(ModelElement):
-    model: Model = TARGET_SMALL_MODEL
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/target_small.obj'))
 
     @property
     def pseudo_hitbox_distance(self) -> float:
@@ -5,9 +5,8 @@ from gl_abstractions.texture import Texture, Texture2D
 
 from objects.cube import Cube
 from wavefront.model import Model
-from wavefront.model_reader import ModelReader
+from wavefront.model_cache import MODEL_CACHE
 
-ALVO_2_MODEL = ModelReader().load_model_from_file('models/alvo2.obj')
 ALVO_2_TEXTURE = None 
 def get_tex():
     # TODO: remove this and make a TextureDB and ModelDB
@@ -22,7 +21,7 @@ def get_tex():
 @dataclass
 class WoodTarget(Cube):
     ''' An element that represents a wood target. '''
-    model: Model = field(default_factory= lambda: ALVO_2_MODEL)
+    model: Model = field(default_factory=lambda: MODEL_CACHE.load_model('models/alvo2.obj'))
     texture: Texture = field(default_factory=get_tex)
     ray_selectable: bool = True
     ray_destroyable: bool = True
@@ -2,6 +2,7 @@ import math
 import random
 import sys
 import time
+from typing import Union
 from utils.geometry import Vec3
 from utils.logger import LOGGER
 from gl_abstractions.texture import Texture2D
@@ -11,25 +12,60 @@ from objects.model_element import ModelElement
 from objects.element import Element
 import constants
 from objects.aux_robot import AuxRobot
+from objects.physics.fixed_timestep import FixedTimestep
+from objects.physics.physics_system import PhysicsSystem
 from objects.sky import Sky
 from objects.spawner import Spawner, SpawnerRegion, SpawningProperties
 from objects.target_small import TargetSmall
 from objects.wood_target import WoodTarget
+from render_context import RenderContext
+from profiler import PROFILER
+from render_queue import RenderQueue
+from spatial_grid import SpatialGrid
+from transform_store import TransformStore
+from static_batch import StaticBatcher
 from transform import Transform
 from wavefront.model import Model
-from wavefront.model_reader import ModelReader
+from wavefront.model_cache import MODEL_CACHE
 
 class World:
     '''
     Class responsible for describing the world.
     It holds all the elements in a list and updates them.
     When they are marked for removal, they are removed from the list in the next update.
+    The elements are also indexed by position (spatial_grid), for queries that don't need to scan all of them.
+    Their model matrices are computed together (transforms), once per frame, after they moved and before rendering.
+    Physics runs in fixed steps (timestep), PHYSICS_TPS times per second whatever the frame rate: every frame runs the steps
+    due since the last one, then renders with the physical elements (the ones with a physics_body) interpolated between steps.
+    The physics system moves all physical elements at once.
     '''
+
+    # Every model used by the scene and its elements (preloaded in parallel at startup, see main.py)
+    PRELOADED_MODELS = [
+        'models/cube.obj',
+        'models/tree.obj',
+        'models/rock.obj',
+        'models/house.obj',
+        'models/gun.obj',
+        'models/bot.obj',
+        'models/aux_robot.obj',
+        'models/target_small.obj',
+        'models/alvo2.obj',
+        'models/fren.obj',
+    ]
     
     def __init__(self):
         self.elements: list[Element] = []
         self._last_update_time = time.time()
+        self.time = 0.0 # Simulated seconds since the world was created: elements read it instead of the clock, so runs can be replayed
         self.setup_finished = False
+        self.render_context = RenderContext()
+        self.render_queue = RenderQueue()
+        self.static_batcher = StaticBatcher()
+        self.spatial_grid = SpatialGrid()
+        self.transforms = TransformStore()
+        self.physics = PhysicsSystem()
+        self.timestep = FixedTimestep()
 
     def setup(self):
         '''
@@ -46,19 +82,19 @@ class World:
         
         def load_model(filename: str) -> Model:
             '''Shorthand for loading a model from a file.'''
-            return ModelReader().load_model_from_file(filename)
+            return MODEL_CACHE.load_model(filename)
 
         from app_vars import APP_VARS
         self.spawn(APP_VARS.camera)
 
         #### External environment #####
 
-        ground_main = ModelElement('GroundMain', texture=Texture2D.from_image_path('textures/floor3.png'), model=load_model('models/cube.obj'), ray_selectable=False, ray_destroyable=False)
+        ground_main = ModelElement('GroundMain', texture=Texture2D.from_image_path('textures/floor3.png'), model=load_model('models/cube.obj'), ray_selectable=False, ray_destroyable=False, static=True)
         ground_main.transform.scale = Vec3(constants.WORLD_SIZE, 0.1, constants.WORLD_SIZE)
         ground_main.transform.translation = Vec3(0, -0.1, 0)
         self.spawn(ground_main)
 
-        ground_spawn = ModelElement('GroundSpawn', texture=Texture2D.from_image_path('textures/floor4.png'), model=load_model('models/cube.obj'), ray_selectable=False, ray_destroyable=False)
+        ground_spawn = ModelElement('GroundSpawn', texture=Texture2D.from_image_path('textures/floor4.png'), model=load_model('models/cube.obj'), ray_selectable=False, ray_destroyable=False, static=True)
         ground_spawn.transform.scale = Vec3(20, 0.01, 20)
         ground_spawn.transform.translation = Vec3(0, +0.1, 10)
         self.spawn(ground_spawn)
@@ -105,6 +141,7 @@ class World:
                 name=f'Tree_{index}', 
                 model=TREE_MODEL, 
                 ray_destroyable=False,
+                static=True,
                 transform=Transform(
                     translation=translation,
                     rotation=Vec3(0,random.random() * 2 * math.pi,0)
@@ -129,6 +166,7 @@ class World:
                 name=f'Rock_{index}', 
                 model=ROCK_MODEL, 
                 ray_destroyable=False,
+                static=True,
                 transform=transform
             ) for index, transform in enumerate(rocks_transforms)
 
@@ -165,7 +203,7 @@ class World:
 
         #### Internal environment #####
 
-        house = ModelElement('house', model=load_model('models/house.obj'), ray_destroyable=False)
+        house = ModelElement('house', model=load_model('models/house.obj'), ray_destroyable=False, static=True)
         house.transform.translation.xyz = HOUSE_XYZ
         house.transform.scale.xyz = Vec3(3,3,3)
         self.spawn(house)
@@ -194,12 +232,18 @@ class World:
 
         #### /Internal environment #####
 
+        # Scenery that never moves is drawn in a few merged meshes
+        self.static_batcher.build([ element for element in self.elements if element.static ])
+
         LOGGER.log_info('Done setting up scene', CURRENT_FUNCTION_NAME)
+        self._last_update_time = time.time() # The setup time is not simulated
         self.setup_finished = True
         
     def spawn(self, element: Element):
         ''' Spawns an element in the scene, triggering its on_spawned method. '''
         self.elements.append(element)
+        self.transforms.add(element.transform)
+        self.spatial_grid.insert(element)
         element.on_spawned(world=self)
 
     def destroy(self, element: Element):
@@ -214,32 +258,74 @@ class World:
             APP_VARS.lighting_config.Ka_y *= 0.999 * delta_time * 60
             APP_VARS.lighting_config.Ka_z *= 0.999 * delta_time * 60
 
-    def update(self):
+    def update(self, frame_time: Union[float, None] = None):
         '''
         This function is called every frame.
+        frame_time is the time simulated by this frame (by default, the real time since the last one; headless.py passes a constant).
         It updates the world and all the elements in it.
         Update means:
-            - Update the physics engine
+            - Run the physics steps due since the last frame (elements' fixed_update, then the physics system)
             - Update the elements visuals
             - Update the elements logic
             - Render in OpenGL
         '''
         t = time.time()
-        delta_time = t - self._last_update_time
+        delta_time = t - self._last_update_time if frame_time is None else frame_time
+        self.time += delta_time
+
+        with PROFILER.scope('physics'):
+            for _ in range(self.timestep.advance(delta_time, t)):
+                self._step_physics(self.timestep.step_duration)
+            self.physics.sync_transforms(self.timestep.alpha)
 
         self._update_daylight(delta_time)
-        self._update_elements(delta_time)
+        self._update_render_context()
+        self.render_queue.begin(self.render_context)
+        with PROFILER.scope('update_elements'):
+            self._update_elements(delta_time)
+        with PROFILER.scope('transforms'):
+            self._update_transforms()
+        with PROFILER.scope('render_submission'):
+            self.static_batcher.submit(self.render_queue)
+            self.render_queue.flush()
         self._remove_destroyed_elements()
 
         self._last_update_time = t
 
+    def _update_render_context(self):
+        '''Compute the camera and lighting values used by every renderer in this frame'''
+        from app_vars import APP_VARS
+        self.render_context.update(APP_VARS.camera, APP_VARS.lighting_config, APP_VARS.last_bullet)
+
     def _update_elements(self, delta_time: float):
         '''Update all elements in the world'''
         for element in self.elements[::-1]:
             if not element.destroyed: # In case the element was destroyed while updating another element
                 element.update(delta_time)
 
+    def _update_transforms(self):
+        '''Recompute the model matrices of the elements that moved this frame, and reindex them'''
+        self.transforms.update()
+        for element in self.elements:
+            if not element.destroyed:
+                self.spatial_grid.update(element)
+
+    def _step_physics(self, delta_time: float):
+        '''Run a physics step: the physics logic of every element, then move the physical elements'''
+        for element in self.elements[::-1]:
+            if not element.destroyed:
+                element.fixed_update(delta_time)
+        self.physics.step(delta_time)
+
     def _remove_destroyed_elements(self):
         '''Remove all the destroyed elements from the world'''
+        for element in self.elements:
+            if element.destroyed:
+                self.static_batcher.remove(element)
+                self.spatial_grid.remove(element)
+                self.transforms.remove(element.transform)
+                if element.physics_body is not None:
+                    self.physics.remove_body(element.physics_body)
+                element.release()
         self.elements[:] = [ element for element in self.elements if not element.destroyed ]
         
\ No newline at end of file
@@ -0,0 +1,175 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import json
+import os
+import threading
+import time
+from typing import Iterator
+
+import numpy as np
+
+# Durations kept per phase (the percentiles and plots are over these)
+HISTORY_SIZE = 600
+
+# Scopes kept for the Chrome trace (all phases and threads together)
+TRACE_SIZE = 20_000
+
+class RingBuffer:
+    ''' Fixed-size history of floats: the oldest ones are overwritten '''
+
+    def __init__(self, size: int):
+        self._values = np.zeros(size)
+        self._next = 0
+        self.count = 0 # Number of values ever appended
+
+    def append(self, value: float):
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        self.count += 1
+
+    def values(self) -> np.ndarray:
+        ''' The values kept, oldest first '''
+        if self.count < len(self._values):
+            return self._values[:self.count].copy()
+        return np.roll(self._values, -self._next)
+
+@dataclass
+class PhaseStats:
+    ''' Summary of the history of a phase, in milliseconds '''
+    name: str # Path of the scope, e.g. 'frame/world_update/physics'
+    count: int
+    last: float
+    p50: float
+    p95: float
+    p99: float
+
+    @property
+    def depth(self) -> int:
+        return self.name.count('/')
+
+@dataclass
+class TraceEvent:
+    ''' A finished scope, for the Chrome trace '''
+    name: str
+    thread: str
+    start: float # perf_counter, seconds
+    duration: float # Seconds
+
+@dataclass
+class Profiler:
+    '''
+    Hierarchical CPU profiler of the frame phases, for both threads (GLFW and GUI).
+    Usage:
+        with PROFILER.scope('world_update'):
+            with PROFILER.scope('physics'): # Recorded as 'world_update/physics'
+                ...
+        PROFILER.record('gpu/opaque', milliseconds) # Measured some other way
+        PROFILER.stats() # p50/p95/p99 of every phase, over its last HISTORY_SIZE durations
+        PROFILER.export_chrome_trace('trace.json') # Open in chrome://tracing or https://ui.perfetto.dev
+
+    Scopes nest per thread: the name of a phase is the path of the scopes open in its thread when it started.
+    '''
+    enabled: bool = True
+    history_size: int = HISTORY_SIZE
+    history: dict[str, RingBuffer] = field(default_factory=dict) # Durations (ms) by phase
+    trace: list[TraceEvent] = field(default_factory=list) # Ring buffer of the last TRACE_SIZE scopes
+
+    def __post_init__(self):
+        self._lock = threading.Lock() # Phases are recorded by the GLFW thread and read by the GUI thread
+        self._local = threading.local()
+        self._trace_next = 0
+        self._epoch = time.perf_counter()
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[None]:
+        ''' Times the code inside the with block as the phase 'name', nested in the scopes already open in this thread '''
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        path = f'{stack[-1]}/{name}' if stack else name
+        stack.append(path)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            self._record(path, start, duration)
+
+    def _record(self, path: str, start: float, duration: float):
+        self.record(path, duration * 1000)
+
+        event = TraceEvent(path, threading.current_thread().name, start, duration)
+        with self._lock:
+            if len(self.trace) < TRACE_SIZE:
+                self.trace.append(event)
+            else:
+                self.trace[self._trace_next] = event
+            self._trace_next = (self._trace_next + 1) % TRACE_SIZE
+
+    def record(self, name: str, milliseconds: float):
+        ''' Adds a duration measured some other way (e.g. on the GPU) to the history of a phase, without a trace event '''
+        with self._lock:
+            if (history := self.history.get(name)) is None:
+                history = self.history[name] = RingBuffer(self.history_size)
+            history.append(milliseconds)
+
+    def phase_history(self, name: str) -> np.ndarray:
+        ''' Last durations (ms) of a phase, oldest first '''
+        with self._lock:
+            history = self.history.get(name)
+            return history.values() if history is not None else np.zeros(0)
+
+    def stats(self) -> list[PhaseStats]:
+        ''' Percentiles of every phase, sorted so that children follow their parents '''
+        with self._lock:
+            histories = { name: (history.count, history.values()) for name, history in self.history.items() }
+
+        phases = []
+        for name, (count, values) in sorted(histories.items()):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            phases.append(PhaseStats(name, count, float(values[-1]), float(p50), float(p95), float(p99)))
+        return phases
+
+    def reset(self):
+        ''' Forgets all the history '''
+        with self._lock:
+            self.history.clear()
+            self.trace.clear()
+            self._trace_next = 0
+
+    def export_chrome_trace(self, filename: str):
+        ''' Writes the last scopes in the Chrome trace event format (complete events, in microseconds) '''
+        with self._lock:
+            events = self.trace[self._trace_next:] + self.trace[:self._trace_next]
+
+        threads = { name: index for index, name in enumerate(dict.fromkeys(event.thread for event in events)) }
+        trace_events = [
+            { 'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': { 'name': thread } }
+            for thread, tid in threads.items()
+        ]
+        trace_events += [
+            {
+                'name': event.name.rsplit('/', 1)[-1],
+                'cat': event.name,
+                'ph': 'X',
+                'pid': os.getpid(),
+                'tid': threads[event.thread],
+                'ts': (event.start - self._epoch) * 1e6,
+                'dur': event.duration * 1e6,
+            }
+            for event in events
+        ]
+
+        with open(filename, 'w') as file:
+            json.dump({ 'traceEvents': trace_events, 'displayTimeUnit': 'ms' }, file)
+
+
+PROFILER = Profiler()
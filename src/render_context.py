@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Union
+
+import glm
+import numpy as np
+
+import constants
+from culling import frustum_planes
+from gl_abstractions.uniform_buffer import UniformBuffer
+
+if TYPE_CHECKING:
+    from app_vars import LightingConfig
+    from camera import Camera
+    from objects.bullet_ray import BulletRay
+
+def _vec3() -> np.ndarray:
+    return np.zeros(3, dtype=np.float32)
+
+def _mat4() -> np.ndarray:
+    return np.identity(4, dtype=np.float32)
+
+# Where the bullet light is sent when there is no bullet (far below the ground)
+NO_BULLET_POSITION = (0, -1000, 0)
+
+# Sizes of the uniform blocks of the shaders, with the std140 layout (vec3 is aligned to 16 bytes)
+CAMERA_BLOCK_SIZE = 144 # mat4 u_View, mat4 u_Projection, vec3 u_CameraPos (+ padding)
+LIGHTING_BLOCK_SIZE = 80 # vec3 u_GKa, vec3 u_GKd, vec3 u_GKs, float u_GNs (packed after u_GKs), vec3 u_AuxRobotPos, vec3 u_BulletPos
+
+@dataclass
+class RenderContext:
+    '''
+    Values that are the same for every shape drawn in a frame: camera matrices and position, and global lighting.
+    The world updates it once per frame, before updating the elements, and every ShapeRenderer reads it.
+
+    The matrices are laid out like the shader expects them (vec4(a_Position, 1.0) * u_Model * u_View * u_Projection),
+    so view_projection can replace u_View * u_Projection.
+
+    The values are uploaded to the Camera and Lighting uniform blocks of the shaders (one UniformBuffer each),
+    so the renderers don't upload them for every shape.
+    '''
+    view: np.ndarray = field(default_factory=_mat4)
+    projection: np.ndarray = field(default_factory=_mat4)
+    view_projection: np.ndarray = field(default_factory=_mat4)
+    camera_position: np.ndarray = field(default_factory=_vec3)
+    frustum_planes: np.ndarray = field(default_factory=lambda: np.zeros((6, 4))) # World-space planes of the view frustum (see culling.py)
+
+    # Global lighting
+    GKa: np.ndarray = field(default_factory=_vec3)
+    GKd: np.ndarray = field(default_factory=_vec3)
+    GKs: np.ndarray = field(default_factory=_vec3)
+    GNs: float = 0
+
+    # Light sources
+    bullet_position: np.ndarray = field(default_factory=_vec3)
+    light_position: np.ndarray = field(default_factory=_vec3)
+
+    frame: int = 0 # Number of updates so far
+
+    # Created on the first update (they need an OpenGL context)
+    camera_buffer: UniformBuffer = field(default=None, repr=False)
+    lighting_buffer: UniformBuffer = field(default=None, repr=False)
+    lighting_override_buffer: UniformBuffer = field(default=None, repr=False)
+
+    def update(self, camera: 'Camera', lighting_config: 'LightingConfig', last_bullet: Union['BulletRay', None]):
+        ''' Recomputes everything from the current state of the camera and lighting '''
+        camera_position = glm.vec3(*camera.transform.translation)
+        # TODO: stop using glm for that (assignment requisite)
+        self.view = np.array(glm.lookAt(camera_position, camera_position + camera.cameraFront, camera.cameraUp), dtype=np.float32)
+        self.projection = np.array(glm.perspective(glm.radians(
+            camera.fov), constants.WINDOW_SIZE[0]/constants.WINDOW_SIZE[1], 0.1, 1000.0), dtype=np.float32)
+        self.view_projection = self.projection @ self.view
+        self.frustum_planes = frustum_planes(self.view_projection)
+        self.camera_position = camera.transform.translation.values.astype(np.float32)
+
+        self.GKa = np.array([lighting_config.Ka_x, lighting_config.Ka_y, lighting_config.Ka_z], dtype=np.float32)
+        self.GKd = np.array([lighting_config.Kd_x, lighting_config.Kd_y, lighting_config.Kd_z], dtype=np.float32)
+        self.GKs = np.array([lighting_config.Ks_x, lighting_config.Ks_y, lighting_config.Ks_z], dtype=np.float32)
+        self.GNs = float(lighting_config.Ns)
+
+        if last_bullet:
+            self.bullet_position = last_bullet.transform.translation.values.astype(np.float32)
+        else:
+            self.bullet_position = np.array(NO_BULLET_POSITION, dtype=np.float32)
+        self.light_position = lighting_config.light_position.values.astype(np.float32)
+
+        self.frame += 1
+        self._upload()
+
+    def _camera_block_data(self) -> np.ndarray:
+        ''' Packs the Camera uniform block (std140) '''
+        # The matrices are uploaded with the same bytes as glUniformMatrix4fv(..., GL_FALSE, matrix) would send
+        return np.concatenate([ self.view.ravel(), self.projection.ravel(), self.camera_position, [0] ], dtype=np.float32)
+
+    def _lighting_block_data(self) -> np.ndarray:
+        ''' Packs the Lighting uniform block (std140) '''
+        return np.concatenate([
+            self.GKa, [0],
+            self.GKd, [0],
+            self.GKs, [self.GNs],
+            self.light_position, [0],
+            self.bullet_position, [0],
+        ], dtype=np.float32)
+
+    def _upload(self):
+        ''' Uploads the values to the uniform buffers (one glBufferSubData per block) '''
+        if self.camera_buffer is None:
+            self.camera_buffer = UniformBuffer('Camera', CAMERA_BLOCK_SIZE)
+            self.lighting_buffer = UniformBuffer('Lighting', LIGHTING_BLOCK_SIZE)
+
+        self.camera_buffer.update(self._camera_block_data())
+        self.lighting_buffer.update(self._lighting_block_data())
+
+    def bind_lighting(self, override: Union[dict[str, np.ndarray], None] = None):
+        '''
+        Makes the shaders read the per-frame lighting or, if override is set, the per-frame lighting with
+        some values replaced, e.g. for an element that must not be lit like the others:
+            render_context.bind_lighting({ 'GKd': np.zeros(3, dtype=np.float32) })
+            ... # Draw the element
+            render_context.bind_lighting()
+
+        The overridden values are sent through a separate buffer, so the per-frame buffer is not uploaded again.
+        '''
+        if override is None:
+            self.lighting_buffer.bind_base()
+            return
+
+        if self.lighting_override_buffer is None:
+            self.lighting_override_buffer = UniformBuffer('Lighting', LIGHTING_BLOCK_SIZE)
+
+        old_values = { name: getattr(self, name) for name in override }
+        for name, value in override.items():
+            setattr(self, name, value)
+        self.lighting_override_buffer.update(self._lighting_block_data())
+        for name, value in old_values.items():
+            setattr(self, name, value)
+
+        self.lighting_override_buffer.bind_base()
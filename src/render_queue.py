@@ -0,0 +1,251 @@
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import TYPE_CHECKING, Iterator, Union
+
+import numpy as np
+from utils.logger import LOGGER
+
+from culling import spheres_in_frustum
+from gl_abstractions.stats import GL_STATS
+from gl_abstractions.timer_query import GLTimerQuery, GLTimestamps, create_timer_queries
+from profiler import PROFILER
+from transform import Transform
+from transform_store import world_matrices_of
+from wavefront.material import Material
+
+if TYPE_CHECKING:
+    from gl_abstractions.mesh import Mesh
+    from objects.element import ShapeRenderer
+    from render_context import RenderContext
+
+class RenderPass(IntEnum):
+    ''' Groups of shapes drawn one after the other, in this order (each one is timed on the GPU, see RenderQueue) '''
+    SKY = 0
+    OPAQUE = 1
+    TRANSPARENT = 2 # Shapes of the opaque pass whose material is transparent go here
+    DEBUG = 3 # Debug lines and cubes
+
+@dataclass
+class DrawItem:
+    ''' A shape to be drawn this frame, submitted by its element while updating '''
+    renderer: 'ShapeRenderer'
+    mesh: 'Mesh'
+    material: Material
+    transform: Transform
+    sort_key: tuple
+    lighting_override: Union[dict[str, np.ndarray], None] = None
+    render_pass: RenderPass = RenderPass.OPAQUE
+
+    @property
+    def transparent(self) -> bool:
+        return self.material.d < 1
+
+@dataclass
+class RenderQueue:
+    '''
+    Collects the shapes drawn in a frame and draws them all at once, in an order that minimizes state changes.
+    Usage (see World.update):
+        render_queue.begin(render_context) # Before updating the elements
+        render_queue.submit(renderer)      # By each element, while updating (see Element._render)
+        render_queue.flush()               # After updating the elements
+
+    Opaque shapes are sorted by lighting override, program, texture and mesh, so each of them is bound once per group.
+    Opaque shapes that also share the material are drawn with a single instanced draw call (if the shader has an instanced variant).
+    Transparent shapes (material.d < 1) are drawn after them, back-to-front.
+    Shapes whose bounding sphere is outside the view frustum are dropped before sorting (one vectorized test for all of them).
+    Shapes are drawn pass by pass (see RenderPass), and the GPU time of each pass is measured with a GLTimerQuery
+    (GL_STATS and PROFILER, as 'gpu/<pass>', get the results, a frame or two late).
+    With rendering_options.gpu_batch_timers, every batch is also timed with GPU timestamps ('gpu/<pass>/<element>').
+    '''
+    items: list[DrawItem] = field(default_factory=list)
+    render_context: 'RenderContext' = None
+    pass_timers: dict[RenderPass, GLTimerQuery] = None # Created on the first flush (needs the OpenGL context)
+    batch_timestamps: GLTimestamps = None # Created on the first flush with gpu_batch_timers
+
+    def begin(self, render_context: 'RenderContext'):
+        ''' Starts a new frame, discarding items that were not flushed '''
+        self.items.clear()
+        self.render_context = render_context
+
+    def submit(self, renderer: 'ShapeRenderer', lighting_override: Union[dict[str, np.ndarray], None] = None,
+               render_pass: RenderPass = RenderPass.OPAQUE):
+        ''' Queues a shape to be drawn when the queue is flushed '''
+        material = renderer.shape_spec.material
+        if material.d < 1 and render_pass == RenderPass.OPAQUE:
+            render_pass = RenderPass.TRANSPARENT
+
+        if material.d < 1:
+            # Back-to-front: farthest first
+            distance = np.linalg.norm(renderer.transform.world_translation.values - self.render_context.camera_position)
+            sort_key = (render_pass, 1, -distance)
+        else:
+            sort_key = (
+                render_pass,
+                0,
+                id(lighting_override) if lighting_override is not None else 0,
+                renderer.shader.program,
+                renderer.texture.id if renderer.texture is not None else 0,
+                id(renderer.mesh),
+                id(material),
+                renderer.shape_spec.render_mode,
+            )
+
+        self.items.append(DrawItem(
+            renderer=renderer,
+            mesh=renderer.mesh,
+            material=material,
+            transform=renderer.transform,
+            sort_key=sort_key,
+            lighting_override=lighting_override,
+            render_pass=render_pass,
+        ))
+
+    def _batches(self) -> Iterator[list[DrawItem]]:
+        '''
+        Splits the sorted items in batches that can be drawn with a single instanced draw call:
+        consecutive opaque items with the same lighting override, shader, texture, mesh, material and primitive.
+        '''
+        from app_vars import APP_VARS
+        instancing = APP_VARS.rendering_options.instancing
+
+        batch: list[DrawItem] = []
+        for item in self.items:
+            if batch and (not instancing or item.transparent or item.sort_key != batch[0].sort_key):
+                yield batch
+                batch = []
+            batch.append(item)
+
+        if batch:
+            yield batch
+
+    def _cull(self):
+        ''' Drops the items outside the view frustum, counting visible and culled shapes and elements '''
+        from app_vars import APP_VARS
+
+        stats = GL_STATS.current
+        if not self.items:
+            return
+
+        if APP_VARS.rendering_options.frustum_culling:
+            spheres = [ item.renderer.world_bounding_sphere() for item in self.items ]
+            centers = np.array([ center for center, _ in spheres ])
+            radii = np.array([ radius for _, radius in spheres ])
+            visible = spheres_in_frustum(self.render_context.frustum_planes, centers, radii)
+        else:
+            visible = np.ones(len(self.items), dtype=bool)
+
+        # The shapes of an element share its transform
+        visible_elements = { id(item.transform) for item, item_visible in zip(self.items, visible) if item_visible }
+        all_elements = { id(item.transform) for item in self.items }
+        stats.visible_shapes += int(visible.sum())
+        stats.culled_shapes += len(self.items) - int(visible.sum())
+        stats.visible_elements += len(visible_elements)
+        stats.culled_elements += len(all_elements) - len(visible_elements)
+
+        self.items = [ item for item, item_visible in zip(self.items, visible) if item_visible ]
+
+    def _poll_gpu_timers(self) -> tuple[dict[RenderPass, GLTimerQuery], Union[GLTimestamps, None]]:
+        '''
+        Collects the GPU times of previous frames that are ready (creating the timers the first time).
+        Returns the timers of the passes and the timestamps of the batches (None if they are off).
+        '''
+        from app_vars import APP_VARS
+        options = APP_VARS.rendering_options
+        if not options.gpu_timers:
+            return {}, None
+
+        try:
+            if self.pass_timers is None:
+                timers = create_timer_queries([ render_pass.name.lower() for render_pass in RenderPass ])
+                self.pass_timers = { render_pass: timer for render_pass, timer in zip(RenderPass, timers.values()) }
+            if options.gpu_batch_timers and self.batch_timestamps is None:
+                self.batch_timestamps = GLTimestamps()
+
+            for timer in self.pass_timers.values():
+                if (milliseconds := timer.poll()) is not None:
+                    PROFILER.record(f'gpu/{timer.name}', milliseconds)
+                if timer.last_ms is not None:
+                    GL_STATS.current.gpu_pass_ms[timer.name] = timer.last_ms
+
+            if options.gpu_batch_timers:
+                for label, milliseconds in (self.batch_timestamps.poll() or {}).items():
+                    PROFILER.record(f'gpu/{label}', milliseconds)
+                GL_STATS.current.gpu_batch_ms = self.batch_timestamps.last_ms
+        except Exception as error:
+            # Measuring is optional: don't let the timers stop the frame loop
+            LOGGER.log_warning(f'Could not read the GPU timer queries, GPU timers disabled ({error})', 'RenderQueue')
+            options.gpu_timers = False
+            return {}, None
+
+        return self.pass_timers, self.batch_timestamps if options.gpu_batch_timers else None
+
+    def flush(self):
+        ''' Draws all queued items inside the view frustum, binding only the state that changed between them, and empties the queue '''
+        self._cull()
+        self.items.sort(key=lambda item: item.sort_key)
+
+        stats = GL_STATS.current
+        timers, batch_timestamps = self._poll_gpu_timers()
+        if batch_timestamps is not None:
+            batch_timestamps.begin_frame()
+        no_override = object() # Not None: the per-frame lighting must be bound for the first item
+        current_override, current_shader, current_texture, current_mesh = no_override, None, None, None
+        current_pass = None
+        for batch in self._batches():
+            item = batch[0]
+
+            if item.render_pass is not current_pass:
+                if current_pass in timers:
+                    timers[current_pass].end()
+                current_pass = item.render_pass
+                if current_pass in timers:
+                    timers[current_pass].begin()
+
+            renderer = item.renderer
+            instanced = len(batch) > 1 and renderer.shader.instanced_variant is not None
+            shader = renderer.shader.instanced_variant if instanced else renderer.shader
+
+            if item.lighting_override is not current_override:
+                self.render_context.bind_lighting(item.lighting_override)
+                current_override = item.lighting_override
+
+            binds = 0
+            if shader is not current_shader:
+                shader.use()
+                current_shader = shader
+                binds += 1
+
+            if item.mesh is not current_mesh:
+                item.mesh.bind()
+                current_mesh = item.mesh
+                binds += 1
+
+            if renderer.texture is not None and renderer.texture is not current_texture:
+                renderer.texture.bind()
+                current_texture = renderer.texture
+                binds += 1
+
+            # Without the queue, every item would bind its program, mesh and texture
+            binds_per_item = 3 if renderer.texture is not None else 2
+            stats.state_changes += binds
+            stats.state_changes_avoided += len(batch) * binds_per_item - binds
+
+            if instanced:
+                model_matrices = world_matrices_of([ batch_item.transform for batch_item in batch ]).astype(np.float32).reshape(len(batch), 16)
+                renderer.draw_instanced(item.material, model_matrices)
+            else:
+                for batch_item in batch:
+                    batch_item.renderer.draw(batch_item.material)
+
+            if batch_timestamps is not None:
+                batch_timestamps.mark(f'{item.render_pass.name.lower()}/{renderer.element_name}')
+
+        if current_pass in timers:
+            timers[current_pass].end()
+        if batch_timestamps is not None:
+            batch_timestamps.end_frame()
+
+        if current_override is not None and current_override is not no_override:
+            self.render_context.bind_lighting()
+
+        self.items.clear()
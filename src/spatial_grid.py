@@ -0,0 +1,177 @@
+from dataclasses import dataclass, field
+import math
+from typing import TYPE_CHECKING, Iterable, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from objects.element import Element
+
+# Side of a grid cell, in world units (the world is a WORLD_SIZE x WORLD_SIZE square, see constants.py)
+CELL_SIZE = 4.0
+
+def _as_point(point: Iterable[float]) -> np.ndarray:
+    ''' Accepts a Vec3, a tuple or a numpy array '''
+    return np.fromiter(point, dtype=np.float64, count=3)
+
+@dataclass
+class GridEntry:
+    ''' An element in the grid, with the bounding sphere it was indexed with '''
+    element: 'Element'
+    center: np.ndarray
+    radius: float
+    cell: Union[tuple[int, int], None] # None if the element is too big for a cell (see SpatialGrid)
+    model_matrix: np.ndarray = None # Model matrix of the element when it was indexed, to detect transform changes
+
+@dataclass
+class SpatialGrid:
+    '''
+    Uniform grid over the XZ plane that indexes the elements of the world by their bounding sphere
+    (center and pseudo_hitbox_distance, like the rays use), so spatial queries don't scan every element.
+    Usage (see World):
+        spatial_grid.insert(element) # When spawned
+        spatial_grid.update(element) # After it is updated (only reindexed if its transform changed)
+        spatial_grid.remove(element) # When removed from the world
+        spatial_grid.query_radius(center, radius) # Elements whose sphere intersects the sphere
+
+    It is a loose grid: each element is stored only in the cell of its center, and queries look one cell further.
+    Elements bigger than a cell (e.g. the ground and the sky) are kept apart and tested by every query.
+    Cells are created on demand, so elements outside the world bounds are indexed too.
+    '''
+    cell_size: float = CELL_SIZE
+    cells: dict[tuple[int, int], dict[int, GridEntry]] = field(default_factory=dict)
+    oversized: dict[int, GridEntry] = field(default_factory=dict)
+    entries: dict[int, GridEntry] = field(default_factory=dict) # By element id
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _cell_of(self, center: np.ndarray) -> tuple[int, int]:
+        return (math.floor(center[0] / self.cell_size), math.floor(center[2] / self.cell_size))
+
+    def insert(self, element: 'Element'):
+        ''' Indexes an element by its current bounding sphere '''
+        center = _as_point(element.center)
+        radius = float(element.pseudo_hitbox_distance)
+        cell = self._cell_of(center) if radius <= self.cell_size else None
+
+        entry = GridEntry(element, center, radius, cell, element.transform.model_matrix)
+        self.entries[id(element)] = entry
+        if cell is None:
+            self.oversized[id(element)] = entry
+        else:
+            self.cells.setdefault(cell, {})[id(element)] = entry
+
+    def remove(self, element: 'Element'):
+        ''' Removes an element from the index (does nothing if it is not indexed) '''
+        entry = self.entries.pop(id(element), None)
+        if entry is None:
+            return
+
+        if entry.cell is None:
+            del self.oversized[id(element)]
+            return
+
+        cell = self.cells[entry.cell]
+        del cell[id(element)]
+        if not cell:
+            del self.cells[entry.cell]
+
+    def update(self, element: 'Element'):
+        ''' Reindexes an element if its transform changed since it was indexed '''
+        entry = self.entries.get(id(element))
+        if entry is None:
+            return
+
+        # Transform's matrix cache returns the same array while the transform is unchanged
+        if element.transform.model_matrix is entry.model_matrix:
+            return
+
+        self.remove(element)
+        self.insert(element)
+
+    def _entries_in_cells(self, min_x: float, min_z: float, max_x: float, max_z: float) -> list[GridEntry]:
+        ''' Entries that may intersect the XZ rectangle: the ones in the cells it touches, one cell further, and the oversized ones '''
+        first_x, first_z = self._cell_of((min_x, 0, min_z))
+        last_x, last_z = self._cell_of((max_x, 0, max_z))
+        return self._entries_of_cells(
+            (cell_x, cell_z)
+            for cell_x in range(first_x - 1, last_x + 2)
+            for cell_z in range(first_z - 1, last_z + 2)
+        )
+
+    def _entries_of_cells(self, cells: Iterable[tuple[int, int]]) -> list[GridEntry]:
+        entries = list(self.oversized.values())
+        if len(self.cells) == 0:
+            return entries
+
+        for cell in cells:
+            cell_entries = self.cells.get(cell)
+            if cell_entries:
+                entries.extend(cell_entries.values())
+        return entries
+
+    @staticmethod
+    def _spheres(entries: list[GridEntry]) -> tuple[np.ndarray, np.ndarray]:
+        centers = np.array([ entry.center for entry in entries ]).reshape(-1, 3)
+        radii = np.array([ entry.radius for entry in entries ])
+        return centers, radii
+
+    def query_radius(self, center: Iterable[float], radius: float) -> list['Element']:
+        ''' Elements whose bounding sphere intersects the sphere (radius 0: the ones that contain the point) '''
+        center = _as_point(center)
+        entries = self._entries_in_cells(center[0] - radius, center[2] - radius, center[0] + radius, center[2] + radius)
+        if not entries:
+            return []
+
+        centers, radii = self._spheres(entries)
+        inside = np.linalg.norm(centers - center, axis=1) <= radii + radius
+        return [ entry.element for entry, entry_inside in zip(entries, inside) if entry_inside ]
+
+    def query_aabb(self, aabb_min: Iterable[float], aabb_max: Iterable[float]) -> list['Element']:
+        ''' Elements whose bounding sphere intersects the axis-aligned box '''
+        aabb_min, aabb_max = _as_point(aabb_min), _as_point(aabb_max)
+        entries = self._entries_in_cells(aabb_min[0], aabb_min[2], aabb_max[0], aabb_max[2])
+        if not entries:
+            return []
+
+        centers, radii = self._spheres(entries)
+        closest = np.clip(centers, aabb_min, aabb_max) # Point of the box closest to each center
+        inside = np.linalg.norm(centers - closest, axis=1) <= radii
+        return [ entry.element for entry, entry_inside in zip(entries, inside) if entry_inside ]
+
+    def query_segment(self, start: Iterable[float], end: Iterable[float], radius: float = 0) -> list['Element']:
+        '''
+        Elements whose bounding sphere intersects the segment (or, with radius > 0, the capsule around it),
+        ordered by how far along the segment they are (closest to start first).
+        '''
+        start, end = _as_point(start), _as_point(end)
+        direction = end - start
+
+        # Walk the segment in steps of a cell, collecting the cells around each step
+        steps = max(1, math.ceil(np.linalg.norm(direction[[0, 2]]) / self.cell_size))
+        reach = radius + self.cell_size / 2 # Every point of the segment is within half a step of a sampled point
+        cells = set()
+        for step in range(steps + 1):
+            point = start + direction * (step / steps)
+            first_x, first_z = self._cell_of((point[0] - reach, 0, point[2] - reach))
+            last_x, last_z = self._cell_of((point[0] + reach, 0, point[2] + reach))
+            cells.update(
+                (cell_x, cell_z)
+                for cell_x in range(first_x - 1, last_x + 2)
+                for cell_z in range(first_z - 1, last_z + 2)
+            )
+
+        entries = self._entries_of_cells(cells)
+        if not entries:
+            return []
+
+        # Distance from each center to the closest point of the segment
+        centers, radii = self._spheres(entries)
+        length_squared = direction @ direction
+        t = np.clip((centers - start) @ direction / length_squared, 0, 1) if length_squared > 0 else np.zeros(len(entries))
+        closest = start + t[:, None] * direction
+        inside = np.linalg.norm(centers - closest, axis=1) <= radii + radius
+
+        order = np.argsort(t, kind='stable')
+        return [ entries[index].element for index in order if inside[index] ]
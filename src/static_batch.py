@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Union
+
+import numpy as np
+from utils.logger import LOGGER
+
+from gl_abstractions.layout import Layout
+from objects.element import Element, ShapeRenderer, ShapeSpec
+from transform import Transform
+
+if TYPE_CHECKING:
+    from render_queue import RenderQueue
+
+def transform_vertices(layout: Layout, vertices: np.ndarray, model_matrix: np.ndarray) -> np.ndarray:
+    '''
+    Returns a copy of the vertices in world space: positions and normals multiplied by the model matrix,
+    like the shaders do (normals are not normalized, the shaders do it).
+    '''
+    vertices = np.array(vertices, dtype=np.float32)
+    linear, translation = model_matrix[:3, :3], model_matrix[:3, 3]
+
+    position_columns = layout.get_columns('a_Position')
+    if position_columns is not None:
+        vertices[:, position_columns] = vertices[:, position_columns] @ linear.T + translation
+    normal_columns = layout.get_columns('a_Normal')
+    if normal_columns is not None:
+        vertices[:, normal_columns] = vertices[:, normal_columns] @ linear.T
+
+    return vertices
+
+@dataclass
+class StaticBatch:
+    '''
+    The shapes of static elements that can be drawn together: same shader, texture, material, primitive and lighting override.
+    Their vertices are transformed to world space and merged into a single mesh, drawn with an identity transform.
+    '''
+    shape_renderers: list[ShapeRenderer] = field(default_factory=list)
+    lighting_override: Union[dict[str, np.ndarray], None] = None
+    renderer: Union[ShapeRenderer, None] = None # Draws the merged mesh (None if the batch is empty)
+
+    def rebuild(self):
+        ''' Merges the vertices of the shapes again (e.g. after removing one of them) '''
+        if self.renderer is not None:
+            self.renderer.release()
+            self.renderer = None
+
+        if not self.shape_renderers:
+            return
+
+        first_spec = self.shape_renderers[0].shape_spec
+        layout = first_spec.shader.layout
+        indexed = any(renderer.shape_spec.indices is not None for renderer in self.shape_renderers)
+
+        vertices, indices = [], []
+        vertex_count = 0
+        for shape_renderer in self.shape_renderers:
+            shape_spec = shape_renderer.shape_spec
+            vertices.append(transform_vertices(layout, shape_spec.vertices, shape_renderer.transform.model_matrix))
+            if indexed:
+                shape_indices = shape_spec.indices if shape_spec.indices is not None else np.arange(len(shape_spec.vertices))
+                indices.append(shape_indices.astype(np.uint32) + vertex_count)
+            vertex_count += len(shape_spec.vertices)
+
+        self.renderer = ShapeRenderer(
+            element_name='StaticBatch',
+            shape_spec=ShapeSpec(
+                vertices=np.concatenate(vertices),
+                indices=np.concatenate(indices) if indexed else None,
+                render_mode=first_spec.render_mode,
+                shader=first_spec.shader,
+                texture=first_spec.texture,
+                material=first_spec.material,
+                name=f'StaticBatch({first_spec.material.name}, {len(self.shape_renderers)} shapes)',
+            ),
+            transform=Transform(),
+        )
+
+@dataclass
+class StaticBatcher:
+    '''
+    Merges the shapes of static elements (scenery that never moves) into a few big meshes, grouped by
+    shader, texture, material, primitive and lighting override, so each group is drawn with a single call.
+    Usage (see World):
+        static_batcher.build(elements) # Once the scene is set up
+        static_batcher.submit(render_queue) # Every frame
+
+    Batched elements don't draw themselves (see Element._render). When one of them is selected or destroyed,
+    it is split out of its batches (the batches are merged again without it) and draws itself again.
+    '''
+    batches: dict[tuple, StaticBatch] = field(default_factory=dict)
+    elements: list[Element] = field(default_factory=list)
+
+    def build(self, elements: list[Element]):
+        ''' Batches the shapes of the given elements (usually the ones marked as static) '''
+        for element in elements:
+            self.elements.append(element)
+            element._static_batcher = self
+            for shape_renderer in element._shape_renderers:
+                batch = self.batches.setdefault(self._key(element, shape_renderer), StaticBatch(lighting_override=element.lighting_override))
+                batch.shape_renderers.append(shape_renderer)
+
+        for batch in self.batches.values():
+            batch.rebuild()
+
+        LOGGER.log_info(f'Batched {sum(len(batch.shape_renderers) for batch in self.batches.values())} shapes of {len(self.elements)} static elements into {len(self.batches)} batches', 'StaticBatcher')
+
+    @staticmethod
+    def _key(element: Element, shape_renderer: ShapeRenderer) -> tuple:
+        shape_spec = shape_renderer.shape_spec
+        return (
+            id(shape_spec.shader),
+            id(shape_spec.texture),
+            id(shape_spec.material),
+            shape_spec.render_mode,
+            id(element.lighting_override),
+        )
+
+    def remove(self, element: Element):
+        ''' Splits an element out of its batches, so it draws itself again '''
+        if element._static_batcher is not self:
+            return
+
+        # Compared by identity (dataclass equality would compare the vertex arrays)
+        self.elements = [ batched for batched in self.elements if batched is not element ]
+        element._static_batcher = None
+        element_renderers = { id(renderer) for renderer in element._shape_renderers }
+        for key, batch in list(self.batches.items()):
+            kept_renderers = [ renderer for renderer in batch.shape_renderers if id(renderer) not in element_renderers ]
+            if len(kept_renderers) == len(batch.shape_renderers):
+                continue
+
+            batch.shape_renderers = kept_renderers
+            batch.rebuild()
+            if batch.renderer is None:
+                del self.batches[key]
+
+        LOGGER.log_debug(f'Element {element.name} removed from the static batches', 'StaticBatcher')
+
+    def submit(self, render_queue: 'RenderQueue'):
+        ''' Queues the merged meshes to be drawn this frame '''
+        for batch in self.batches.values():
+            render_queue.submit(batch.renderer, lighting_override=batch.lighting_override)
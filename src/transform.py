@@ -1,8 +1,12 @@
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Union
 import numpy as np
 
 from utils.geometry import Vec3, VecN
 
+if TYPE_CHECKING:
+    from transform_store import TransformStore
+
 @dataclass
 class MatrixCache:
     ''' A cache for the transformation matrices. '''
@@ -22,7 +26,12 @@ class MatrixCache:
 
 @dataclass
 class Transform:
-    ''' The translation, rotation, and scale of the object. '''
+    '''
+    The translation, rotation, and scale of the object.
+    A transform can have a parent (scene graph): then they are relative to the parent, and model_matrix is
+    parent.model_matrix @ local_matrix (recomputed only when the transform or one of its ancestors changes).
+        gun.transform.parent = camera.transform # The gun follows the camera
+    '''
     translation: Vec3 = field(default_factory=lambda: Vec3(0, 0, 0))
     rotation: Vec3 = field(default_factory=lambda: Vec3(0, 0, 0))
     scale: Vec3 = field(default_factory=lambda: Vec3(1, 1, 1))
@@ -35,13 +44,77 @@ class Transform:
         self.scale.xyz = Vec3(self.scale)
         self._matrix_cache = MatrixCache()
 
+        # Scene graph
+        self._parent: Union[Transform, None] = None
+        self._children: list[Transform] = []
+        self._world_matrix: np.ndarray = None # Cached parent.model_matrix @ local_matrix
+        self._world_matrix_sources: tuple[np.ndarray, np.ndarray] = (None, None) # The matrices it was computed from
+
+        # Set while the transform is in a TransformStore, which computes its matrices in batches
+        self._store: Union['TransformStore', None] = None
+        self._store_row = -1
+        self._store_matrix: np.ndarray = None # World matrix
+        self._store_local_matrix: np.ndarray = None
+
     @property
-    def model_matrix(self):
-        ''' Get the model matrix. '''
+    def parent(self) -> Union['Transform', None]:
+        ''' The transform this one is relative to, if any '''
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent: Union['Transform', None]):
+        ancestor = parent
+        while ancestor is not None:
+            assert ancestor is not self, 'A transform cannot be its own ancestor'
+            ancestor = ancestor._parent
+
+        if self._parent is not None:
+            self._parent._children.remove(self)
+        if parent is not None:
+            parent._children.append(self)
+        self._parent = parent
+
+        if self._store is not None:
+            self._store.hierarchy_changed = True
+
+    @property
+    def children(self) -> list['Transform']:
+        ''' The transforms whose parent is this one (read only) '''
+        return self._children
+
+    @property
+    def local_matrix(self) -> np.ndarray:
+        ''' The matrix of the translation, rotation and scale of the transform itself (relative to the parent) '''
+        if self._store_local_matrix is not None:
+            return self._store_local_matrix # As of the last TransformStore.update (see World)
         return self.calc_model_matrix() # Cached if none of the properties are changed
 
+    @property
+    def model_matrix(self) -> np.ndarray:
+        ''' Get the model matrix (model to world space, including the parents). '''
+        if self._store_matrix is not None:
+            return self._store_matrix # As of the last TransformStore.update (see World)
+
+        local_matrix = self.local_matrix
+        if self._parent is None:
+            return local_matrix
+
+        # Same array objects as last time: neither this transform nor its ancestors changed
+        parent_matrix = self._parent.model_matrix
+        if parent_matrix is not self._world_matrix_sources[0] or local_matrix is not self._world_matrix_sources[1]:
+            self._world_matrix = parent_matrix @ local_matrix
+            self._world_matrix_sources = (parent_matrix, local_matrix)
+        return self._world_matrix
+
+    @property
+    def world_translation(self) -> Vec3:
+        ''' Where the transform is in the world (the translation itself if it has no parent) '''
+        if self._parent is None:
+            return self.translation
+        return Vec3(*self.model_matrix[:3, 3])
+
     def calc_model_matrix(self) -> np.ndarray:
-        ''' Calculate the model matrix. '''
+        ''' Calculate the model matrix (of the transform itself, without the parents). '''
 
         # 1. Scale
         scale_cache_valid = self._matrix_cache.last_scale == self.scale
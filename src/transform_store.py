@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from transform import Transform
+
+INITIAL_CAPACITY = 64
+
+def compose_model_matrices(translations: np.ndarray, rotations: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    '''
+    Model matrices (N x 4 x 4) of N transforms at once, from their translations, rotations (Euler angles, radians) and scales (N x 3).
+    Same as Transform.calc_model_matrix: translation @ (x rotation @ z rotation @ y rotation) @ scale.
+    '''
+    n = len(translations)
+    (cx, cy, cz), (sx, sy, sz) = np.cos(rotations).T, np.sin(rotations).T
+    zeros, ones = np.zeros(n), np.ones(n)
+
+    x_rotations = np.stack([ones, zeros, zeros, zeros, cx, -sx, zeros, sx, cx], axis=1).reshape(n, 3, 3)
+    z_rotations = np.stack([cz, -sz, zeros, sz, cz, zeros, zeros, zeros, ones], axis=1).reshape(n, 3, 3)
+    y_rotations = np.stack([cy, zeros, sy, zeros, ones, zeros, -sy, zeros, cy], axis=1).reshape(n, 3, 3)
+
+    matrices = np.zeros((n, 4, 4))
+    matrices[:, :3, :3] = x_rotations @ z_rotations @ y_rotations * scales[:, None, :] # Scaling the columns = @ diag(scale)
+    matrices[:, :3, 3] = translations
+    matrices[:, 3, 3] = 1
+    return matrices
+
+# parent_row of transforms whose parent isn't in the store (its model_matrix is read like any other transform's)
+EXTERNAL_PARENT = -2
+
+@dataclass
+class TransformStore:
+    '''
+    Keeps the translation, rotation and scale of many transforms in contiguous arrays (one row per transform)
+    and computes all the model matrices that changed in one vectorized pass (see World, once per frame).
+    Usage:
+        transforms.add(element.transform) # When spawned (its model matrix is computed right away)
+        transforms.update() # Once per frame, after the elements moved and before rendering
+        transforms.remove(element.transform) # When removed from the world
+
+    The transforms are still edited through their Vec3s: update() gathers their values, compares them with the
+    arrays to find the changed rows (plus the ones flagged in 'dirty') and recomputes only their local matrices.
+    Then the world matrices are propagated down the hierarchy (see Transform.parent), one depth level at a time,
+    only for the rows whose local matrix or parent changed. world_matrices is a flat array of all of them, for the renderer.
+    While a transform is in the store, its model_matrix is the one of the last update (no per-access cache checks), and,
+    like before, the same array object until it changes.
+    '''
+    count: int = 0
+    translation: np.ndarray = field(default_factory=lambda: np.zeros((INITIAL_CAPACITY, 3)))
+    rotation: np.ndarray = field(default_factory=lambda: np.zeros((INITIAL_CAPACITY, 3)))
+    scale: np.ndarray = field(default_factory=lambda: np.ones((INITIAL_CAPACITY, 3)))
+    local_matrices: np.ndarray = field(default_factory=lambda: np.tile(np.eye(4), (INITIAL_CAPACITY, 1, 1)))
+    world_matrices: np.ndarray = field(default_factory=lambda: np.tile(np.eye(4), (INITIAL_CAPACITY, 1, 1)))
+    parent_row: np.ndarray = field(default_factory=lambda: np.full(INITIAL_CAPACITY, -1)) # -1 for roots
+    dirty: np.ndarray = field(default_factory=lambda: np.zeros(INITIAL_CAPACITY, dtype=bool)) # Recomputed on the next update, even if unchanged
+    transforms: list[Transform] = field(default_factory=list)
+    hierarchy_changed: bool = False # Set when transforms are reparented, to rebuild parent_row on the next update
+
+    last_updated: int = 0 # World matrices recomputed by the last update
+
+    _ARRAYS = ('translation', 'rotation', 'scale', 'local_matrices', 'world_matrices', 'parent_row', 'dirty')
+
+    def __post_init__(self):
+        self._levels: list[np.ndarray] = [] # Rows with a parent in the store, by depth (parents before children)
+        self._external_parent_matrices: dict[int, np.ndarray] = {} # By row: the parent matrix its world matrix was computed from
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _grow(self):
+        ''' Doubles the capacity of every array '''
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2, *array.shape[1:]), dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, transform: Transform):
+        ''' Starts computing the model matrix of a transform in the batched pass '''
+        if transform._store is not None:
+            return # Already in a store (e.g. shared by two elements)
+
+        if self.count == len(self.translation):
+            self._grow()
+
+        row = self.count
+        self.transforms.append(transform)
+        self.count += 1
+        transform._store = self
+        transform._store_row = row
+        self.parent_row[row] = -1
+
+        rows = np.array([row])
+        self._store_local_rows(rows, *self._gather([transform]))
+        world_matrix = self.local_matrices[row] if transform.parent is None else transform.parent.model_matrix @ self.local_matrices[row]
+        self.world_matrices[row] = world_matrix
+        transform._store_matrix = world_matrix.copy()
+
+        if transform.parent is not None or transform.children:
+            self.hierarchy_changed = True
+
+    def remove(self, transform: Transform):
+        ''' Stops tracking a transform, moving the last one to its row (its model_matrix is computed lazily again) '''
+        if transform._store is not self:
+            return
+
+        row, last = transform._store_row, self.count - 1
+        moved = self.transforms[last]
+        if transform.parent is not None or transform.children or moved.parent is not None or moved.children:
+            self.hierarchy_changed = True
+
+        if row != last:
+            for name in self._ARRAYS:
+                array = getattr(self, name)
+                array[row] = array[last]
+            moved._store_row = row
+            self.transforms[row] = moved
+
+        self.transforms.pop()
+        self.count -= 1
+        transform._store = None
+        transform._store_row = -1
+        transform._store_matrix = transform._store_local_matrix = None
+
+    def mark_dirty(self, transform: Transform):
+        ''' Forces the model matrix of a transform to be recomputed on the next update '''
+        if transform._store is self:
+            self.dirty[transform._store_row] = True
+
+    @staticmethod
+    def _gather(transforms: list[Transform]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        ''' Current values of the Vec3s of the transforms (N x 3 each) '''
+        return (
+            np.array([ transform.translation.values for transform in transforms ], dtype=np.float64).reshape(-1, 3),
+            np.array([ transform.rotation.values for transform in transforms ], dtype=np.float64).reshape(-1, 3),
+            np.array([ transform.scale.values for transform in transforms ], dtype=np.float64).reshape(-1, 3),
+        )
+
+    def _store_local_rows(self, rows: np.ndarray, translations: np.ndarray, rotations: np.ndarray, scales: np.ndarray):
+        matrices = compose_model_matrices(translations, rotations, scales)
+        self.translation[rows] = translations
+        self.rotation[rows] = rotations
+        self.scale[rows] = scales
+        self.local_matrices[rows] = matrices
+        self.dirty[rows] = False
+
+        # A new array object for each changed transform (views of this batch, which the store doesn't write again)
+        for row, matrix in zip(rows.tolist(), matrices):
+            self.transforms[row]._store_local_matrix = matrix
+
+    def _build_hierarchy(self):
+        ''' Finds the row of the parent of every transform and groups the rows by depth '''
+        n = self.count
+        parent_row = np.full(n, -1)
+        for row, transform in enumerate(self.transforms):
+            if (parent := transform.parent) is not None:
+                parent_row[row] = parent._store_row if parent._store is self else EXTERNAL_PARENT
+        self.parent_row[:n] = parent_row
+
+        depth = np.zeros(n, dtype=np.int64)
+        ancestors = parent_row.copy()
+        while (has_ancestor := ancestors >= 0).any():
+            depth[has_ancestor] += 1
+            ancestors[has_ancestor] = parent_row[ancestors[has_ancestor]]
+
+        self._levels = [ np.flatnonzero(depth == level) for level in range(1, depth.max(initial=0) + 1) ]
+        self._external_parent_matrices = { row: None for row in np.flatnonzero(parent_row == EXTERNAL_PARENT).tolist() }
+        self.hierarchy_changed = False
+
+    def _publish(self, rows: np.ndarray):
+        ''' Gives the transforms of the rows their new world matrix (a new array object for each, views of a copy the store doesn't write again) '''
+        for row, matrix in zip(rows.tolist(), self.world_matrices[rows]):
+            self.transforms[row]._store_matrix = matrix
+
+    def _update_external_rows(self, changed: np.ndarray) -> bool:
+        ''' Rows whose parent is outside the store: tested like the lazy path does, by the identity of the parent's matrix '''
+        updated = []
+        for row, last_parent_matrix in self._external_parent_matrices.items():
+            parent_matrix = self.transforms[row].parent.model_matrix
+            if parent_matrix is not last_parent_matrix:
+                self.world_matrices[row] = parent_matrix @ self.local_matrices[row]
+                self._external_parent_matrices[row] = parent_matrix
+                updated.append(row)
+
+        changed[updated] = True
+        self._publish(np.array(updated, dtype=np.int64))
+        return bool(updated)
+
+    def _update_levels(self, changed: np.ndarray):
+        ''' Rows whose parent is in the store, parents first '''
+        for rows in self._levels:
+            parents = self.parent_row[rows]
+            rows = rows[changed[rows] | changed[parents]]
+            self.world_matrices[rows] = self.world_matrices[self.parent_row[rows]] @ self.local_matrices[rows]
+            changed[rows] = True
+            self._publish(rows)
+
+    def _update_world_rows(self, changed: np.ndarray) -> np.ndarray:
+        ''' Recomputes the world matrices of the rows whose local matrix changed and of their descendants. Returns the rows. '''
+        roots = np.flatnonzero(changed & (self.parent_row[:self.count] == -1))
+        self.world_matrices[roots] = self.local_matrices[roots]
+        self._publish(roots)
+
+        # Local changes of rows with a parent outside the store
+        for row in np.flatnonzero(changed & (self.parent_row[:self.count] == EXTERNAL_PARENT)).tolist():
+            self._external_parent_matrices[row] = None
+
+        self._update_external_rows(changed)
+        self._update_levels(changed)
+
+        # A parent outside the store may itself be the child of a row that was just updated
+        if self._update_external_rows(changed):
+            self._update_levels(changed)
+
+        return np.flatnonzero(changed)
+
+    def update(self) -> int:
+        ''' Recomputes the model matrices of the transforms that changed since the last update (and their descendants). Returns how many. '''
+        n = self.count
+        if n == 0:
+            self.last_updated = 0
+            return 0
+
+        translations, rotations, scales = self._gather(self.transforms)
+        changed = self.dirty[:n] \
+            | (translations != self.translation[:n]).any(axis=1) \
+            | (rotations != self.rotation[:n]).any(axis=1) \
+            | (scales != self.scale[:n]).any(axis=1)
+
+        rows = np.flatnonzero(changed)
+        if rows.size:
+            self._store_local_rows(rows, translations[rows], rotations[rows], scales[rows])
+
+        if self.hierarchy_changed:
+            self._build_hierarchy()
+            changed |= self.parent_row[:n] != -1
+
+        rows = self._update_world_rows(changed)
+        self.last_updated = int(rows.size)
+        return self.last_updated
+
+def world_matrices_of(transforms: list[Transform]) -> np.ndarray:
+    ''' Model matrices of the transforms (N x 4 x 4), gathered from the flat array of their store when they are all in the same one '''
+    store = transforms[0]._store
+    if store is not None and all(transform._store is store for transform in transforms):
+        return store.world_matrices[[ transform._store_row for transform in transforms ]]
+    return np.array([ transform.model_matrix for transform in transforms ])
@@ -1,20 +1,169 @@
 from dataclasses import dataclass, field
 import random
+from typing import Iterator, Union
+
+import numpy as np
 
 from wavefront.face import Face
 from wavefront.material import Material
 from wavefront.vertex import RawVertex
 
+# How the corners of each supported face size are split into triangles
+FACE_TRIANGULATIONS = {
+    3: [0, 1, 2],
+    4: [0, 1, 2, 2, 3, 0],
+    5: [0, 1, 2, 2, 3, 4, 4, 0, 2],
+}
+
+def deduplicate_vertices(vertices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Converts unindexed vertices to (unique vertices, uint32 indices), where vertices[i] == unique_vertices[indices[i]].
+    Only bitwise identical rows are merged, and the unique vertices keep the order in which they first appear.
+    '''
+    vertices = np.ascontiguousarray(vertices)
+    if len(vertices) == 0:
+        return vertices, np.zeros(0, dtype=np.uint32)
+
+    # View each row as a single opaque value, so np.unique compares whole vertices (much faster than axis=0)
+    rows = vertices.view(np.dtype((np.void, vertices.dtype.itemsize * vertices.shape[1]))).ravel()
+    _, first_seen, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+    order = np.argsort(first_seen)
+    new_index = np.empty_like(order)
+    new_index[order] = np.arange(len(order))
+
+    return vertices[first_seen[order]], new_index[inverse.ravel()].astype(np.uint32)
+
 @dataclass
 class Object:
     name: str
-    positions_ref: list[tuple]
-    texture_coords_ref: list[tuple]
-    normals_ref: list[tuple]
+    positions_ref: Union[list[tuple], np.ndarray]
+    texture_coords_ref: Union[list[tuple], np.ndarray]
+    normals_ref: Union[list[tuple], np.ndarray]
     material: Material = field(default_factory=lambda: Material(f'default-{random.random()}'))
     faces: list[Face] = field(default_factory=list)
 
+    # Filled by the bulk reader instead of faces:
+    # face_indices has one (position, texture, normal) row per face corner (1-based, texture is 0 when omitted)
+    # face_sizes has the number of corners of each face, in declaration order
+    face_indices: Union[np.ndarray, None] = None
+    face_sizes: Union[np.ndarray, None] = None
+
+    # Unindexed (posX, posY, posZ, texU, texV, normX, normY, normZ) float32 vertices, ready to be uploaded.
+    # Objects loaded from the model cache only have this (no faces)
+    vertices: Union[np.ndarray, None] = None
+
+    # Vertex data already returned by get_vertex_data(), by (with_position, with_texture_coords, with_normals, indexed)
+    _vertex_data_cache: dict[tuple, tuple[np.ndarray, Union[np.ndarray, None]]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def iter_faces(self) -> Iterator[Face]:
+        ''' Iterates over the faces of the object, whether they were read as Face objects or as index arrays '''
+        if self.face_indices is None:
+            yield from self.faces
+            return
+
+        face_starts = np.cumsum(self.face_sizes) - self.face_sizes
+        for start, size in zip(face_starts, self.face_sizes):
+            position_indices, texture_indices, normal_indices = self.face_indices[start:start+size].T.tolist()
+            yield Face(position_indices, texture_indices, normal_indices)
+
+    def get_face_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        ''' Returns (face_indices, face_sizes), converting the Face objects to arrays if the object was not read in bulk '''
+        if self.face_indices is not None:
+            return self.face_indices, self.face_sizes
+
+        for face in self.faces:
+            assert len(face.position_indices) == len(face.texture_indices) == len(face.normal_indices), f'Mismatch between {len(face.position_indices)=}, {len(face.texture_indices)=}, {len(face.normal_indices)=}'
+
+        face_sizes = np.array([ len(face.position_indices) for face in self.faces ], dtype=np.int32)
+        face_indices = np.array([
+            corner for face in self.faces for corner in zip(face.position_indices, face.texture_indices, face.normal_indices)
+        ], dtype=np.int32).reshape(-1, 3)
+        return face_indices, face_sizes
+
+    def expand_faces_to_vertex_array(self, with_position: bool = True, with_texture_coords: bool = True, with_normals: bool = True) -> np.ndarray:
+        '''
+        Vectorized version of expand_faces_to_unindexed_vertices: triangulates the faces and gathers the vertex data
+        with fancy indexing, directly into a float32 array of (posX, posY, posZ, texU, texV, normX, normY, normZ) rows.
+        '''
+        face_indices, face_sizes = self.get_face_arrays()
+
+        unsupported = ~np.isin(face_sizes, list(FACE_TRIANGULATIONS))
+        if unsupported.any():
+            raise RuntimeError(f'Face has a weird number of vertices: {face_sizes[unsupported][0]}, expected one of {list(FACE_TRIANGULATIONS)}')
+
+        # Where each face starts in face_indices and where its triangles start in the expanded array
+        face_starts = np.cumsum(face_sizes) - face_sizes
+        triangulated_sizes = np.zeros(max(FACE_TRIANGULATIONS) + 1, dtype=np.int64)
+        for size, triangulation in FACE_TRIANGULATIONS.items():
+            triangulated_sizes[size] = len(triangulation)
+        expanded_sizes = triangulated_sizes[face_sizes]
+        expanded_starts = np.cumsum(expanded_sizes) - expanded_sizes
+
+        # Corner (row of face_indices) of each expanded vertex, keeping the faces in declaration order
+        corners = np.empty(expanded_sizes.sum(), dtype=np.int64)
+        for size, triangulation in FACE_TRIANGULATIONS.items():
+            is_size = face_sizes == size
+            if not is_size.any():
+                continue
+            triangulation = np.array(triangulation)
+            targets = expanded_starts[is_size, None] + np.arange(len(triangulation))
+            corners[targets.ravel()] = (face_starts[is_size, None] + triangulation).ravel()
+
+        # .obj indices are 1-based (an omitted texture index, 0, becomes -1: the last texture coord, like in RawVertex)
+        position_indices, texture_indices, normal_indices = (face_indices[corners] - 1).T
+
+        def as_array(data: Union[list[tuple], np.ndarray], components: int) -> np.ndarray:
+            ''' Converts vertex data to a 2D float32 array (an empty list becomes a (0, components) array) '''
+            data = np.asarray(data, dtype=np.float32)
+            return data if data.ndim == 2 else data.reshape(-1, components)
+
+        columns = []
+        if with_position:
+            columns.append(as_array(self.positions_ref, 3)[position_indices])
+        if with_texture_coords:
+            texture_coords = as_array(self.texture_coords_ref, 2)
+            if len(texture_coords) == 0:
+                # Texture coordinates were omitted in the whole file (they are not used anyway)
+                texture_coords = np.zeros((1, 2), dtype=np.float32)
+            columns.append(texture_coords[texture_indices])
+        if with_normals:
+            columns.append(as_array(self.normals_ref, 3)[normal_indices])
+
+        if not columns:
+            return np.zeros((len(corners), 0), dtype=np.float32)
+        return np.concatenate(columns, axis=1)
+
+    def get_vertex_data(self, with_position: bool = True, with_texture_coords: bool = True, with_normals: bool = True, indexed: bool = False) -> tuple[np.ndarray, Union[np.ndarray, None]]:
+        '''
+        Returns (vertices, indices) with the requested columns, ready to be uploaded (indices is None if not indexed).
+        The result is memoized: every call with the same arguments returns the very same arrays,
+        so elements of the same model can share their GPU buffers (see MeshRegistry).
+        '''
+        key = (with_position, with_texture_coords, with_normals, indexed)
+        if key in self._vertex_data_cache:
+            return self._vertex_data_cache[key]
+
+        if self.vertices is not None:
+            # Already compiled (e.g. loaded from the model cache): just pick the requested columns
+            columns = [
+                *(range(0, 3) if with_position else []),
+                *(range(3, 5) if with_texture_coords else []),
+                *(range(5, 8) if with_normals else []),
+            ]
+            vertices = self.vertices if len(columns) == self.vertices.shape[1] else self.vertices[:, columns]
+        else:
+            vertices = self.expand_faces_to_vertex_array(with_position, with_texture_coords, with_normals)
+
+        indices = None
+        if indexed and vertices.ndim == 2 and len(vertices) > 0:
+            vertices, indices = deduplicate_vertices(vertices)
+
+        self._vertex_data_cache[key] = vertices, indices
+        return vertices, indices
+
     def expand_faces_to_unindexed_vertices(self) -> list[RawVertex]:
+        ''' Expands the faces to one RawVertex per triangle corner (slow, see expand_faces_to_vertex_array) '''
         all_vertices: list[RawVertex] = []
 
         FACE_PENTA = 5
@@ -22,7 +171,7 @@ class Object:
         FACE_TRIANGLE = 3
 
         face_i = 1
-        for face in self.faces:
+        for face in self.iter_faces():
             assert len(face.position_indices) == len(face.texture_indices) == len(face.normal_indices), f'Mismatch between {len(face.position_indices)=}, {len(face.texture_indices)=}, {len(face.normal_indices)=}'
             vertice_count = len(face.position_indices)
  
@@ -68,6 +217,6 @@ class Object:
 class Model:
     name: str = 'Unnamed Model'
     objects: list[Object] = field(default_factory=list)
-    positions: list[tuple] = field(default_factory=list)
-    texture_coords: list[tuple] = field(default_factory=list)
-    normals: list[tuple] = field(default_factory=list)
\ No newline at end of file
+    positions: Union[list[tuple], np.ndarray] = field(default_factory=list)
+    texture_coords: Union[list[tuple], np.ndarray] = field(default_factory=list)
+    normals: Union[list[tuple], np.ndarray] = field(default_factory=list)
\ No newline at end of file
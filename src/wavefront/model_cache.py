@@ -0,0 +1,289 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from enum import Enum
+import json
+import os
+import random
+import struct
+import threading
+import time
+from typing import Any, Union
+
+import numpy as np
+from utils.geometry import Vec2, Vec3, VecN
+from utils.logger import LOGGER
+
+from wavefront.material import Illum, Material
+from wavefront.model import Model, Object
+from wavefront.model_reader import ModelReader
+
+'''
+On-disk cache of compiled models.
+
+Each .obj is stored as a single binary file:
+    - MAGIC (8 bytes)
+    - header length (uint32, little endian)
+    - JSON header, padded to HEADER_ALIGNMENT bytes
+    - float32 vertex data of all objects, one after another
+
+The header holds the cache version, the source files (.obj and its .mtl libraries) with their mtime and size,
+and, for each object, its name, material and where its vertices are in the data section.
+If any source file changed, the cache file is rebuilt from the .obj on the next load.
+'''
+
+CACHE_VERSION = 1
+MAGIC = b'CGMESH\x00\x00'
+HEADER_ALIGNMENT = 16
+VERTEX_COMPONENTS = 8 # (posX, posY, posZ, texU, texV, normX, normY, normZ)
+
+
+def _source_stamp(path: str) -> dict[str, Any]:
+    ''' Returns what identifies the current version of a source file '''
+    stat = os.stat(path)
+    return { 'path': path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size }
+
+
+def _material_to_record(material: Material) -> dict[str, Any]:
+    ''' Converts a material to a JSON-serializable dict '''
+    record = {}
+    for material_field in fields(material):
+        value = getattr(material, material_field.name)
+        if isinstance(value, (Vec2, Vec3, VecN)):
+            value = { 'vec': [ float(v) for v in value ] }
+        elif isinstance(value, Enum):
+            value = { 'illum': value.value }
+        record[material_field.name] = value
+    return record
+
+
+def _material_from_record(record: dict[str, Any]) -> Material:
+    ''' Converts back a dict created by _material_to_record to a material '''
+    VEC_TYPES = { 2: Vec2, 3: Vec3 }
+
+    values = {}
+    for name, value in record.items():
+        if isinstance(value, dict) and 'vec' in value:
+            value = VEC_TYPES.get(len(value['vec']), VecN)(*value['vec'])
+        elif isinstance(value, dict) and 'illum' in value:
+            value = Illum(value['illum'])
+        values[name] = value
+
+    # Unnamed materials get a new unique name, just like when they are read from the .obj
+    if values['name'].startswith('default-'):
+        values['name'] = f'default-{random.random()}'
+
+    return Material(**values)
+
+
+def _load_in_worker(folder: str, enabled: bool, filename: str) -> tuple[Model, float]:
+    ''' Loads a model in a preloading worker process, returning the model and how long it took (in seconds) '''
+    start = time.perf_counter()
+    model = ModelCache(folder=folder, enabled=enabled)._load(filename)
+
+    # Memory-mapped arrays are backed by a file of this process, send plain arrays instead
+    for object in model.objects:
+        if object.vertices is not None:
+            object.vertices = np.array(object.vertices)
+
+    return model, time.perf_counter() - start
+
+
+@dataclass
+class ModelCache:
+    '''
+    Loads models through an on-disk cache of compiled (ready to upload) vertex arrays.
+    Usage:
+        model = MODEL_CACHE.load_model('models/cube.obj')
+
+    On a warm start, the vertex arrays are memory-mapped from the cache file instead of parsing the .obj text.
+    The returned model's objects only have vertices and materials (no positions, faces, etc).
+    Loaded models are kept in memory, so loading the same file twice returns the same Model.
+
+    Models can also be preloaded in parallel, in a process pool (see preload()).
+    '''
+    folder: str = '.cache/models'
+    enabled: bool = True
+
+    def __post_init__(self):
+        self._models: dict[str, Model] = {} # Already loaded models, by filename
+        self._pending: dict[str, Future] = {} # Models being loaded by the preloading process pool, by filename
+        self._executor: Union[ProcessPoolExecutor, None] = None
+        self._preload_start_time: float = 0
+        self._lock = threading.RLock()
+
+        self.load_times: dict[str, float] = {} # How long each model took to load, in seconds (as seen by the loading process)
+
+    def preload(self, filenames: list[str], max_workers: Union[int, None] = None) -> None:
+        '''
+        Starts loading models in parallel, without waiting for them.
+        Models with an up to date cache file are loaded right away (memory-mapping is faster than starting a process),
+        the others are parsed in a process pool. load_model() waits for the model if it is still being loaded.
+
+        Call it before starting other threads (the pool may fork the current process).
+        '''
+        with self._lock:
+            self._preload_start_time = time.perf_counter()
+
+            stale_filenames = []
+            for filename in dict.fromkeys(filenames): # Remove duplicates, keeping the order
+                if filename in self._models or filename in self._pending:
+                    continue
+
+                start = time.perf_counter()
+                model = self._read_fresh(filename) if self.enabled else None
+                if model is None:
+                    stale_filenames.append(filename)
+                    continue
+
+                self._store(filename, model, time.perf_counter() - start)
+
+            if not stale_filenames:
+                return
+
+            LOGGER.log_info(f'Preloading {len(stale_filenames)} models in a process pool', 'ModelCache')
+            self._executor = ProcessPoolExecutor(max_workers=max_workers or min(len(stale_filenames), os.cpu_count() or 1))
+            for filename in stale_filenames:
+                self._pending[filename] = self._executor.submit(_load_in_worker, self.folder, self.enabled, filename)
+
+    def load_model(self, filename: str) -> Model:
+        ''' Loads a model from the cache, (re)building the cache file if it is missing or outdated '''
+        with self._lock:
+            if filename in self._models:
+                return self._models[filename]
+
+            if filename in self._pending:
+                # Being preloaded: wait for the worker
+                model, load_time = self._pending.pop(filename).result()
+                self._store(filename, model, load_time)
+
+                if not self._pending:
+                    LOGGER.log_info(f'Preloading finished in {(time.perf_counter() - self._preload_start_time)*1000:.1f} ms', 'ModelCache')
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                return model
+
+            start = time.perf_counter()
+            model = self._load(filename)
+            self._store(filename, model, time.perf_counter() - start)
+            return model
+
+    def _store(self, filename: str, model: Model, load_time: float) -> None:
+        ''' Keeps a loaded model in memory and reports how long it took to load '''
+        self._models[filename] = model
+        self.load_times[filename] = load_time
+        LOGGER.log_info(f'Loaded {filename} in {load_time*1000:.1f} ms', 'ModelCache')
+
+    def _load(self, filename: str) -> Model:
+        ''' Loads a model from its cache file or, if it is outdated, from the .obj (rebuilding the cache file) '''
+        if not self.enabled:
+            return ModelReader().load_model_from_file(filename)
+
+        model = self._read_fresh(filename)
+        if model is not None:
+            LOGGER.log_trace(f'Model {filename} loaded from cache', 'ModelCache')
+            return model
+
+        LOGGER.log_trace(f'Building model cache for {filename}', 'ModelCache')
+        return self._build(filename, self._cache_path(filename))
+
+    def _read_fresh(self, filename: str) -> Union[Model, None]:
+        ''' Reads the cache file of a model, returning None if it is missing, outdated or invalid '''
+        cache_path = self._cache_path(filename)
+        try:
+            return self._read(cache_path)
+        except (OSError, ValueError, KeyError, struct.error) as e: # struct.error: cut short after the magic number
+            LOGGER.log_warning(f'Ignoring invalid model cache {cache_path}: {e}', 'ModelCache')
+            return None
+
+    def _cache_path(self, filename: str) -> str:
+        ''' Returns the cache file path for a source .obj path '''
+        return os.path.join(self.folder, os.path.normpath(filename).replace(os.sep, '__') + '.mesh')
+
+    def _read(self, cache_path: str) -> Union[Model, None]:
+        ''' Reads a cache file, returning None if it doesn't exist or is outdated '''
+        if not os.path.exists(cache_path):
+            return None
+
+        with open(cache_path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError('bad magic number')
+            header_len, = struct.unpack('<I', file.read(4))
+            header = json.loads(file.read(header_len).rstrip(b' ').decode('utf-8'))
+
+        if header['version'] != CACHE_VERSION:
+            return None
+
+        for source in header['sources']:
+            if not os.path.exists(source['path']) or _source_stamp(source['path']) != source:
+                return None
+
+        data_offset = len(MAGIC) + 4 + header_len
+        data = None
+        if header['total_vertices'] > 0:
+            data = np.memmap(cache_path, dtype=np.float32, mode='r', offset=data_offset, shape=(header['total_vertices'], VERTEX_COMPONENTS))
+
+        model = Model(header['name'], positions=np.zeros((0, 3), dtype=np.float32), texture_coords=np.zeros((0, 2), dtype=np.float32), normals=np.zeros((0, 3), dtype=np.float32))
+        for object_record in header['objects']:
+            start, count = object_record['start'], object_record['count']
+            model.objects.append(Object(
+                name=object_record['name'],
+                positions_ref=model.positions,
+                texture_coords_ref=model.texture_coords,
+                normals_ref=model.normals,
+                material=_material_from_record(object_record['material']),
+                vertices=data[start:start+count] if count > 0 else np.zeros((0, VERTEX_COMPONENTS), dtype=np.float32),
+            ))
+
+        return model
+
+    def _build(self, filename: str, cache_path: str) -> Model:
+        ''' Parses the .obj, writes its cache file and returns the model (with vertices filled) '''
+        reader = ModelReader()
+        model = reader.load_model_from_file(filename)
+
+        object_records = []
+        object_vertices = []
+        total_vertices = 0
+        for object in model.objects:
+            object.vertices = object.expand_faces_to_vertex_array()
+            object_vertices.append(object.vertices)
+            object_records.append({
+                'name': object.name,
+                'material': _material_to_record(object.material),
+                'start': total_vertices,
+                'count': len(object.vertices),
+            })
+            total_vertices += len(object.vertices)
+
+        header = {
+            'version': CACHE_VERSION,
+            'name': model.name,
+            'sources': [ _source_stamp(path) for path in [filename, *reader.material_library_paths] ],
+            'total_vertices': total_vertices,
+            'objects': object_records,
+        }
+
+        # Pad the header so the vertex data is aligned
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_bytes += b' ' * (-(len(MAGIC) + 4 + len(header_bytes)) % HEADER_ALIGNMENT)
+
+        # Write to a temporary file first, so other processes never see a half-written cache
+        temp_path = f'{cache_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                file.write(MAGIC)
+                file.write(struct.pack('<I', len(header_bytes)))
+                file.write(header_bytes)
+                for vertices in object_vertices:
+                    file.write(np.ascontiguousarray(vertices, dtype=np.float32).tobytes())
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            LOGGER.log_warning(f'Could not write model cache {cache_path}: {e}', 'ModelCache')
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return model
+
+
+MODEL_CACHE = ModelCache()
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from enum import Enum, auto
 import random
 from typing import Union
+
+import numpy as np
 from utils.logger import LOGGER
 from wavefront.face import Face
 from wavefront.model import Model, Object
@@ -14,12 +16,18 @@ class ModelReader:
     Usage:
         reader = ModelReader()
         model = reader.load_model_from_file('models/cube.obj')
+
+    By default, the whole file is parsed at once with NumPy (bulk mode), which produces float32 arrays
+    for positions, texture coords and normals and int32 face index arrays for each object.
+    Use ModelReader(bulk=False) to parse line by line into lists of tuples and Face objects.
     '''
     # TODO: make it be ModelReader(filename: str).load_model()
+    bulk: bool = True
 
     def __post_init__(self):
         self.model = Model() # Creates an empty model to be filled in later
         self.materials: dict[str, Material] = {} # Maps material names to materials
+        self.material_library_paths: list[str] = [] # Paths of the .mtl files read (used by the model cache)
         self.current_object: Object = None
         self.current_material: Union[Material, None] = Material(f'default-{random.random()}') # TODO: change all occurences of Material(something) to a global default
 
@@ -30,12 +38,81 @@ class ModelReader:
         self.model = Model(filename.split('/')[-1])
 
         with open(filename, 'r') as file:
-            for line in file.readlines():
-                self._process_line(line)
+            if self.bulk:
+                self._process_lines_bulk(file.read().splitlines())
+            else:
+                for line in file.readlines():
+                    self._process_line(line)
 
         LOGGER.log_trace(f'Model {filename} Loaded!')
         return self.model
 
+    def _process_lines_bulk(self, lines: list[str]) -> None:
+        '''
+        Internal function for processing all lines of a .obj file at once (changes the state of self).
+        Vertex data and faces are converted by NumPy in a few calls, only the (rare) object, material 
+        and material library commands are processed line by line, through _process_line.
+        '''
+        # Commands are identified by the first two characters of the line (ex.: 'v ', 'vt', 'f ')
+        heads = np.array([line[:2] for line in lines])
+
+        self.model.positions = self._parse_vertex_data(lines, np.flatnonzero(heads == 'v '), command_len=1)
+        self.model.texture_coords = self._parse_vertex_data(lines, np.flatnonzero(heads == 'vt'), command_len=2)
+        self.model.normals = self._parse_vertex_data(lines, np.flatnonzero(heads == 'vn'), command_len=2)
+
+        # Faces belong to the object that was declared last, so they are split in runs between object/material commands
+        face_lines = np.flatnonzero(heads == 'f ')
+        command_lines = np.flatnonzero(np.isin(heads, ['o ', 'g ', 'us', 'mt']))
+        face_runs = np.split(face_lines, np.searchsorted(face_lines, command_lines))
+
+        if len(face_runs[0]) > 0:
+            LOGGER.log_error(f'Face declared before any object: {lines[face_runs[0][0]]}')
+            raise RuntimeError(f"Couldn't read line {lines[face_runs[0][0]]}")
+
+        for command_line, face_run in zip(command_lines, face_runs[1:]):
+            self._process_line(lines[command_line])
+            if len(face_run) > 0:
+                self._append_faces_bulk([ lines[i] for i in face_run ])
+
+    def _parse_vertex_data(self, lines: list[str], line_indices: np.ndarray, command_len: int) -> np.ndarray:
+        ''' Internal function for converting all 'v', 'vt' or 'vn' lines to a single (N, components) float32 array '''
+        if len(line_indices) == 0:
+            return np.zeros((0, 3), dtype=np.float32)
+
+        # Parse as float64 and then convert, so values are rounded exactly like the line by line reader does
+        values = np.fromstring(' '.join([ lines[i][command_len:] for i in line_indices ]), dtype=np.float64, sep=' ')
+
+        components = len(lines[line_indices[0]].split()) - 1
+        if values.size != components * len(line_indices):
+            LOGGER.log_error(f'Inconsistent number of components, expected {components} per line, like in: {lines[line_indices[0]]}')
+            raise RuntimeError(f'Inconsistent number of vertex components in {self.model.name}')
+
+        return values.astype(np.float32).reshape(-1, components)
+
+    def _append_faces_bulk(self, face_lines: list[str]) -> None:
+        ''' Internal function for converting a run of 'f' lines to the current object's face index arrays '''
+        # Every corner is either '<pos>/<tex>/<normal>' or '<pos>//<normal>', so it always has two slashes
+        face_sizes = np.array([ line.count('/') for line in face_lines ], dtype=np.int32) // 2
+
+        # Omitted texture coordinates become 0 (same as the line by line reader)
+        text = ' '.join([ line[2:] for line in face_lines ]).replace('//', '/0/').replace('/', ' ')
+        face_indices = np.fromstring(text, dtype=np.int32, sep=' ')
+
+        if face_indices.size != 3 * face_sizes.sum():
+            LOGGER.log_error(f'Unexpected format for faces of object {self.current_object.name}')
+            raise RuntimeError(f"Couldn't read faces of object {self.current_object.name}")
+
+        if face_sizes.max() > 5:
+            LOGGER.log_warning(f'Face has {face_sizes.max()} vertices')
+
+        face_indices = face_indices.reshape(-1, 3)
+        if self.current_object.face_indices is not None:
+            face_indices = np.concatenate([self.current_object.face_indices, face_indices])
+            face_sizes = np.concatenate([self.current_object.face_sizes, face_sizes])
+
+        self.current_object.face_indices = face_indices
+        self.current_object.face_sizes = face_sizes
+
     def _process_line(self, line: str) -> None:
         ''' Internal function for processing a line from a .obj file (changes the state of self) '''
         # Ignore comment lines
@@ -127,8 +204,7 @@ class ModelReader:
                 face.normal_indices.append(normal)
                 face.texture_indices.append(texture)
 
-                self.current_object.faces.append(face)
-
+            self.current_object.faces.append(face)
             return
 
         # Process material commands (ex.: 'usemtl material_name')
@@ -158,6 +234,7 @@ class ModelReader:
                 LOGGER.log_error(f'Failed to import {filename}!\nline: {line}')
                 raise e
             else:
+                self.material_library_paths.append(f'{MATERIAL_FOLDER}/{filename}')
                 for material_name, material in materials.items():
                     assert material_name not in self.materials, f'Trying to redeclare a material'
                     self.materials[material_name] = material
@@ -0,0 +1,106 @@
+import ctypes
+
+import glfw
+import OpenGL.GL as gl
+
+from utils.logger import LOGGER
+
+from constants import GUI_WIDTH, WINDOW_SIZE
+
+def create_window(visible: bool = True):
+    '''
+    Creates a GLFW window and returns it.
+    this function also sets things like the window size, the window title, opengl context, etc.
+    An invisible window only provides the OpenGL context (see headless.py, which doesn't start the GUI): no cursor capture nor VSync.
+    '''
+    LOGGER.log_trace("Initializing GLFW", 'create_window')
+    glfw.init() # Initialize GLFW (just in case we call from another thread or something)
+
+    LOGGER.log_trace("Setting window hints", 'create_window')
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    glfw.window_hint(glfw.RESIZABLE, gl.GL_FALSE)
+    glfw.window_hint(glfw.VISIBLE, gl.GL_TRUE if visible else gl.GL_FALSE)
+
+
+    LOGGER.log_trace("Creating window", 'create_window')
+    window = glfw.create_window(*WINDOW_SIZE, "CG Trab 1", monitor=None, share=None)
+    assert window, 'Could not create the GLFW window (is there a display? try xvfb-run, or headless.py --egl)'
+    glfw.make_context_current(window)
+    if not visible:
+        LOGGER.log_info("Invisible window created", 'create_window')
+        return window
+
+    glfw.set_window_pos(window, GUI_WIDTH, 0)
+    glfw.show_window(window)
+
+    LOGGER.log_trace("Disabling mouse", 'create_window')
+    glfw.set_input_mode(window, glfw.CURSOR, glfw.CURSOR_DISABLED);
+
+    LOGGER.log_trace("Enabling VSync", 'create_window')
+    glfw.swap_interval(1)
+
+    LOGGER.log_info("Window created", 'create_window')
+
+    # gl.glEnable(gl.GL_CULL_FACE);  
+    # gl.glCullFace(gl.GL_FRONT);  
+    # gl.glFrontFace(gl.GL_CW);  
+
+    return window
+
+def create_egl_context():
+    '''
+    Creates an OpenGL 3.3 core context with EGL, without any window or display server, and makes it current
+    (see headless.py --egl, which renders into a Framebuffer). Returns the EGL display and context, for destroy_egl_context.
+    PyOpenGL must run on EGL: PYOPENGL_PLATFORM=egl has to be set before OpenGL is first imported.
+    With Mesa, EGL_PLATFORM=surfaceless makes the default display work without X or Wayland.
+    '''
+    from OpenGL import EGL
+
+    LOGGER.log_trace("Initializing EGL", 'create_egl_context')
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    assert display and EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)), 'Could not initialize EGL'
+
+    LOGGER.log_trace("Choosing a config", 'create_egl_context')
+    config_attributes = (EGL.EGLint * 5)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE,
+    )
+    config, config_count = EGL.EGLConfig(), EGL.EGLint()
+    EGL.eglChooseConfig(display, config_attributes, ctypes.pointer(config), 1, ctypes.pointer(config_count))
+    assert config_count.value > 0, 'No EGL config can render with desktop OpenGL'
+
+    LOGGER.log_trace("Creating context", 'create_egl_context')
+    assert EGL.eglBindAPI(EGL.EGL_OPENGL_API), 'EGL has no desktop OpenGL'
+    context_attributes = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+        EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE,
+    )
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attributes)
+    assert context, 'Could not create the EGL context (OpenGL 3.3 core)'
+    assert EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context), 'EGL contexts without a surface are not supported (EGL_KHR_surfaceless_context)'
+
+    LOGGER.log_info(f"EGL {major.value}.{minor.value} context created: {gl.glGetString(gl.GL_RENDERER).decode()}, OpenGL {gl.glGetString(gl.GL_VERSION).decode()}", 'create_egl_context')
+    return display, context
+
+def destroy_egl_context(display, context):
+    from OpenGL import EGL
+
+    EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+    EGL.eglDestroyContext(display, context)
+    EGL.eglTerminate(display)
+
+def setup_gl_state():
+    ''' OpenGL state used by the whole application '''
+    # Enable blending
+    gl.glEnable(gl.GL_BLEND)
+    gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+    LOGGER.log_trace("Enabling Depth Test", 'setup_gl_state')
+    gl.glEnable(gl.GL_DEPTH_TEST)
+    gl.glDepthFunc(gl.GL_LESS)